@@ -5,10 +5,36 @@ Django管理画面の設定
 設定を定義しています。管理者はWebブラウザから暗号化履歴を確認・管理できます。
 """
 
+from django import forms
 from django.contrib import admin
+from django.db.models import Q
+from django.utils.text import smart_split, unescape_string_literal
+from .fields import COMPRESSED_PREFIX
 from .models import CryptoLog
 
 
+class CryptoLogAddForm(forms.ModelForm):
+    """
+    管理画面で履歴を追加するためのフォーム
+    
+    テキストはTextBlobへの外部キーのため、テキストの入力欄を用意し、
+    保存時にoriginal_text・encrypted_textプロパティに設定します
+    （CryptoLog.saveでTextBlobが保存されます）。
+    """
+
+    original_text = forms.CharField(label='元のテキスト', widget=forms.Textarea, strip=False)
+    encrypted_text = forms.CharField(label='暗号化されたテキスト', widget=forms.Textarea, strip=False)
+
+    class Meta:
+        model = CryptoLog
+        exclude = ['original_blob', 'encrypted_blob']
+
+    def save(self, commit=True):
+        self.instance.original_text = self.cleaned_data['original_text']
+        self.instance.encrypted_text = self.cleaned_data['encrypted_text']
+        return super().save(commit)
+
+
 @admin.register(CryptoLog)
 class CryptoLogAdmin(admin.ModelAdmin):
     """
@@ -19,16 +45,35 @@ class CryptoLogAdmin(admin.ModelAdmin):
     """
     
     # 一覧画面で表示するフィールド
-    list_display = ['user', 'method', 'is_decryption', 'created_at']
+    list_display = ['user', 'method', 'is_decryption', 'shift', 'keyword', 'chain', 'file_name', 'created_at']
     
     # フィルタリング用のサイドバー項目
     list_filter = ['method', 'is_decryption', 'created_at']
     
-    # 検索可能なフィールド（ユーザー名、元テキスト、暗号化テキスト）
-    search_fields = ['user__username', 'original_text', 'encrypted_text']
+    # 検索可能なフィールド（ユーザー名、元テキスト、暗号化テキスト、ファイルのハッシュ値）
+    # 圧縮して保存されたテキストはSQLでは検索できないため、get_search_resultsで展開して検索する
+    search_fields = ['user__username', 'original_blob__text', 'encrypted_blob__text', 'file_name', 'file_sha256']
+    
+    # テキストはTextBlobへの外部キーのため、フォームでは編集せずに内容を表示する
+    exclude = ['original_blob', 'encrypted_blob']
+    
+    # 編集不可フィールド（作成日時は自動設定のため、テキストは共有されているため）
+    readonly_fields = ['original_text', 'encrypted_text', 'created_at']
+    
+    # 追加画面のフォーム（テキストを入力できる）
+    add_form = CryptoLogAddForm
     
-    # 編集不可フィールド（作成日時は自動設定のため）
-    readonly_fields = ['created_at']
+    def get_readonly_fields(self, request, obj=None):
+        """追加画面ではテキストを入力欄として表示する"""
+        if obj is None:
+            return ['created_at']
+        return super().get_readonly_fields(request, obj)
+    
+    def get_form(self, request, obj=None, **kwargs):
+        """追加画面ではテキストを入力できるadd_formを使用する"""
+        if obj is None:
+            kwargs['form'] = self.add_form
+        return super().get_form(request, obj, **kwargs)
     
     def get_queryset(self, request):
         """
@@ -43,3 +88,40 @@ class CryptoLogAdmin(admin.ModelAdmin):
             QuerySet: 最適化されたクエリセット
         """
         return super().get_queryset(request).select_related('user')
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        圧縮して保存されたテキストも対象にした検索
+        
+        通常の検索（SQLの部分一致）に加えて、圧縮して保存された行のテキストを
+        チャンク単位で読み込んで展開し、すべての検索語を元テキストまたは
+        暗号化テキストに含む行を検索結果に加えます。
+        
+        Args:
+            request: HTTPリクエストオブジェクト
+            queryset: 絞り込み済みのクエリセット
+            search_term (str): 検索語
+        
+        Returns:
+            tuple: (検索結果のクエリセット, 重複する行を含む可能性があるか)
+        """
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        terms = [
+            unescape_string_literal(term) if term.startswith(('"', "'")) and term[0] == term[-1] else term
+            for term in smart_split(search_term)
+        ]
+        terms = [term.casefold() for term in terms if term]
+        if not terms:
+            return results, may_have_duplicates
+        
+        compressed = queryset.filter(
+            Q(original_blob__text__startswith=COMPRESSED_PREFIX) | Q(encrypted_blob__text__startswith=COMPRESSED_PREFIX)
+        ).values_list('pk', 'original_blob__text', 'encrypted_blob__text')
+        matched = []
+        for pk, original_text, encrypted_text in compressed.iterator(chunk_size=100):
+            texts = (original_text.casefold(), encrypted_text.casefold())
+            if all(any(term in text for text in texts) for term in terms):
+                matched.append(pk)
+        if matched:
+            results = results | queryset.filter(pk__in=matched)
+        return results, may_have_duplicates
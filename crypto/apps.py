@@ -22,3 +22,13 @@ class CryptoConfig(AppConfig):
     
     # アプリケーション名
     name = 'crypto'
+    
+    def ready(self):
+        """
+        アプリケーションの起動時の処理
+        
+        設定で有効な場合は、バッチ処理用のプロセスプールを起動しておきます
+        （crypto.parallelを参照）。
+        """
+        from .parallel import prewarm_pool
+        prewarm_pool()
@@ -0,0 +1,176 @@
+"""
+暗号化・復号化結果のキャッシュ
+
+このモジュールはコーデックの処理結果をDjangoのキャッシュフレームワークに保存し、
+同じ入力の再計算を省きます。プレビューは入力のたびにテキスト全体を送信し、
+バッチ処理では同じ行が繰り返し現れるため、同じ入力の処理が頻繁に発生します。
+
+キャッシュのキーは（方式名, 鍵パラメータ, 暗号化・復号化の別, テキストのハッシュ値）から
+作成します。ランダム置換暗号（およびそれを含むチェーン）は毎回結果が変わるため、
+Codec.is_deterministic()で自動的に対象外とします。
+
+使用するキャッシュは設定のCRYPTO_CODEC_CACHE（CACHESのエイリアス）で指定し、
+Noneの場合はキャッシュを使用しません。容量の上限と追い出しはキャッシュの設定
+（LocMemCacheの場合はMAX_ENTRIESに達すると最も長く使われていないエントリから削除）に従います。
+MAX_ENTRIESは件数の上限のため、入力がCRYPTO_CODEC_CACHE_MAX_TEXT文字以下で、
+結果がUTF-8でCRYPTO_CODEC_CACHE_MAX_TEXTバイト以下の場合のみキャッシュし、
+1件あたりの大きさも制限します（キャッシュ全体の大きさは件数の上限×この値程度に収まります）。
+"""
+
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# キャッシュのヒット・ミスの回数（プロセスごと）
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(hits=0, misses=0):
+    """ヒット・ミスの回数を加算"""
+    with _stats_lock:
+        _stats['hits'] += hits
+        _stats['misses'] += misses
+
+
+def cache_stats():
+    """
+    キャッシュのヒット・ミスの回数を取得
+    
+    Returns:
+        dict: {'hits': ヒット数, 'misses': ミス数, 'hit_rate': ヒット率}
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    """キャッシュのヒット・ミスの回数を0に戻す"""
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def _get_cache(codec, params):
+    """この処理に使用するキャッシュ（キャッシュしない場合はNone）"""
+    alias = getattr(settings, 'CRYPTO_CODEC_CACHE', None)
+    if alias is None or not codec.is_deterministic(**params):
+        return None
+    return caches[alias]
+
+
+def _cache_key(codec, text, decrypt, params):
+    """キャッシュのキー（キーの長さ制限に収まるようにすべてをハッシュ化）"""
+    key_params = '&'.join(f'{name}={value}' for name, value in sorted(params.items()))
+    digest = hashlib.sha256(
+        f"{codec.name}\0{'decrypt' if decrypt else 'encrypt'}\0{key_params}\0".encode('utf-8')
+    )
+    digest.update(text.encode('utf-8', 'surrogatepass'))
+    return f'crypto:codec:{digest.hexdigest()}'
+
+
+def _max_text():
+    """キャッシュの対象とする入力の最大文字数・結果の最大バイト数"""
+    return getattr(settings, 'CRYPTO_CODEC_CACHE_MAX_TEXT', 4096)
+
+
+def _cacheable(text):
+    """キャッシュの対象とする大きさのテキストか"""
+    return len(text) <= _max_text()
+
+
+def _storable(output):
+    """キャッシュに保存する大きさの結果か（出力が入力より大きくなる方式があるため、結果でも判定する）"""
+    limit = _max_text()
+    if len(output) > limit:
+        return False
+    return output.isascii() or len(output.encode('utf-8', 'surrogatepass')) <= limit
+
+
+def cached_process(codec, text, decrypt=False, params=None):
+    """
+    キャッシュを使用してテキストを暗号化または復号化
+    
+    Args:
+        codec: 使用するコーデック
+        text (str): 処理対象のテキスト
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+    
+    Returns:
+        str: 処理結果
+    """
+    params = params or {}
+    process = codec.decrypt if decrypt else codec.encrypt
+    cache = _get_cache(codec, params)
+    if cache is None or not _cacheable(text):
+        return process(text, **params)
+
+    key = _cache_key(codec, text, decrypt, params)
+    output = cache.get(key)
+    if output is not None:
+        _count(hits=1)
+        return output
+
+    _count(misses=1)
+    output = process(text, **params)
+    if _storable(output):
+        cache.set(key, output)
+    return output
+
+
+def cached_process_many(codec, texts, decrypt=False, params=None):
+    """
+    キャッシュを使用して複数のテキストを一括で暗号化または復号化
+    
+    キャッシュにない行だけをコーデックの一括処理（encrypt_many/decrypt_many）で
+    処理し、キャッシュへの読み書きもまとめて行います。
+    
+    Args:
+        codec: 使用するコーデック
+        texts (list): 処理対象のテキスト
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+    
+    Returns:
+        list: 入力と同じ順序の処理結果のリスト
+    """
+    params = params or {}
+    process_many = codec.decrypt_many if decrypt else codec.encrypt_many
+    cache = _get_cache(codec, params)
+    if cache is None:
+        return process_many(texts, **params)
+
+    keys = [_cache_key(codec, text, decrypt, params) if _cacheable(text) else None
+            for text in texts]
+    found = cache.get_many([key for key in keys if key is not None])
+
+    outputs = [None] * len(texts)
+    pending = {}  # キャッシュにないキー → そのキーを持つ行の位置
+    todo = []     # 処理する行の位置（同じ内容の行は1回だけ処理する）
+    for index, key in enumerate(keys):
+        if key is None:
+            todo.append(index)
+        elif key in found:
+            outputs[index] = found[key]
+        elif key in pending:
+            pending[key].append(index)
+        else:
+            pending[key] = [index]
+            todo.append(index)
+
+    for index, output in zip(todo, process_many([texts[i] for i in todo], **params)):
+        outputs[index] = output
+    for first, *rest in pending.values():
+        for index in rest:
+            outputs[index] = outputs[first]
+
+    _count(hits=len(texts) - len(todo), misses=len(todo))
+    cache.set_many({key: outputs[positions[0]] for key, positions in pending.items()
+                    if _storable(outputs[positions[0]])})
+    return outputs
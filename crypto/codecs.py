@@ -0,0 +1,447 @@
+"""
+暗号方式（コーデック）のレジストリ
+
+このモジュールは各暗号方式を方式名で引けるコーデックオブジェクトとして登録します。
+ビューは方式名からコーデックを1回の辞書引きで取得し、単体・一括・ストリーミングの
+各処理を呼び出します。コーデックには方式の性質（決定的か、自己逆変換か、
+位置に依存しないか、出力サイズの倍率）もメタデータとして持たせ、
+キャッシュや並列化の判断に利用できるようにしています。
+"""
+
+from functools import lru_cache
+
+from .utils import (
+    caesar_encrypt, caesar_decrypt,
+    base64_encrypt, base64_decrypt,
+    base64url_encrypt, base64url_decrypt,
+    random_substitution_encrypt, random_substitution_decrypt,
+    morse_encrypt, morse_decrypt,
+    rot13_encrypt, rot13_decrypt,
+    atbash_encrypt, atbash_decrypt,
+    vigenere_encrypt, vigenere_decrypt,
+    number_encrypt, number_decrypt,
+    binary_encrypt, binary_decrypt,
+    encrypt_stream, decrypt_stream,
+    validate_keyword,
+    caesar_mapping, atbash_mapping, random_mapping,
+    compose_mappings, invert_mapping, substitute,
+)
+
+
+# キーワードの最大文字数（CryptoLog.keywordのmax_lengthと同じ）
+KEYWORD_MAX_LENGTH = 50
+
+
+class Codec:
+    """
+    暗号方式を表すコーデック
+    
+    暗号化・復号化関数と、方式の性質を表すメタデータをまとめたオブジェクトです。
+    
+    Attributes:
+        name (str): 方式名（CryptoLog.methodに保存される値）
+        deterministic (bool): 同じ入力に対して常に同じ暗号文を返すか
+        self_inverse (bool): 暗号化と復号化が同じ処理か
+        position_independent (bool): 各文字の暗号文がその文字だけで決まるか
+        expansion (float): 暗号化による出力サイズのおおよその倍率（ASCII入力時）
+        accepts_bytes (bool): 暗号化関数がUTF-8エンコード済みのバイト列も受け付けるか
+        params (dict): 鍵パラメータ名とその既定値（鍵を使わない方式では空）
+        mapping: 単一換字式暗号の場合、鍵パラメータからマッピング
+            （a〜zの置換先を並べた26文字の文字列）を返す関数。それ以外はNone
+    """
+
+    def __init__(self, name, encrypt, decrypt, deterministic=True,
+                 self_inverse=False, position_independent=False, expansion=1.0,
+                 accepts_bytes=False, params=None, mapping=None):
+        self.name = name
+        self._encrypt = encrypt
+        self._decrypt = decrypt
+        self.deterministic = deterministic
+        self.self_inverse = self_inverse
+        self.position_independent = position_independent
+        self.expansion = expansion
+        self.accepts_bytes = accepts_bytes
+        self.params = params or {}
+        self.mapping = mapping
+
+    def __repr__(self):
+        return f'<Codec: {self.name}>'
+
+    def clean_params(self, data):
+        """
+        リクエストデータからこの方式の鍵パラメータを取り出して検証
+        
+        指定されていないパラメータには既定値を使用します。
+        この方式が使用しないパラメータは無視されます。
+        
+        Args:
+            data: フォームのcleaned_data、POSTデータ、JSONの辞書など
+        
+        Returns:
+            dict: 鍵パラメータ（CryptoLogのフィールド名と同じキー）
+        
+        Raises:
+            ValueError: パラメータの値が不正な場合
+        """
+        params = dict(self.params)
+        
+        if 'shift' in params and data.get('shift') not in (None, ''):
+            shift = data['shift']
+            # JSONのtrue・1.9などをint()で黙って1に変換しないように、整数以外の値は受け付けない
+            if isinstance(shift, bool) or (isinstance(shift, float) and not shift.is_integer()):
+                raise ValueError("シフト数は整数で指定してください")
+            try:
+                # シフト数は26で割った余りと同じ結果になるため、0〜25に正規化して保存する
+                params['shift'] = int(shift) % 26
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError("シフト数は整数で指定してください") from None
+        
+        if 'keyword' in params and data.get('keyword'):
+            keyword = data['keyword']
+            if not isinstance(keyword, str):
+                raise ValueError("キーワードは英字のみで指定してください")
+            if len(keyword) > KEYWORD_MAX_LENGTH:
+                raise ValueError(f"キーワードは{KEYWORD_MAX_LENGTH}文字以内で指定してください")
+            validate_keyword(keyword)
+            params['keyword'] = keyword.upper()
+        
+        return params
+
+    def is_deterministic(self, **params):
+        """
+        指定した鍵パラメータで、同じ入力に対して常に同じ結果を返すか
+        
+        Args:
+            **params: 鍵パラメータ（clean_paramsの戻り値）
+        
+        Returns:
+            bool: 結果をキャッシュしてよい場合はTrue
+        """
+        return self.deterministic
+
+    def encrypt(self, text, **params):
+        """テキストを暗号化"""
+        return self._encrypt(text, **params)
+
+    def decrypt(self, text, **params):
+        """暗号文を復号化"""
+        return self._decrypt(text, **params)
+
+    def encrypt_many(self, texts, **params):
+        """
+        複数のテキストを一括で暗号化
+        
+        Args:
+            texts (iterable): 暗号化対象のテキスト
+            **params: 鍵パラメータ（clean_paramsの戻り値）
+        
+        Returns:
+            list: 入力と同じ順序の暗号文のリスト
+        """
+        return [self.encrypt(text, **params) for text in texts]
+
+    def decrypt_many(self, texts, **params):
+        """
+        複数の暗号文を一括で復号化
+        
+        Args:
+            texts (iterable): 復号化対象の暗号文
+            **params: 鍵パラメータ（clean_paramsの戻り値）
+        
+        Returns:
+            list: 入力と同じ順序の復号結果のリスト
+        """
+        return [self.decrypt(text, **params) for text in texts]
+
+    def encrypt_stream(self, chunks, **params):
+        """チャンク単位のストリーミング暗号化（utils.encrypt_streamを参照）"""
+        return encrypt_stream(self.name, chunks, **params)
+
+    def decrypt_stream(self, chunks, **params):
+        """チャンク単位のストリーミング復号化（utils.decrypt_streamを参照）"""
+        return decrypt_stream(self.name, chunks, **params)
+
+
+# チェーンの区切り文字（"atbash>caesar:5>rot13>base64" の形式）
+CHAIN_SEPARATOR = '>'
+
+# 1つのチェーンに指定できる方式の最大数
+CHAIN_MAX_STEPS = 10
+
+# 正規化したチェーンの最大文字数（CryptoLog.chainのmax_lengthと同じ）
+CHAIN_MAX_LENGTH = 200
+
+
+class _SubstitutionStage:
+    """
+    連続する単一換字式暗号を1つのマッピングにまとめた処理段
+    
+    ランダム置換暗号を含む場合は、暗号化のたびに合成したマッピングを
+    ランダム置換暗号と同じ形式（暗号文|マッピング情報）で暗号文に付加し、
+    復号時はそのマッピング情報で全体を一度に元に戻します。
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.randomized = any(not codec.deterministic for codec, _ in steps)
+        if not self.randomized:
+            self.mapping = self._compose()
+            self.inverse = invert_mapping(self.mapping)
+
+    def _compose(self):
+        """各方式のマッピングを適用順に合成"""
+        mapping = caesar_mapping(0)
+        for codec, params in self.steps:
+            mapping = compose_mappings(mapping, codec.mapping(**params))
+        return mapping
+
+    def encrypt(self, text):
+        if self.randomized:
+            return random_substitution_encrypt(text, mapping=self._compose())
+        return substitute(text, self.mapping)
+
+    def decrypt(self, text):
+        if self.randomized:
+            return random_substitution_decrypt(text)
+        return substitute(text, self.inverse)
+
+    def encrypt_stream(self, chunks):
+        if self.randomized:
+            return encrypt_stream('random_substitution', chunks, mapping=self._compose())
+        return (substitute(chunk, self.mapping) for chunk in chunks)
+
+    def decrypt_stream(self, chunks):
+        if self.randomized:
+            return decrypt_stream('random_substitution', chunks)
+        return (substitute(chunk, self.inverse) for chunk in chunks)
+
+
+class _CodecStage:
+    """単一の方式をそのまま適用する処理段"""
+
+    def __init__(self, codec, params):
+        self.codec = codec
+        self.params = params
+
+    def encrypt(self, text):
+        return self.codec.encrypt(text, **self.params)
+
+    def decrypt(self, text):
+        return self.codec.decrypt(text, **self.params)
+
+    def encrypt_stream(self, chunks):
+        return self.codec.encrypt_stream(chunks, **self.params)
+
+    def decrypt_stream(self, chunks):
+        return self.codec.decrypt_stream(chunks, **self.params)
+
+
+class Chain:
+    """
+    複数の方式を順に適用する暗号チェーン
+    
+    連続する単一換字式暗号（caesar, rot13, atbash, random_substitution）は
+    1つのマッピングに合成され、1回のtranslateで処理されます。
+    それ以外の方式は個別の処理段として順に適用されます。
+    復号化は各処理段の逆変換を逆順に適用します。
+    
+    Attributes:
+        steps (list): (コーデック, 鍵パラメータ) のリスト（指定された順序）
+        stages (list): 合成後の処理段のリスト
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.stages = []
+        run = []
+        for codec, params in steps:
+            if codec.mapping is not None:
+                run.append((codec, params))
+                continue
+            if run:
+                self.stages.append(_SubstitutionStage(run))
+                run = []
+            self.stages.append(_CodecStage(codec, params))
+        if run:
+            self.stages.append(_SubstitutionStage(run))
+
+    def __str__(self):
+        """正規化したチェーンの文字列表現（"atbash>caesar:5>base64" など）"""
+        return CHAIN_SEPARATOR.join(
+            ':'.join([codec.name, *map(str, params.values())])
+            for codec, params in self.steps
+        )
+
+    @property
+    def deterministic(self):
+        return all(codec.deterministic for codec, _ in self.steps)
+
+    def encrypt(self, text):
+        for stage in self.stages:
+            text = stage.encrypt(text)
+        return text
+
+    def decrypt(self, text):
+        for stage in reversed(self.stages):
+            text = stage.decrypt(text)
+        return text
+
+    def encrypt_stream(self, chunks):
+        for stage in self.stages:
+            chunks = stage.encrypt_stream(chunks)
+        return chunks
+
+    def decrypt_stream(self, chunks):
+        for stage in reversed(self.stages):
+            chunks = stage.decrypt_stream(chunks)
+        return chunks
+
+
+def _parse_chain_step(step):
+    """
+    チェーンの1ステップを (コーデック, 鍵パラメータ) に変換
+    
+    Args:
+        step: "caesar:5" のような文字列、または
+            {"method": "caesar", "shift": 5} のような辞書
+    
+    Returns:
+        tuple: (コーデック, 検証済みの鍵パラメータ)
+    """
+    if isinstance(step, dict):
+        method, key, data = step.get('method'), '', step
+    elif isinstance(step, str):
+        method, _, key = (part.strip() for part in step.partition(':'))
+        data = {}
+    else:
+        raise ValueError("チェーンの形式が正しくありません")
+    
+    codec = CODECS.get(method)
+    if codec is None or isinstance(codec, ChainCodec):
+        raise ValueError(f"チェーンに未対応の暗号方式が含まれています: {method}")
+    
+    if key:
+        if not codec.params:
+            raise ValueError(f"{method} には鍵を指定できません")
+        # 鍵パラメータは各方式に1つだけ（caesarはshift、vigenereはkeyword）
+        data = {next(iter(codec.params)): key}
+    return codec, codec.clean_params(data)
+
+
+def _normalize_chain_spec(spec):
+    """文字列またはリストで指定されたチェーンを正規化した文字列に変換"""
+    if isinstance(spec, str):
+        steps = spec.replace('→', CHAIN_SEPARATOR).replace(',', CHAIN_SEPARATOR).split(CHAIN_SEPARATOR)
+        steps = [step for step in steps if step.strip()]
+    elif isinstance(spec, (list, tuple)):
+        steps = spec
+    else:
+        raise ValueError("チェーンの形式が正しくありません")
+    
+    if not steps:
+        raise ValueError("チェーンが指定されていません")
+    if len(steps) > CHAIN_MAX_STEPS:
+        raise ValueError(f"チェーンに指定できる方式は{CHAIN_MAX_STEPS}個までです")
+    normalized = str(Chain([_parse_chain_step(step) for step in steps]))
+    if len(normalized) > CHAIN_MAX_LENGTH:
+        raise ValueError(f"チェーンは{CHAIN_MAX_LENGTH}文字以内で指定してください")
+    return normalized
+
+
+@lru_cache(maxsize=256)
+def _compile_chain(spec):
+    """正規化済みのチェーン文字列から処理段を構築（キャッシュ付き）"""
+    return Chain([_parse_chain_step(step) for step in spec.split(CHAIN_SEPARATOR)])
+
+
+def compile_chain(spec):
+    """
+    チェーンの指定からChainオブジェクトを取得
+    
+    Args:
+        spec: "atbash>caesar:5>rot13>base64" のような文字列、
+            またはステップ（文字列・辞書）のリスト
+    
+    Returns:
+        Chain: 合成済みの暗号チェーン
+    
+    Raises:
+        ValueError: チェーンの指定が不正な場合
+    """
+    return _compile_chain(_normalize_chain_spec(spec))
+
+
+class ChainCodec(Codec):
+    """
+    複合暗号（チェーン）のコーデック
+    
+    鍵パラメータchainにチェーンの指定を受け取り、Chainに処理を委譲します。
+    チェーンの内容によって性質が変わるため、メタデータは最も保守的な値にしています。
+    """
+
+    def __init__(self):
+        super().__init__('chain', None, None, deterministic=False, params={'chain': ''})
+
+    def clean_params(self, data):
+        spec = data.get('chain')
+        if not spec:
+            raise ValueError("チェーンが指定されていません")
+        return {'chain': _normalize_chain_spec(spec)}
+
+    def is_deterministic(self, chain=''):
+        # ランダム置換暗号を含まないチェーンは決定的
+        return _compile_chain(chain).deterministic
+
+    def encrypt(self, text, chain=''):
+        return _compile_chain(chain).encrypt(text)
+
+    def decrypt(self, text, chain=''):
+        return _compile_chain(chain).decrypt(text)
+
+    def encrypt_stream(self, chunks, chain=''):
+        return (piece for piece in _compile_chain(chain).encrypt_stream(chunks) if piece)
+
+    def decrypt_stream(self, chunks, chain=''):
+        return (piece for piece in _compile_chain(chain).decrypt_stream(chunks) if piece)
+
+
+# 方式名 → コーデックのレジストリ
+# 並び順はCryptoLog.ENCRYPTION_METHODSと同じ
+CODECS = {codec.name: codec for codec in [
+    Codec('caesar', caesar_encrypt, caesar_decrypt, position_independent=True,
+          params={'shift': 3}, mapping=caesar_mapping),
+    Codec('base64', base64_encrypt, base64_decrypt, expansion=4 / 3, accepts_bytes=True),
+    Codec('base64url', base64url_encrypt, base64url_decrypt, expansion=4 / 3,
+          accepts_bytes=True),
+    Codec('random_substitution', random_substitution_encrypt, random_substitution_decrypt,
+          deterministic=False, mapping=random_mapping),
+    Codec('morse', morse_encrypt, morse_decrypt, position_independent=True, expansion=4.0),
+    Codec('rot13', rot13_encrypt, rot13_decrypt, self_inverse=True, position_independent=True,
+          mapping=lambda: caesar_mapping(13)),
+    Codec('atbash', atbash_encrypt, atbash_decrypt, self_inverse=True, position_independent=True,
+          mapping=atbash_mapping),
+    Codec('vigenere', vigenere_encrypt, vigenere_decrypt, params={'keyword': "ENCRYPT"}),
+    Codec('number', number_encrypt, number_decrypt, position_independent=True, expansion=2.0),
+    Codec('binary', binary_encrypt, binary_decrypt, position_independent=True, expansion=9.0,
+          accepts_bytes=True),
+    ChainCodec(),
+]}
+
+
+def get_codec(method):
+    """
+    方式名からコーデックを取得
+    
+    Args:
+        method (str): 暗号化方式の名前
+    
+    Returns:
+        Codec: 対応するコーデック
+    
+    Raises:
+        ValueError: 未対応の暗号方式が指定された場合
+    """
+    # 文字列以外（JSONのリストなど）はハッシュできないことがあるため、先に除外する
+    if not isinstance(method, str) or method not in CODECS:
+        raise ValueError("未対応の暗号方式です")
+    return CODECS[method]
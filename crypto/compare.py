@@ -0,0 +1,76 @@
+"""
+全方式の比較プレビュー
+
+このモジュールは1つのテキストを登録されているすべての方式で暗号化し、
+方式ごとの暗号文・処理時間・出力サイズをまとめて返します。
+方式ごとにプレビューを呼び出すと、そのたびにセッション・認証・CSRFの処理が
+発生するため、比較は1回のリクエストで行います。
+
+各方式の処理で共有できるものは1回だけ作成します。
+テキストのUTF-8エンコードは1回だけ行い、バイト列を受け付ける方式
+（Base64, Base64（URLセーフ）, Binary）にはエンコード済みのバッファを渡します。
+換字表はcrypto.utilsでキャッシュされているため、方式間で共有されます。
+処理時間は比較のための計測値であり、結果キャッシュは使用しません。
+"""
+
+import time
+
+from .codecs import CODECS
+
+
+def compare_expansion(data):
+    """
+    比較で出力される暗号文の合計のおおよその倍率
+    
+    Args:
+        data (dict): リクエストデータ（chainの指定の有無を判定）
+    
+    Returns:
+        float: 全方式の出力サイズの倍率の合計（ASCII入力時）
+    """
+    return sum(codec.expansion for codec in CODECS.values() if _included(codec, data))
+
+
+def _included(codec, data):
+    """比較の対象とする方式か（チェーンは方式の並びが指定された場合のみ）"""
+    return codec.name != 'chain' or bool(data.get('chain'))
+
+
+def compare_methods(text, data):
+    """
+    テキストを登録されているすべての方式で暗号化
+    
+    鍵パラメータは方式ごとにリクエストデータから取り出します。
+    ある方式でエラーが発生しても、他の方式の処理は続けます。
+    
+    Args:
+        text (str): 暗号化対象のテキスト
+        data (dict): 鍵パラメータ（shift, keyword, chain）を含むリクエストデータ
+    
+    Returns:
+        list: 方式ごとの結果の辞書のリスト（登録順）。成功した場合は
+            {'method', 'result', 'length': 文字数, 'bytes': UTF-8でのバイト数,
+            'elapsed_ms': 処理時間（ミリ秒）}、失敗した場合は {'method', 'error'}
+    """
+    encoded = memoryview(text.encode('utf-8'))
+    results = []
+    for codec in CODECS.values():
+        if not _included(codec, data):
+            continue
+        try:
+            params = codec.clean_params(data)
+            start = time.perf_counter()
+            output = codec.encrypt(encoded if codec.accepts_bytes else text, **params)
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            results.append({'method': codec.name, 'error': str(e)})
+            continue
+        results.append({
+            'method': codec.name,
+            'result': output,
+            'length': len(output),
+            # ASCIIのみの出力（大半の方式）はエンコードせずにバイト数を求める
+            'bytes': len(output) if output.isascii() else len(output.encode('utf-8')),
+            'elapsed_ms': round(elapsed * 1000, 3),
+        })
+    return results
@@ -0,0 +1,125 @@
+"""
+圧縮して保存するテキストフィールド
+
+Binary暗号の暗号文は入力の9倍、モールス信号は約4倍の大きさになりますが、
+どちらもよく圧縮できます。CompressedTextFieldは設定のCRYPTO_COMPRESS_THRESHOLD文字以上の
+テキストをzlibで圧縮して保存し、読み込み時に自動的に展開します。
+
+圧縮したテキストは列の型（TEXT）を変えずに保存できるように、
+"接頭辞 + 文字数 + ':' + 圧縮データのBase64" の形式の文字列で保存します。
+閾値未満のテキストはそのまま保存するため、SQLでの部分一致検索や先頭部分の取得は
+圧縮していない行にはそのまま使用できます。圧縮した行の先頭部分と文字数は、
+text_previewで保存された値の先頭部分だけから求められます。
+"""
+
+import base64
+import binascii
+import codecs
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+
+# 圧縮したテキストの接頭辞（この接頭辞で始まるテキストは、閾値未満でも常に圧縮して保存する）
+COMPRESSED_PREFIX = '\x1bzlib:'
+
+
+def is_compressed(value):
+    """保存された値が圧縮したテキストか"""
+    return value.startswith(COMPRESSED_PREFIX)
+
+
+def compress_text(text):
+    """
+    テキストを圧縮して保存用の文字列に変換
+    
+    Args:
+        text (str): 圧縮するテキスト
+    
+    Returns:
+        str: 接頭辞・文字数・圧縮データのBase64からなる文字列
+    """
+    data = zlib.compress(text.encode('utf-8', 'surrogatepass'))
+    return f"{COMPRESSED_PREFIX}{len(text)}:{base64.b64encode(data).decode('ascii')}"
+
+
+def decompress_text(value):
+    """
+    compress_textで変換した文字列を元のテキストに展開
+    
+    Args:
+        value (str): 圧縮したテキスト
+    
+    Returns:
+        str: 元のテキスト
+    """
+    _, _, payload = value[len(COMPRESSED_PREFIX):].partition(':')
+    return zlib.decompress(base64.b64decode(payload)).decode('utf-8', 'surrogatepass')
+
+
+def preview_head_length(chars):
+    """
+    text_previewに渡す、保存された値の先頭部分の文字数
+    
+    圧縮した行から先頭chars文字を展開するのに十分な長さです
+    （圧縮データの先頭にはハフマン符号表が入るため、余裕を持たせています）。
+    """
+    return max(2048, chars * 16)
+
+
+def text_preview(head, chars):
+    """
+    保存された値の先頭部分から、表示用の先頭部分と全体の文字数を求める
+    
+    圧縮していない行はそのまま先頭chars文字を返し、圧縮した行は
+    圧縮データの先頭部分だけを展開します。
+    
+    Args:
+        head (str): 保存された値の先頭preview_head_length(chars)文字
+            （Substr(..., output_field=TextField())で取得した値）
+        chars (int): 表示する文字数
+    
+    Returns:
+        tuple: (先頭chars文字, 全体の文字数)
+            圧縮していない行の文字数はNone（SQLのLengthで求める）
+    """
+    if not is_compressed(head):
+        return head[:chars], None
+
+    length, _, payload = head[len(COMPRESSED_PREFIX):].partition(':')
+    # Base64は4文字単位でデコードし、途中までの圧縮データを展開できる分だけ展開する
+    payload = payload[:len(payload) - len(payload) % 4]
+    try:
+        data = zlib.decompressobj().decompress(base64.b64decode(payload), chars * 4)
+    except (binascii.Error, zlib.error):
+        return '', int(length)
+    text = codecs.getincrementaldecoder('utf-8')('surrogatepass').decode(data)
+    return text[:chars], int(length)
+
+
+class CompressedTextField(models.TextField):
+    """
+    閾値以上の長さのテキストをzlibで圧縮して保存するTextField
+    
+    圧縮後の方が大きくなる場合は圧縮せずに保存します。
+    モデルの属性・フォーム・values()などでは常に元のテキストとして扱われます。
+    """
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        if is_compressed(value):
+            # 接頭辞で始まるテキストは、圧縮したテキストと区別できるように常に圧縮する
+            return compress_text(value)
+        if len(value) >= getattr(settings, 'CRYPTO_COMPRESS_THRESHOLD', 1024):
+            compressed = compress_text(value)
+            if len(compressed) < len(value.encode('utf-8', 'surrogatepass')):
+                return compressed
+        return value
+
+    def from_db_value(self, value, expression, connection):
+        if value is not None and is_compressed(value):
+            return decompress_text(value)
+        return value
@@ -0,0 +1,124 @@
+"""
+アップロードされたファイルのストリーミング暗号化・復号化
+
+このモジュールはアップロードされたファイルをチャンク単位で読み込み、
+各チャンクをコーデックのストリーミング処理（encrypt_stream/decrypt_stream）に通して、
+処理結果をチャンク単位で返します。ファイル全体をメモリに載せないため、
+使用メモリはファイルの大きさによらずチャンクの大きさ程度に収まります。
+
+ファイルはUTF-8のテキストとして読み込みます（先頭のBOMは取り除きます）。
+バイト列を受け付ける方式（Base64, Base64（URLセーフ）, Binary）の暗号化では、
+デコードせずにバイト列のまま処理するため、テキスト以外のファイルも扱えます。
+ランダム置換暗号（およびそれを含むチェーン）の復号化は、マッピング情報が
+暗号文の末尾にあるため、例外的にファイル全体を読み込んでから復号します。
+
+ファイルがUTF-8のテキストかどうかは、処理結果を返し始める前にcheck_encodingで
+確かめます（ファイルを1回余分に読みますが、使用メモリはチャンクの大きさ程度のままです）。
+不正な暗号文など、処理の途中でしか分からないエラーの場合は、ダウンロードが途中で
+切れたことが分かるように、それまでの結果の後にエラーの目印（ERROR_MARKERで始まる行）を
+付けて終了します。
+
+チャンクの大きさは設定のCRYPTO_UPLOAD_CHUNK_SIZE（バイト）で指定します。
+アップロードされたファイル自体は、Djangoのアップロードハンドラーによって
+FILE_UPLOAD_MAX_MEMORY_SIZEを超える場合は一時ファイルに保存されます。
+"""
+
+import codecs
+import hashlib
+
+from django.conf import settings
+
+
+# 処理が途中で失敗した場合に、処理結果の後に付けるエラーの行の先頭
+ERROR_MARKER = '\n\n[エラー] 処理を中断しました: '
+
+class _Source:
+    """アップロードされたファイルのチャンクを読みながら、大きさとハッシュ値を求める"""
+
+    def __init__(self, uploaded, chunk_size):
+        self.uploaded = uploaded
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def __iter__(self):
+        for chunk in self.uploaded.chunks(self.chunk_size):
+            self.size += len(chunk)
+            self.sha256.update(chunk)
+            yield chunk
+
+
+def _decode(chunks):
+    """バイト列のチャンクをUTF-8のテキストとして逐次デコード（途中で切れた文字を保持）"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def _chunk_size():
+    return getattr(settings, 'CRYPTO_UPLOAD_CHUNK_SIZE', 64 * 1024)
+
+
+def _reads_text(codec, decrypt):
+    """ファイルをテキストとしてデコードして処理するか"""
+    return decrypt or not codec.accepts_bytes
+
+
+def check_encoding(codec, uploaded, decrypt=False):
+    """
+    ファイルをテキストとして処理する場合に、UTF-8のテキストかどうかを確かめる
+    
+    ファイルをチャンク単位で読み、デコードできるかだけを確かめます。
+    
+    Args:
+        codec: 使用するコーデック
+        uploaded: アップロードされたファイル（UploadedFile）
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+    
+    Raises:
+        ValueError: ファイルがUTF-8のテキストでない場合
+    """
+    if not _reads_text(codec, decrypt):
+        return
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    try:
+        for chunk in uploaded.chunks(_chunk_size()):
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise ValueError('ファイルはUTF-8のテキストで指定してください') from None
+
+
+def process_file(codec, uploaded, decrypt=False, params=None, on_complete=None):
+    """
+    アップロードされたファイルをチャンク単位で暗号化または復号化
+    
+    Args:
+        codec: 使用するコーデック
+        uploaded: アップロードされたファイル（UploadedFile）
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+        on_complete: 最後まで処理できた場合に (入力のバイト数, 入力のSHA-256) を
+            引数として呼び出す関数
+    
+    Yields:
+        bytes: UTF-8でエンコードされた処理結果のチャンク。
+            ファイルがUTF-8のテキストでない場合や暗号文が不正な場合
+            （UnicodeDecodeError, binascii.Errorを含むValueError）は、
+            最後にERROR_MARKERで始まるエラーの行を返して終了します（on_completeは呼び出しません）
+    """
+    params = params or {}
+    source = _Source(uploaded, _chunk_size())
+    chunks = _decode(source) if _reads_text(codec, decrypt) else source
+    stream = codec.decrypt_stream if decrypt else codec.encrypt_stream
+
+    try:
+        for piece in stream(chunks, **params):
+            yield piece.encode('utf-8')
+    except ValueError as e:
+        yield f'{ERROR_MARKER}{e}\n'.encode('utf-8')
+        return
+
+    if on_complete is not None:
+        on_complete(source.size, source.sha256.hexdigest())
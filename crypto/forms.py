@@ -6,9 +6,59 @@
 """
 
 from django import forms
+from django.core.validators import RegexValidator
 
+from .models import CryptoLog
 
-class EncryptForm(forms.Form):
+
+# Vigenère暗号のキーワードの入力検証（ASCII英字のみ）
+keyword_validator = RegexValidator(r'^[A-Za-z]+$', 'キーワードは英字のみで指定してください')
+
+
+class KeyParamsForm(forms.Form):
+    """
+    鍵パラメータの入力フィールド
+    
+    Caesar暗号のシフト数、Vigenère暗号のキーワード、複合暗号のチェーンを
+    指定するためのフィールドです。シフト数とキーワードが未入力の場合は
+    既定値（シフト数3、キーワード"ENCRYPT"）が使用されます。
+    """
+    
+    # Caesar暗号のシフト数
+    shift = forms.IntegerField(
+        label="シフト数（Caesar暗号）",
+        required=False,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': '3'
+        })
+    )
+    
+    # Vigenère暗号のキーワード
+    keyword = forms.CharField(
+        label="キーワード（Vigenère暗号）",
+        required=False,
+        max_length=50,
+        validators=[keyword_validator],
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'ENCRYPT'
+        })
+    )
+    
+    # 複合暗号（チェーン）で適用する方式の並び
+    chain = forms.CharField(
+        label="チェーン（複合暗号）",
+        required=False,
+        max_length=200,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'atbash>caesar:5>rot13>base64'
+        })
+    )
+
+
+class EncryptForm(KeyParamsForm):
     """
     暗号化用のフォーム
     
@@ -29,22 +79,12 @@ class EncryptForm(forms.Form):
     # 暗号化方式の選択フィールド
     method = forms.ChoiceField(
         label="暗号方式",
-        choices=[
-            ('caesar', 'Caesar暗号'),           # シーザー暗号
-            ('base64', 'Base64'),              # Base64エンコード
-            ('random_substitution', 'ランダム置換暗号'),  # ランダム置換
-            ('morse', 'モールス信号風'),         # モールス信号
-            ('rot13', 'ROT13暗号'),            # ROT13エンコード
-            ('atbash', 'Atbash暗号'),          # Atbash暗号
-            ('vigenere', 'Vigenère暗号'),      # ヴィジュネル暗号
-            ('number', '数字置換暗号'),         # 数字置換
-            ('binary', 'Binary暗号'),          # 二進数表現
-        ],
+        choices=CryptoLog.ENCRYPTION_METHODS,
         widget=forms.Select(attrs={'class': 'form-select'})  # Bootstrapのセレクトスタイル
     )
 
 
-class DecryptForm(forms.Form):
+class DecryptForm(KeyParamsForm):
     """
     復号化用のフォーム
     
@@ -65,16 +105,36 @@ class DecryptForm(forms.Form):
     # 復号化方式の選択フィールド（暗号化時と同じ方式を使用）
     method = forms.ChoiceField(
         label="暗号方式",
-        choices=[
-            ('caesar', 'Caesar暗号'),           # シーザー暗号
-            ('base64', 'Base64'),              # Base64エンコード
-            ('random_substitution', 'ランダム置換暗号'),  # ランダム置換
-            ('morse', 'モールス信号風'),         # モールス信号
-            ('rot13', 'ROT13暗号'),            # ROT13エンコード
-            ('atbash', 'Atbash暗号'),          # Atbash暗号
-            ('vigenere', 'Vigenère暗号'),      # ヴィジュネル暗号
-            ('number', '数字置換暗号'),         # 数字置換
-            ('binary', 'Binary暗号'),          # 二進数表現
-        ],
+        choices=CryptoLog.ENCRYPTION_METHODS,
         widget=forms.Select(attrs={'class': 'form-select'})  # Bootstrapのセレクトスタイル
     )
+
+
+class FileProcessForm(KeyParamsForm):
+    """
+    ファイルアップロードによる暗号化・復号化用のフォーム
+    
+    UTF-8のテキストファイルを選択された方式で暗号化または復号化します。
+    処理結果はファイルとしてダウンロードされます。
+    """
+    
+    # 処理対象のファイル
+    file = forms.FileField(
+        label="ファイル（UTF-8のテキスト）",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control'})
+    )
+    
+    # 暗号化方式の選択フィールド
+    method = forms.ChoiceField(
+        label="暗号方式",
+        choices=CryptoLog.ENCRYPTION_METHODS,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
+    # 操作種別（暗号化または復号化）
+    operation = forms.ChoiceField(
+        label="操作",
+        choices=[('encrypt', '暗号化'), ('decrypt', '復号化')],
+        initial='encrypt',
+        widget=forms.RadioSelect
+    )
@@ -0,0 +1,256 @@
+"""
+暗号化履歴（CryptoLog）の書き込み処理
+
+このモジュールは履歴の一括保存と、レスポンスを返した後にバックグラウンドで
+履歴を書き込むライトビハインド方式の書き込みキューを提供します。
+
+ライトビハインド方式は設定のCRYPTO_LOG_WRITE_BEHINDで有効化します（既定は無効）。
+無効の場合（テストを含む）は、リクエストの処理中に同期的に書き込みます。
+有効の場合は、履歴をプロセス内の上限付きキューに積み、バックグラウンドスレッドが
+CRYPTO_LOG_FLUSH_INTERVAL_MSミリ秒ごと、またはCRYPTO_LOG_BATCH_SIZE件ごとに
+bulk_createでまとめて書き込みます。
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .models import CryptoLog
+
+
+logger = logging.getLogger(__name__)
+
+# キューに積んでスレッドに終了を知らせる目印
+_STOP = object()
+
+
+def save_logs(logs):
+    """
+    複数のCryptoLogを1つのトランザクションでまとめて保存
+    
+    bulk_createで設定のCRYPTO_LOG_BATCH_SIZE件ずつINSERTします。
+    一括保存に失敗した場合は、1件ずつセーブポイント内で保存し直して、
+    エラーを行ごとに返します。
+    
+    Args:
+        logs (list): 保存する未保存のCryptoLogインスタンス
+    
+    Returns:
+        list: 入力と同じ順序のエラーメッセージ（成功した行はNone）のリスト
+    """
+    batch_size = getattr(settings, 'CRYPTO_LOG_BATCH_SIZE', 500)
+
+    try:
+        with transaction.atomic():
+            CryptoLog.objects.bulk_create(logs, batch_size=batch_size)
+        return [None] * len(logs)
+    except Exception:
+        pass
+
+    errors = []
+    with transaction.atomic():
+        for log in logs:
+            # 失敗したbulk_createで設定された主キーを破棄して保存し直す
+            log.pk = None
+            try:
+                with transaction.atomic():
+                    log.save(force_insert=True)
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+    return errors
+
+
+class LogWriter:
+    """
+    ライトビハインド方式の履歴書き込みキュー
+    
+    submit()で積まれた履歴をバックグラウンドスレッドがまとめて保存します。
+    キューが満杯の場合、submit()は空きができるまで最大put_timeout秒待ち
+    （バックプレッシャー）、それでも空かない場合は呼び出し元で同期的に保存します。
+    そのため、キューが溢れても履歴は失われません。
+    
+    Attributes:
+        batch_size (int): 1回の書き込みでまとめる最大件数
+        interval (float): 最初の1件を受け取ってから書き込むまでの最大待ち時間（秒）
+        put_timeout (float): キューが満杯の場合にsubmit()が待つ最大時間（秒）
+    """
+
+    def __init__(self, save=save_logs, max_size=10000, batch_size=500,
+                 interval=0.2, put_timeout=1.0):
+        self._save = save
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.batch_size = batch_size
+        self.interval = interval
+        self.put_timeout = put_timeout
+
+    def start(self):
+        """バックグラウンドスレッドを開始（開始済みの場合は何もしない）"""
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(
+                    target=self._run, name='crypto-log-writer', daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, logs):
+        """
+        履歴を書き込みキューに積む
+        
+        Args:
+            logs (iterable): 保存する未保存のCryptoLogインスタンス
+        """
+        overflow = []
+        for log in logs:
+            if self._closed:
+                overflow.append(log)
+                continue
+            try:
+                self._queue.put(log, timeout=self.put_timeout)
+            except queue.Full:
+                overflow.append(log)
+
+        if overflow:
+            # 停止後やキューが空かない場合は呼び出し元で同期的に保存する
+            self._write(overflow)
+
+    def flush(self):
+        """キューに積まれた履歴がすべて書き込まれるまで待機"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """キューに残った履歴を書き込んでからスレッドを停止"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            # 目印より前に積まれた履歴はすべて書き込まれる
+            self._queue.put(_STOP)
+            thread.join()
+
+        # 停止処理と同時に積まれた履歴も取りこぼさずに書き込む
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not _STOP:
+                remaining.append(item)
+        if remaining:
+            self._write(remaining)
+
+    def _run(self):
+        """キューから履歴を取り出して一定時間・一定件数ごとに書き込むループ"""
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    self._queue.task_done()
+                    break
+
+                batch = [item]
+                deadline = time.monotonic() + self.interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.task_done()
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+        finally:
+            # スレッドが使用したデータベース接続を閉じる
+            connection.close()
+
+    def _write(self, logs):
+        """履歴を保存し、失敗した件数をログに出力"""
+        close_old_connections()
+        try:
+            errors = self._save(logs)
+        except Exception:
+            logger.exception('履歴の書き込みに失敗しました（%d件）', len(logs))
+            return
+
+        failed = sum(1 for error in errors if error is not None)
+        if failed:
+            logger.error('履歴の書き込みに失敗しました（%d件）', failed)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """
+    設定に基づいて書き込みキューを取得（初回呼び出し時に作成して開始）
+    
+    プロセスの終了時には、キューに残った履歴を書き込んでから停止します。
+    
+    Returns:
+        LogWriter: プロセス内で共有される書き込みキュー
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter(
+                max_size=getattr(settings, 'CRYPTO_LOG_QUEUE_SIZE', 10000),
+                batch_size=getattr(settings, 'CRYPTO_LOG_BATCH_SIZE', 500),
+                interval=getattr(settings, 'CRYPTO_LOG_FLUSH_INTERVAL_MS', 200) / 1000,
+            )
+            _writer.start()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def record_logs(logs):
+    """
+    履歴を保存（ライトビハインド方式が有効な場合はキューに積む）
+    
+    同期モード（既定）では、保存に失敗した場合に例外を送出します。
+    
+    Args:
+        logs (list): 保存する未保存のCryptoLogインスタンス
+    """
+    if getattr(settings, 'CRYPTO_LOG_WRITE_BEHIND', False):
+        get_log_writer().submit(logs)
+    else:
+        CryptoLog.objects.bulk_create(logs)
+
+
+async def arecord_logs(logs):
+    """
+    履歴を保存（record_logsの非同期版）
+    
+    Args:
+        logs (list): 保存する未保存のCryptoLogインスタンス
+    """
+    if getattr(settings, 'CRYPTO_LOG_WRITE_BEHIND', False):
+        # キューが満杯の場合は待機するため、イベントループの外で積む
+        await sync_to_async(get_log_writer().submit, thread_sensitive=False)(logs)
+    else:
+        await CryptoLog.objects.abulk_create(logs)
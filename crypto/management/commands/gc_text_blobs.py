@@ -0,0 +1,65 @@
+"""
+参照されなくなった履歴のテキスト（TextBlob）を削除する管理コマンド
+
+履歴の削除やユーザーの削除では、他の履歴と共有されている可能性があるため
+TextBlobは削除されません。このコマンドはどの履歴からも参照されていない
+TextBlobを一定件数ずつ削除します。保存中の履歴が参照しようとしているテキストを
+削除しないように、猶予期間（設定のCRYPTO_TEXT_BLOB_GC_GRACE秒）内に使用された
+TextBlobは削除しません（TextBlobManager.storeを参照）。
+
+使用例:
+    python manage.py gc_text_blobs
+    python manage.py gc_text_blobs --dry-run
+    python manage.py gc_text_blobs --grace 86400
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from crypto.models import TextBlob, text_blob_gc_grace
+
+
+class Command(BaseCommand):
+    help = 'どの履歴からも参照されていないテキスト（TextBlob）を削除します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='1回のトランザクションで削除する件数（既定: 500）',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='最後の使用から削除するまでの猶予期間（秒、既定: 設定のCRYPTO_TEXT_BLOB_GC_GRACE）',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='削除せずに、削除対象の件数のみを表示します',
+        )
+
+    def handle(self, *args, batch_size, grace, dry_run, **options):
+        grace = text_blob_gc_grace() if grace is None else timedelta(seconds=grace)
+        if dry_run:
+            count = TextBlob.objects.collectable(grace).count()
+            self.stdout.write(f'削除対象のテキスト: {count}件')
+            return
+
+        deleted = 0
+        last_digest = ''
+        while True:
+            digests = list(
+                TextBlob.objects.collectable(grace).filter(digest__gt=last_digest)
+                .order_by('digest').values_list('digest', flat=True)[:batch_size]
+            )
+            if not digests:
+                break
+            with transaction.atomic():
+                # 調べた後に参照・使用された行を削除しないよう、トランザクション内で確かめ直す
+                count, _ = TextBlob.objects.collectable(grace).filter(
+                    digest__in=digests
+                ).only('digest').delete()
+            deleted += count
+            last_digest = digests[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'{deleted}件のテキストを削除しました'))
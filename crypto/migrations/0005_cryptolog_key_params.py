@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto', '0004_alter_cryptolog_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cryptolog',
+            name='keyword',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='cryptolog',
+            name='shift',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
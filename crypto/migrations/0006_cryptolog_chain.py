@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto', '0005_cryptolog_key_params'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cryptolog',
+            name='chain',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='cryptolog',
+            name='method',
+            field=models.CharField(choices=[('caesar', 'Caesar暗号'), ('base64', 'Base64'), ('random_substitution', 'ランダム置換暗号'), ('morse', 'モールス信号風'), ('rot13', 'ROT13暗号'), ('atbash', 'Atbash暗号'), ('vigenere', 'Vigenère暗号'), ('number', '数字置換暗号'), ('binary', 'Binary暗号'), ('chain', '複合暗号（チェーン）')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto', '0007_alter_cryptolog_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cryptolog',
+            name='file_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='cryptolog',
+            name='file_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='cryptolog',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
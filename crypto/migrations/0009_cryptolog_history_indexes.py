@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto', '0008_cryptolog_file_metadata'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cryptolog',
+            index=models.Index(fields=['user', '-created_at'], name='cryptolog_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cryptolog',
+            index=models.Index(fields=['user', 'method', '-created_at'], name='cryptolog_user_method_idx'),
+        ),
+        migrations.AlterField(
+            model_name='cryptolog',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
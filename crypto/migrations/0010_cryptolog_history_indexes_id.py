@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto', '0009_cryptolog_history_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cryptolog',
+            name='cryptolog_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cryptolog',
+            name='cryptolog_user_method_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cryptolog',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='cryptolog_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cryptolog',
+            index=models.Index(fields=['user', 'method', '-created_at', '-id'], name='cryptolog_user_method_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:59
+
+import crypto.fields
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+
+
+# 1回のトランザクションで書き換える行数（大きな履歴でもロックとメモリ使用量を抑える）
+BATCH_SIZE = 500
+
+TEXT_FIELDS = ['original_text', 'encrypted_text']
+
+
+def _rewrite_in_batches(queryset, rewrite):
+    """クエリセットの行をIDの順にBATCH_SIZE件ずつ書き換える"""
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            logs = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by('pk').only('pk', *TEXT_FIELDS)[:BATCH_SIZE]
+            )
+            if not logs:
+                return
+            rewrite(queryset.model, logs)
+        last_pk = logs[-1].pk
+
+
+def compress_texts(apps, schema_editor):
+    """既存の長いテキストを圧縮して保存し直す（保存時にCompressedTextFieldが圧縮する）"""
+    CryptoLog = apps.get_model('crypto', 'CryptoLog')
+    threshold = getattr(settings, 'CRYPTO_COMPRESS_THRESHOLD', 1024)
+    condition = Q()
+    for name in TEXT_FIELDS:
+        condition |= Q(**{f'{name}__startswith': crypto.fields.COMPRESSED_PREFIX})
+        condition |= Q(**{f'{name}_length__gte': threshold})
+    queryset = CryptoLog.objects.annotate(**{
+        f'{name}_length': Length(name) for name in TEXT_FIELDS
+    }).filter(condition)
+
+    def rewrite(CryptoLog, logs):
+        CryptoLog.objects.bulk_update(logs, TEXT_FIELDS)
+
+    _rewrite_in_batches(queryset, rewrite)
+
+
+def decompress_texts(apps, schema_editor):
+    """圧縮したテキストを元のテキストに戻して保存し直す"""
+    CryptoLog = apps.get_model('crypto', 'CryptoLog')
+    condition = Q()
+    for name in TEXT_FIELDS:
+        condition |= Q(**{f'{name}__startswith': crypto.fields.COMPRESSED_PREFIX})
+
+    def rewrite(CryptoLog, logs):
+        # 読み込んだ値は展開済みのため、圧縮しないTextFieldとしてそのまま書き込む
+        for log in logs:
+            CryptoLog.objects.filter(pk=log.pk).update(**{
+                name: models.Value(getattr(log, name), output_field=models.TextField())
+                for name in TEXT_FIELDS
+            })
+
+    _rewrite_in_batches(CryptoLog.objects.filter(condition), rewrite)
+
+
+class Migration(migrations.Migration):
+
+    # 行の書き換えはバッチごとのトランザクションで行う
+    atomic = False
+
+    dependencies = [
+        ('crypto', '0010_cryptolog_history_indexes_id'),
+    ]
+
+    operations = [
+        # 列の型（TEXT）は変わらないため、テーブルは作り直さない
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='cryptolog',
+                    name='encrypted_text',
+                    field=crypto.fields.CompressedTextField(),
+                ),
+                migrations.AlterField(
+                    model_name='cryptolog',
+                    name='original_text',
+                    field=crypto.fields.CompressedTextField(),
+                ),
+            ],
+        ),
+        migrations.RunPython(compress_texts, decompress_texts),
+    ]
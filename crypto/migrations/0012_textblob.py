@@ -0,0 +1,121 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:10
+
+import hashlib
+
+import crypto.fields
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+
+# 1回のトランザクションで書き換える行数（大きな履歴でもロックとメモリ使用量を抑える）
+BATCH_SIZE = 500
+
+# テキストのフィールドと、テキストを参照する外部キーの対応
+BLOB_FIELDS = {'original_text': 'original_blob', 'encrypted_text': 'encrypted_blob'}
+
+
+def _batches(queryset):
+    """クエリセットの行をIDの順にBATCH_SIZE件ずつ、トランザクション内で返す"""
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            logs = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+            if not logs:
+                return
+            yield logs
+        last_pk = logs[-1].pk
+
+
+def move_texts_to_blobs(apps, schema_editor):
+    """既存の履歴のテキストをTextBlobに保存し、外部キーで参照する"""
+    CryptoLog = apps.get_model('crypto', 'CryptoLog')
+    TextBlob = apps.get_model('crypto', 'TextBlob')
+    queryset = CryptoLog.objects.only('pk', *BLOB_FIELDS)
+    for logs in _batches(queryset):
+        blobs = {}
+        for log in logs:
+            for text_field, blob_field in BLOB_FIELDS.items():
+                text = getattr(log, text_field)
+                digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+                blobs.setdefault(digest, text)
+                setattr(log, f'{blob_field}_id', digest)
+        existing = set(TextBlob.objects.filter(digest__in=list(blobs)).values_list('digest', flat=True))
+        TextBlob.objects.bulk_create(
+            [TextBlob(digest=digest, text=text) for digest, text in blobs.items() if digest not in existing],
+            ignore_conflicts=True,
+        )
+        CryptoLog.objects.bulk_update(logs, list(BLOB_FIELDS.values()))
+
+
+def move_blobs_to_texts(apps, schema_editor):
+    """TextBlobのテキストを履歴の列に書き戻す"""
+    CryptoLog = apps.get_model('crypto', 'CryptoLog')
+    queryset = CryptoLog.objects.select_related(*BLOB_FIELDS.values()).only(
+        'pk', *(f'{blob_field}__text' for blob_field in BLOB_FIELDS.values())
+    )
+    for logs in _batches(queryset):
+        for log in logs:
+            for text_field, blob_field in BLOB_FIELDS.items():
+                setattr(log, text_field, getattr(log, blob_field).text)
+        CryptoLog.objects.bulk_update(logs, list(BLOB_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    # 行の書き換えはバッチごとのトランザクションで行う
+    atomic = False
+
+    dependencies = [
+        ('crypto', '0011_cryptolog_compressed_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('text', crypto.fields.CompressedTextField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cryptolog',
+            name='original_blob',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='crypto.textblob'),
+        ),
+        migrations.AddField(
+            model_name='cryptolog',
+            name='encrypted_blob',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='crypto.textblob'),
+        ),
+        migrations.RunPython(move_texts_to_blobs, move_blobs_to_texts),
+        # 巻き戻しで列を追加し直すときに既存の行を空文字で埋められるように既定値を設定する
+        # （既定値はデータベースには作成されないため、テーブルは作り直さない）
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='cryptolog',
+                    name=text_field,
+                    field=crypto.fields.CompressedTextField(default=''),
+                )
+                for text_field in BLOB_FIELDS
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='cryptolog',
+            name='original_text',
+        ),
+        migrations.RemoveField(
+            model_name='cryptolog',
+            name='encrypted_text',
+        ),
+        migrations.AlterField(
+            model_name='cryptolog',
+            name='original_blob',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='crypto.textblob'),
+        ),
+        migrations.AlterField(
+            model_name='cryptolog',
+            name='encrypted_blob',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='crypto.textblob'),
+        ),
+    ]
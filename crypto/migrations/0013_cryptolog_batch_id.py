@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto', '0012_textblob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cryptolog',
+            name='batch_id',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cryptolog',
+            index=models.Index(fields=['batch_id', 'id'], name='cryptolog_batch_idx'),
+        ),
+    ]
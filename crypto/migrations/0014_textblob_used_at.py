@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto', '0013_cryptolog_batch_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textblob',
+            name='used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -2,10 +2,139 @@
 暗号化アプリケーションのデータモデル定義
 
 このモジュールは暗号化・復号化の履歴を記録するためのモデルを定義しています。
+履歴のテキストは内容のハッシュ値をキーとするTextBlobに1回だけ保存し、
+履歴からは外部キーで参照します。同じテキストを何度処理しても、
+履歴1件あたりに増えるのは固定長のキーだけです。
 """
 
-from django.db import models
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .fields import CompressedTextField
+
+
+class TextBlobManager(models.Manager):
+    """TextBlobの保存・削除のためのマネージャー"""
+
+    def store(self, blobs):
+        """
+        未保存のテキストをまとめて保存（保存済みのテキストは保存しない）
+        
+        保存済みのキーを先に調べ、未保存のテキストだけを挿入します。
+        同時に同じテキストが保存された場合に備えて、挿入は
+        ignore_conflicts（INSERT OR IGNORE / ON CONFLICT DO NOTHING）で行います。
+        
+        保存済みのテキストは、調べる前に使用日時（used_at）を更新します。
+        gc_text_blobsは使用日時が猶予期間より古い行だけを削除するため、
+        この後に履歴から参照するまでの間にテキストが削除されることはありません
+        （更新と削除が同時に行われた場合は、行ロックによりどちらかが待ちます。
+        先に削除された行は、続けて調べたときに見つからないため挿入し直します）。
+        呼び出し側はこのメソッドと履歴の保存を同じトランザクションで行います。
+        
+        Args:
+            blobs (iterable): TextBlob.for_textで作成したインスタンス
+        """
+        blobs = {blob.digest: blob for blob in blobs}
+        if not blobs:
+            return
+        now = timezone.now()
+        # 直近に使用された行は削除されないため、更新の書き込みを省く
+        stale = now - text_blob_gc_grace() / 2
+        existing = set()
+        digests = list(blobs)
+        # SQLiteのパラメータ数の上限を超えないように分けて調べる
+        for start in range(0, len(digests), 500):
+            batch = digests[start:start + 500]
+            self.filter(digest__in=batch, used_at__lt=stale).update(used_at=now)
+            existing.update(self.filter(digest__in=batch).values_list('digest', flat=True))
+        for blob in blobs.values():
+            blob.used_at = now
+        self.bulk_create(
+            [blob for digest, blob in blobs.items() if digest not in existing],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+    def unreferenced(self):
+        """どの履歴からも参照されていないテキストのクエリセット"""
+        return self.filter(
+            ~models.Exists(CryptoLog.objects.filter(original_blob=models.OuterRef('pk'))),
+            ~models.Exists(CryptoLog.objects.filter(encrypted_blob=models.OuterRef('pk'))),
+        )
+
+    def collectable(self, grace=None):
+        """
+        削除できるテキスト（どの履歴からも参照されず、猶予期間より前に使用された行）のクエリセット
+        
+        Args:
+            grace (timedelta): 猶予期間（省略時は設定のCRYPTO_TEXT_BLOB_GC_GRACE秒）
+        
+        Returns:
+            QuerySet: 削除できるTextBlobのクエリセット
+        """
+        if grace is None:
+            grace = text_blob_gc_grace()
+        return self.unreferenced().filter(used_at__lt=timezone.now() - grace)
+
+
+def text_blob_gc_grace():
+    """参照されていないテキストを削除するまでの猶予期間（設定のCRYPTO_TEXT_BLOB_GC_GRACE秒）"""
+    return timedelta(seconds=getattr(settings, 'CRYPTO_TEXT_BLOB_GC_GRACE', 3600))
+
+
+class TextBlob(models.Model):
+    """
+    履歴のテキストを内容のハッシュ値（SHA-256）をキーとして保存するモデル
+    
+    同じ内容のテキストは1行だけ保存され、複数の履歴から共有されます。
+    保存後に内容が変わることはありません。参照されなくなった行は
+    猶予期間の後にgc_text_blobsコマンドで削除します。
+    """
+
+    # テキストのUTF-8でのSHA-256（16進数）
+    digest = models.CharField(max_length=64, primary_key=True)
+
+    # テキスト本体（長いテキストは圧縮して保存、crypto.fieldsを参照）
+    text = CompressedTextField()
+
+    # 最後に履歴の保存で使用された日時（gc_text_blobsは猶予期間内に使用された行を削除しない）
+    used_at = models.DateTimeField(default=timezone.now)
+
+    objects = TextBlobManager()
+
+    @classmethod
+    def for_text(cls, text):
+        """
+        テキストに対応する未保存のインスタンスを作成
+        
+        Args:
+            text (str): テキスト
+        
+        Returns:
+            TextBlob: キー（ハッシュ値）を設定したインスタンス
+        """
+        digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+        return cls(digest=digest, text=text)
+
+    def __str__(self):
+        return self.digest
+
+
+class CryptoLogQuerySet(models.QuerySet):
+    """履歴のテキストを保存してから履歴を一括保存するクエリセット"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            TextBlob.objects.db_manager(self.db).store(
+                blob for log in objs for blob in log._text_blobs()
+            )
+            return super().bulk_create(objs, *args, **kwargs)
 
 
 class CryptoLog(models.Model):
@@ -21,6 +150,7 @@ class CryptoLog(models.Model):
     ENCRYPTION_METHODS = [
         ('caesar', 'Caesar暗号'),           # シーザー暗号（文字をずらす）
         ('base64', 'Base64'),              # Base64エンコード
+        ('base64url', 'Base64（URLセーフ）'),  # URLセーフなBase64エンコード
         ('random_substitution', 'ランダム置換暗号'),  # ランダムな文字置換
         ('morse', 'モールス信号風'),         # モールス信号形式
         ('rot13', 'ROT13暗号'),            # ROT13エンコード
@@ -28,17 +158,21 @@ class CryptoLog(models.Model):
         ('vigenere', 'Vigenère暗号'),      # ヴィジュネル暗号（鍵付き）
         ('number', '数字置換暗号'),         # 数字による文字置換
         ('binary', 'Binary暗号'),          # 二進数表現
+        ('chain', '複合暗号（チェーン）'),   # 複数方式の組み合わせ
     ]
 
     # 実行したユーザー（外部キー）
     # カスケード削除でユーザー削除時にログも削除
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # user_idでの検索には下記の複合インデックスを使用するため、単独のインデックスは作成しない
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     
     # 元のテキスト（暗号化前または復号化後のテキスト）
-    original_text = models.TextField()
+    # テキスト本体はTextBlobに保存し、original_textプロパティで読み書きする
+    original_blob = models.ForeignKey(TextBlob, on_delete=models.PROTECT, related_name='+')
     
     # 暗号化されたテキスト（暗号化後または復号化前のテキスト）
-    encrypted_text = models.TextField()
+    # テキスト本体はTextBlobに保存し、encrypted_textプロパティで読み書きする
+    encrypted_blob = models.ForeignKey(TextBlob, on_delete=models.PROTECT, related_name='+')
     
     # 使用した暗号化方式（上記のENCRYPTION_METHODSから選択）
     method = models.CharField(max_length=20, choices=ENCRYPTION_METHODS)
@@ -46,9 +180,41 @@ class CryptoLog(models.Model):
     # 操作種別フラグ（False: 暗号化, True: 復号化）
     is_decryption = models.BooleanField(default=False)
     
+    # Caesar暗号のシフト数（それ以外の方式では未設定）
+    shift = models.IntegerField(null=True, blank=True)
+    
+    # Vigenère暗号のキーワード（それ以外の方式では空文字）
+    keyword = models.CharField(max_length=50, blank=True, default='')
+    
+    # 複合暗号のチェーン（例: "atbash>caesar:5>base64"、それ以外の方式では空文字）
+    chain = models.CharField(max_length=200, blank=True, default='')
+    
+    # ファイルアップロードでの処理の場合のみ、入力ファイルのメタデータを記録
+    # （テキスト本体は保存せず、original_textとencrypted_textは空文字）
+    file_name = models.CharField(max_length=255, blank=True, default='')
+    file_size = models.BigIntegerField(null=True, blank=True)
+    file_sha256 = models.CharField(max_length=64, blank=True, default='')
+    
+    # バッチ処理で保存した場合のみ、同じバッチの行に共通のID（結果のダウンロードで使用）
+    batch_id = models.UUIDField(null=True, blank=True, editable=False)
+    
     # レコード作成日時（自動設定）
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CryptoLogQuerySet.as_manager()
+
+    class Meta:
+        # 履歴ページの検索（ユーザー、任意で方式・操作種別で絞り込み、新しい順）に合わせた複合インデックス
+        # 同時刻の行はIDの降順に並べる（ページネーションのカーソルが (created_at, id) のため）
+        # 操作種別は2値のため、インデックスの列にはせず、読み込んだ行で絞り込む
+        # （方式の後に置くと、方式のみで絞り込む場合に並び替えにインデックスを使えなくなる）
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='cryptolog_user_created_idx'),
+            models.Index(fields=['user', 'method', '-created_at', '-id'], name='cryptolog_user_method_idx'),
+            # バッチ処理の結果のダウンロード（バッチの行を主キー順に読み込む）用
+            models.Index(fields=['batch_id', 'id'], name='cryptolog_batch_idx'),
+        ]
+
     def __str__(self):
         """
         管理画面などでのオブジェクト表示用文字列
@@ -57,3 +223,41 @@ class CryptoLog(models.Model):
             str: "ユーザー名 | 暗号化方式 | 操作種別" の形式
         """
         return f'{self.user.username} | {self.get_method_display()} | {"解読" if self.is_decryption else "暗号"}'
+
+    @property
+    def original_text(self):
+        """元のテキスト（未設定の場合はNone）"""
+        return None if self.original_blob_id is None else self.original_blob.text
+
+    @original_text.setter
+    def original_text(self, text):
+        self.original_blob = None if text is None else TextBlob.for_text(text)
+
+    @property
+    def encrypted_text(self):
+        """暗号化されたテキスト（未設定の場合はNone）"""
+        return None if self.encrypted_blob_id is None else self.encrypted_blob.text
+
+    @encrypted_text.setter
+    def encrypted_text(self, text):
+        self.encrypted_blob = None if text is None else TextBlob.for_text(text)
+
+    def _text_blobs(self):
+        """テキストの設定で作成した（保存が必要な可能性がある）TextBlob"""
+        return [
+            getattr(self, name) for name in ('original_blob', 'encrypted_blob')
+            if self._meta.get_field(name).is_cached(self) and getattr(self, name) is not None
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        テキストを保存してから履歴を保存
+        
+        Args:
+            *args: Model.saveの引数
+            **kwargs: Model.saveのキーワード引数
+        """
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            TextBlob.objects.db_manager(using).store(self._text_blobs())
+            super().save(*args, **kwargs)
@@ -0,0 +1,106 @@
+"""
+履歴のキーセット（カーソル）ページネーション
+
+このモジュールは履歴を (created_at, id) の降順で固定件数ずつ取得します。
+ページの位置はOFFSETではなく、前のページの端の行の (created_at, id) を表す
+カーソルで指定するため、何ページ目であってもインデックスを端から辿るだけで済み、
+件数（COUNT(*)）も求めません。ユーザーの履歴の件数によらず、1ページの取得にかかる
+時間は一定です。
+
+カーソルは "作成日時（ISO 8601）_ID" の形式の文字列です。
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+
+def encode_cursor(log):
+    """
+    行の位置を表すカーソルを作成
+    
+    Args:
+        log: CryptoLogインスタンス
+    
+    Returns:
+        str: カーソル
+    """
+    return f'{log.created_at.isoformat()}_{log.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    カーソルを (作成日時, ID) に変換
+    
+    Args:
+        cursor (str): encode_cursorで作成したカーソル
+    
+    Returns:
+        tuple: (作成日時, ID)
+    
+    Raises:
+        ValueError: カーソルの形式が正しくない場合
+    """
+    created_at, separator, pk = cursor.rpartition('_')
+    if not separator:
+        raise ValueError('カーソルの形式が正しくありません')
+    created_at = datetime.fromisoformat(created_at)
+    # encode_cursorの作成日時はUSE_TZが有効な場合のみタイムゾーン付き
+    # （手で作成した、タイムゾーンの有無が異なるカーソルは列と比較できない）
+    if timezone.is_naive(created_at) == settings.USE_TZ:
+        raise ValueError('カーソルの形式が正しくありません')
+    return created_at, int(pk)
+
+
+def keyset_page(queryset, size, after=None, before=None):
+    """
+    (created_at, id) の降順で1ページ分の行を取得
+    
+    afterを指定した場合はそのカーソルより古い行を、beforeを指定した場合は
+    そのカーソルより新しい行を取得します。どちらも指定しない場合は最新のページです。
+    次のページの有無は1行多く取得して判定します。
+    
+    Args:
+        queryset: 絞り込み済みのCryptoLogのクエリセット
+        size (int): 1ページの行数
+        after (str): 次のページを取得する場合のカーソル
+        before (str): 前のページを取得する場合のカーソル
+    
+    Returns:
+        tuple: (行のリスト, 次のページのカーソル, 前のページのカーソル)
+            次・前のページがない場合はカーソルがNone
+    
+    Raises:
+        ValueError: カーソルの形式が正しくない場合
+    """
+    if before:
+        created_at, pk = decode_cursor(before)
+        # created_at__gteでインデックスの範囲を絞り、同時刻の行はIDで比較する
+        rows = list(queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk),
+            created_at__gte=created_at,
+        ).order_by('created_at', 'pk')[:size + 1])
+        has_previous = len(rows) > size
+        rows = rows[:size][::-1]
+        has_next = True
+    else:
+        if after:
+            created_at, pk = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+                created_at__lte=created_at,
+            )
+        rows = list(queryset.order_by('-created_at', '-pk')[:size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = bool(after)
+
+    if not rows:
+        return rows, None, None
+    return (
+        rows,
+        encode_cursor(rows[-1]) if has_next else None,
+        encode_cursor(rows[0]) if has_previous else None,
+    )
@@ -0,0 +1,193 @@
+"""
+大量の行のプロセス並列処理
+
+このモジュールは複数テキストの一括処理を、プロセス内で直接（インライン）または
+常駐するプロセスプールで並列に実行します。
+
+行数が設定のCRYPTO_PARALLEL_THRESHOLD以上の場合のみ、入力をチャンクに分割して
+プロセスプールのワーカーに振り分けます。それ未満の場合はプロセス間通信の
+コストがかからないようにインラインで処理します。どちらの場合も、結果は入力と同じ順序で、
+失敗した行のエラーは行ごとに返します。
+
+プロセスプールは全ワーカーを起動してから（プレウォーム）使用し、
+以降のリクエストで使い回します。設定のCRYPTO_PARALLEL_PREWARMが有効な場合は
+アプリケーションの起動時（AppConfig.ready）に作成するため、最初のバッチ処理の
+リクエストもワーカーの起動を待ちません。無効の場合は最初の使用時に作成します。
+"""
+
+import atexit
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .cache import cached_process, cached_process_many
+from .codecs import get_codec
+
+
+logger = logging.getLogger(__name__)
+
+def apply_codec(codec, texts, decrypt=False, params=None):
+    """
+    複数テキストをコーデックで一括処理
+    
+    まずコーデックの一括処理（encrypt_many/decrypt_many）を使用し、
+    途中で例外が発生した場合は1件ずつ処理し直して、エラーを行ごとに返します。
+    決定的な方式の結果はキャッシュを使用します（crypto.cacheを参照）。
+    
+    Args:
+        codec: 使用するコーデック
+        texts (list): 処理対象のテキスト
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+    
+    Returns:
+        list: 入力と同じ順序の (結果, エラーメッセージ) のタプルのリスト
+    """
+    params = params or {}
+
+    try:
+        return [(output, None) for output in cached_process_many(codec, texts, decrypt, params)]
+    except Exception:
+        pass
+
+    outcomes = []
+    for text in texts:
+        try:
+            outcomes.append((cached_process(codec, text, decrypt, params), None))
+        except Exception as e:
+            outcomes.append((None, str(e)))
+    return outcomes
+
+
+def _init_worker():
+    """
+    ワーカープロセスの初期化
+    
+    fork で起動したワーカーは親プロセスの乱数状態を引き継ぐため、
+    ランダム置換暗号の変換規則がワーカー間で重複しないように再シードします。
+    """
+    random.seed()
+
+
+def _warm_up():
+    """ワーカーの起動を確認するための空の処理"""
+    return os.getpid()
+
+
+def _apply_chunk(method, texts, decrypt, params):
+    """ワーカープロセスで1チャンク分の行を処理（方式名からコーデックを取得）"""
+    return apply_codec(get_codec(method), texts, decrypt, params)
+
+
+_pool = None
+_pool_pid = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _worker_count():
+    """設定のワーカー数（未指定の場合はCPUコア数）"""
+    workers = getattr(settings, 'CRYPTO_PARALLEL_WORKERS', None)
+    if workers is None:
+        return os.cpu_count() or 1
+    return workers
+
+
+def get_pool():
+    """
+    常駐するプロセスプールを取得（初回呼び出し時に作成し、全ワーカーを起動）
+    
+    フォーク後の子プロセス（アプリケーションサーバーのワーカーなど）では、
+    親プロセスのプールを使わずに新しく作成します。
+    
+    Returns:
+        ProcessPoolExecutor: プロセスプール（ワーカー数が1以下の場合はNone）
+    """
+    global _pool, _pool_pid, _pool_workers
+    workers = _worker_count()
+    if workers <= 1:
+        return None
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid() and _pool_workers != workers:
+            # ワーカー数の設定が変わった場合は作り直す
+            _pool.shutdown()
+            _pool = None
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            _pool_pid = os.getpid()
+            _pool_workers = workers
+            # ワーカーは必要に応じて起動されるため、ワーカー数分の処理を投入して起動しておく
+            for future in [_pool.submit(_warm_up) for _ in range(workers)]:
+                future.result()
+        return _pool
+
+
+def prewarm_pool():
+    """
+    設定のCRYPTO_PARALLEL_PREWARMが有効な場合に、プロセスプールを作成して全ワーカーを起動
+    
+    アプリケーションの起動時に呼び出します。プールを作成できなくても起動は続け、
+    最初のバッチ処理で作成し直します。
+    """
+    if not getattr(settings, 'CRYPTO_PARALLEL_PREWARM', False):
+        return
+    try:
+        get_pool()
+    except Exception:
+        logger.exception('プロセスプールの起動に失敗しました')
+
+
+def shutdown_pool():
+    """プロセスプールを停止（次回のget_pool()で作成し直す）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def run_batch(codec, texts, decrypt=False, params=None):
+    """
+    複数テキストを一括処理（大量の場合はプロセスプールで並列に処理）
+    
+    Args:
+        codec: 使用するコーデック
+        texts (list): 処理対象のテキスト
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+    
+    Returns:
+        list: 入力と同じ順序の (結果, エラーメッセージ) のタプルのリスト
+    """
+    params = params or {}
+    threshold = getattr(settings, 'CRYPTO_PARALLEL_THRESHOLD', 5000)
+    if len(texts) < threshold:
+        return apply_codec(codec, texts, decrypt, params)
+
+    pool = get_pool()
+    if pool is None:
+        return apply_codec(codec, texts, decrypt, params)
+
+    # ワーカーあたり数チャンクに分け、処理時間の偏りを均す
+    size = max(1, -(-len(texts) // (_pool_workers * 4)))
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+    try:
+        results = pool.map(
+            _apply_chunk,
+            [codec.name] * len(chunks), chunks,
+            [decrypt] * len(chunks), [params] * len(chunks)
+        )
+        return [outcome for outcomes in results for outcome in outcomes]
+    except BrokenProcessPool:
+        # ワーカーが異常終了した場合はプールを作り直し、今回はインラインで処理する
+        shutdown_pool()
+        return apply_codec(codec, texts, decrypt, params)
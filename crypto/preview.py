@@ -0,0 +1,281 @@
+"""
+リアルタイムプレビューの差分（デルタ）プロトコル
+
+大きな文書のプレビューで、入力のたびにテキスト全体を送信・暗号化しないように、
+編集内容（位置, 削除した文字数, 挿入したテキスト）だけを受け取って、
+影響を受ける範囲のみを暗号化し直します。
+
+1. クライアントは最初にテキスト全体を送信し、サーバーはテキストを文書として
+   キャッシュに保持して、文書IDとリビジョン番号を返します。
+2. 以降は編集内容とリビジョン番号を送信し、サーバーは保持しているテキストに
+   編集を適用して、暗号文の変化した範囲（位置, 削除する文字数, 挿入する暗号文）だけを返します。
+3. 文書が見つからない場合やリビジョンが一致しない場合は、クライアントは
+   テキスト全体を送信し直します。
+
+差分に対応するのは、各文字の暗号文が位置から計算できる方式（Caesar, ROT13, Atbash,
+数字置換, Binary）と、英字の数からキーワードの位置を求められるVigenère暗号です。
+位置はすべてコードポイント単位です。
+
+1回の編集にかかる処理が文書の長さに比例しないように、文書は一定の長さ
+（設定のCRYPTO_PREVIEW_CHUNK_SIZE文字）のチャンクに分けて、チャンクごとに別のキーで
+キャッシュに保持します。リビジョンごとの索引には各チャンクのキー・文字数・英字の数・
+UTF-8でのバイト数だけを保持し、編集では編集範囲を含むチャンクだけを読み込んで
+新しいキーで保存し直します。編集位置より前の英字の数・バイト数は索引から求めます。
+
+チャンクは書き換えず、新しいリビジョンの索引はcache.addで作成するため、
+同じリビジョンに対する編集が同時に届いた場合は、一方だけが適用されます
+（もう一方は全文の再送信を求められます）。編集されないチャンクが保持期間を過ぎて
+削除された場合も、全文の再送信を求めます。
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .codecs import get_codec
+from .utils import _count_letters, _vigenere, _vigenere_shifts
+
+
+class StaleDocument(Exception):
+    """文書が見つからない、またはリビジョンが一致しない（全文の再送信が必要）"""
+
+
+def _char_offset(index, letters, size):
+    """1文字が1文字に変換される方式での暗号文の位置"""
+    return index
+
+
+def _number_offset(index, letters, size):
+    """数字置換暗号での暗号文の位置（英字は2桁の数字になる）"""
+    return index + letters
+
+
+def _binary_offset(index, letters, size):
+    """Binary暗号での暗号文の位置（1バイトが8桁と区切りの空白になる）"""
+    return 9 * size
+
+
+# 方式名 → (index文字目の暗号文の開始位置を、index, その前の英字の数・UTF-8でのバイト数から
+# 求める関数, 文字間の区切り)
+_LAYOUTS = {
+    'caesar': (_char_offset, ''),
+    'rot13': (_char_offset, ''),
+    'atbash': (_char_offset, ''),
+    'vigenere': (_char_offset, ''),
+    'number': (_number_offset, ''),
+    'binary': (_binary_offset, ' '),
+}
+
+
+def supports_delta(method):
+    """
+    差分プロトコルに対応している方式か
+    
+    Args:
+        method (str): 暗号化方式の名前
+    
+    Returns:
+        bool: 対応している場合はTrue
+    """
+    return method in _LAYOUTS
+
+
+def _cache():
+    return caches[getattr(settings, 'CRYPTO_PREVIEW_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'CRYPTO_PREVIEW_TIMEOUT', 1800)
+
+
+def _document_key(user_id, doc):
+    return f'crypto:preview:{user_id}:{doc}'
+
+
+def _revision_key(key, revision):
+    return f'{key}:rev:{revision}'
+
+
+def _check_size(length):
+    if length > getattr(settings, 'CRYPTO_PREVIEW_MAX_TEXT', 1000000):
+        raise ValueError('テキストが長すぎます')
+
+
+def _utf8_size(text):
+    return len(text) if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+
+
+def _split(text):
+    """テキストをCRYPTO_PREVIEW_CHUNK_SIZE文字以下のほぼ均等なチャンクに分割（空の場合は空のチャンク1つ）"""
+    size = getattr(settings, 'CRYPTO_PREVIEW_CHUNK_SIZE', 4096)
+    if len(text) <= size:
+        return [text]
+    step = -(-len(text) // -(-len(text) // size))
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+
+def _store_chunks(key, pieces):
+    """
+    チャンクを新しいキーで保存
+    
+    Returns:
+        list: 索引の項目 [キー, 文字数, 英字の数, UTF-8でのバイト数] のリスト
+    """
+    values = {}
+    entries = []
+    for piece in pieces:
+        chunk_key = f'{key}:chunk:{uuid.uuid4().hex}'
+        values[chunk_key] = piece
+        entries.append([chunk_key, len(piece), _count_letters(piece), _utf8_size(piece)])
+    _cache().set_many(values, _timeout())
+    return entries
+
+
+def _load_chunks(entries):
+    """索引の項目のチャンクを読み込んで連結（削除されていた場合はStaleDocument）"""
+    keys = [entry[0] for entry in entries]
+    found = _cache().get_many(keys)
+    if len(found) != len(keys):
+        raise StaleDocument()
+    return ''.join(found[key] for key in keys)
+
+
+def _span(chunks, start, end):
+    """
+    文書の範囲 [start, end) を含むチャンクの範囲を求める
+    
+    Returns:
+        tuple: (最初のチャンクの番号, 最後のチャンクの次の番号, 最初のチャンクの開始位置,
+            それより前の英字の数, それより前のUTF-8でのバイト数)
+    """
+    first = base = letters = size = 0
+    while first < len(chunks) - 1 and base + chunks[first][1] <= start:
+        base += chunks[first][1]
+        letters += chunks[first][2]
+        size += chunks[first][3]
+        first += 1
+    last = first + 1
+    covered = base + chunks[first][1]
+    while last < len(chunks) and covered < end:
+        covered += chunks[last][1]
+        last += 1
+    return first, last, base, letters, size
+
+
+def start_document(user_id, method, params, text):
+    """
+    差分プロトコルの文書を作成
+    
+    Args:
+        user_id: ユーザーID（文書はユーザーごとに保持）
+        method (str): 暗号化方式の名前
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+        text (str): 文書のテキスト全体
+    
+    Returns:
+        tuple: (文書ID, リビジョン番号)
+    """
+    _check_size(len(text))
+    doc = uuid.uuid4().hex
+    key = _document_key(user_id, doc)
+    state = {'method': method, 'params': params, 'length': len(text),
+             'chunks': _store_chunks(key, _split(text))}
+    _cache().set(_revision_key(key, 0), state, _timeout())
+    return doc, 0
+
+
+def _encrypt_window(method, params, text, letters_before):
+    """文書の一部を暗号化（Vigenère暗号は前にある英字の数からキーワードの位置を求める）"""
+    if method == 'vigenere':
+        return _vigenere(text, _vigenere_shifts(params['keyword'], 1), letters_before)
+    return get_codec(method).encrypt(text, **params)
+
+
+def apply_delta(user_id, doc, revision, offset, delete, insert):
+    """
+    文書に編集を適用し、暗号文の変化した範囲を返す
+    
+    編集範囲の前後の1文字（区切りのある方式のみ）を含めた範囲だけを暗号化し直します。
+    Vigenère暗号で編集により英字の数がキーワード長の倍数以外だけ変わった場合は、
+    以降のキーワードの位置がずれるため、編集位置から末尾までを暗号化し直します。
+    読み込み・保存するのは、暗号化し直す範囲を含むチャンクだけです。
+    
+    Args:
+        user_id: ユーザーID
+        doc (str): 文書ID
+        revision (int): クライアントが保持しているリビジョン番号
+        offset (int): 編集位置
+        delete (int): 削除した文字数
+        insert (str): 挿入したテキスト
+    
+    Returns:
+        dict: {'revision': 新しいリビジョン番号, 'offset': 暗号文の変更位置,
+            'delete': 暗号文から削除する文字数, 'insert': 挿入する暗号文}
+    
+    Raises:
+        StaleDocument: 文書が見つからない、リビジョンが一致しない、
+            または同じリビジョンに対する別の編集が先に適用された場合
+        ValueError: 編集内容が不正な場合
+    """
+    cache = _cache()
+    key = _document_key(user_id, doc)
+    state = cache.get(_revision_key(key, revision))
+    if state is None:
+        raise StaleDocument()
+
+    method = state['method']
+    params = state['params']
+    chunks = state['chunks']
+    length = state['length']
+    if not isinstance(insert, str) or not (0 <= offset <= offset + delete <= length):
+        raise ValueError('編集内容が正しくありません')
+    new_length = length - delete + len(insert)
+    _check_size(new_length)
+    position, separator = _LAYOUTS[method]
+
+    # 暗号化し直す範囲（区切りのある方式では、区切りを含めるため前後の1文字も含める）
+    start = offset - 1 if separator and offset > 0 else offset
+    end = offset + delete + 1 if separator and offset + delete < length else offset + delete
+    first, last, base, letters_before, size_before = _span(chunks, start, end)
+    segment = _load_chunks(chunks[first:last])
+    if method == 'vigenere':
+        shift = _count_letters(insert) - _count_letters(segment[offset - base:offset + delete - base])
+        if shift % len(params['keyword']):
+            end = length
+            segment += _load_chunks(chunks[last:])
+            last = len(chunks)
+    # 削除で短くなったチャンクは次のチャンクとまとめる（チャンクが細かくなり続けないように）
+    if len(segment) - delete + len(insert) < getattr(settings, 'CRYPTO_PREVIEW_CHUNK_SIZE', 4096) // 2 \
+            and last < len(chunks):
+        segment += _load_chunks(chunks[last:last + 1])
+        last += 1
+    new_end = end - delete + len(insert)
+
+    def prefix(index):
+        """変更前の文書でindex文字目より前の (英字の数, UTF-8でのバイト数)"""
+        part = segment[:index - base]
+        return letters_before + _count_letters(part), size_before + _utf8_size(part)
+
+    # 変更前の暗号文での範囲（末尾の区切りは含めない）
+    output_start = position(start, *prefix(start))
+    output_end = position(end, *prefix(end)) - len(separator) if end > start else output_start
+
+    new_segment = segment[:offset - base] + insert + segment[offset + delete - base:]
+    window = new_segment[start - base:new_end - base]
+    encrypted = _encrypt_window(method, params, window, prefix(start)[0]) if window else ''
+
+    entries = _store_chunks(key, _split(new_segment))
+    new_state = dict(state, length=new_length, chunks=chunks[:first] + entries + chunks[last:])
+    if not cache.add(_revision_key(key, revision + 1), new_state, _timeout()):
+        # 同じリビジョンに対する別の編集が先に適用された
+        cache.delete_many([entry[0] for entry in entries])
+        raise StaleDocument()
+    cache.delete_many([_revision_key(key, revision)] + [entry[0] for entry in chunks[first:last]])
+
+    return {
+        'revision': revision + 1,
+        'offset': output_start,
+        'delete': output_end - output_start,
+        'insert': encrypted,
+    }
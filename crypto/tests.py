@@ -1,8 +1,44 @@
-from django.test import TestCase, Client
+import hashlib
+import json
+import random
+import uuid
+import warnings
+from datetime import timedelta
+from io import StringIO
+from unittest import skipIf, skipUnless
+from unittest.mock import patch
+
+from django.test import AsyncClient, TestCase, Client, override_settings
+from django.apps import apps
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import caches
 from django.urls import reverse
-from .models import CryptoLog
-from .utils import caesar_encrypt, caesar_decrypt, base64_encrypt, base64_decrypt
+from django.utils import timezone
+from .cache import cache_stats, cached_process, cached_process_many, reset_cache_stats
+from .codecs import CODECS, compile_chain, get_codec
+from .fields import COMPRESSED_PREFIX
+from .files import ERROR_MARKER
+from .logwriter import LogWriter, save_logs
+from .models import CryptoLog, TextBlob
+from .pagination import decode_cursor
+from . import parallel
+from .parallel import apply_codec, get_pool, run_batch, shutdown_pool
+from .preview import StaleDocument, apply_delta, start_document
+from . import utils
+from .utils import (
+    caesar_encrypt, caesar_decrypt, base64_encrypt, base64_decrypt,
+    base64url_encrypt, base64url_decrypt,
+    rot13_encrypt, atbash_encrypt,
+    vigenere_encrypt, vigenere_decrypt,
+    morse_encrypt, morse_decrypt,
+    number_encrypt, number_decrypt, binary_encrypt, binary_decrypt,
+    encrypt_stream, decrypt_stream,
+    random_substitution_encrypt, random_substitution_decrypt,
+)
 
 class CryptoUtilsTest(TestCase):
     def test_caesar_encrypt_decrypt(self):
@@ -19,6 +55,227 @@ class CryptoUtilsTest(TestCase):
         decrypted = base64_decrypt(encrypted)
         self.assertEqual(original, decrypted)
 
+    def test_base64_variants(self):
+        """URLセーフ形式・bytes入力・空白やパディング省略を含む暗号文のテスト"""
+        original = "Hello?>~ 世界"
+        encrypted = base64url_encrypt(original)
+        self.assertNotIn('+', encrypted)
+        self.assertNotIn('/', encrypted)
+        self.assertEqual(base64url_decrypt(encrypted.rstrip('=')), original)
+        self.assertEqual(base64_encrypt(memoryview(b"Hello")), "SGVsbG8=")
+        self.assertEqual(base64_decrypt(b"SGVs\r\n bG8"), "Hello")
+        with self.assertRaises(ValueError):
+            base64_decrypt("S")
+
+    def test_stream_base64_wrapped_input(self):
+        """改行で折り返されたBase64暗号文を逐次復号できるかテスト"""
+        original = "Attack at dawn こんにちは " * 30
+        encrypted = base64_encrypt(original)
+        wrapped = '\n'.join(encrypted[i:i+76] for i in range(0, len(encrypted), 76))
+        chunks = [wrapped[i:i+7] for i in range(0, len(wrapped), 7)]
+        self.assertEqual(''.join(decrypt_stream('base64', chunks)), original)
+        # bytes系のチャンクもコピーせずにエンコードできる
+        self.assertEqual(
+            ''.join(encrypt_stream('base64', [b"ab", bytearray(b"c"), memoryview(b"defg")])),
+            base64_encrypt(b"abcdefg")
+        )
+
+    def test_substitution_ciphers_ascii_only(self):
+        """置換系暗号がASCII英字のみを変換し、日本語を保持するかテスト"""
+        self.assertEqual(caesar_encrypt("Hello, xyz!"), "Khoor, abc!")
+        self.assertEqual(rot13_encrypt("Hello"), "Uryyb")
+        self.assertEqual(atbash_encrypt("Hello"), "Svool")
+        self.assertEqual(caesar_encrypt("こんにちは Hello 漢字"), "こんにちは Khoor 漢字")
+        self.assertEqual(atbash_encrypt("ÉCOLE"), "ÉXLOV")
+
+    def test_random_substitution_encrypt_decrypt(self):
+        """ランダム置換暗号の暗号化・復号化テスト"""
+        original = "Hello World こんにちは"
+        encrypted = random_substitution_encrypt(original)
+        self.assertEqual(random_substitution_decrypt(encrypted), original)
+
+    def test_vigenere_encrypt_decrypt(self):
+        """Vigenère暗号の暗号化・復号化テスト"""
+        self.assertEqual(vigenere_encrypt("Hello"), "Lrncm")
+        original = "Hello こんにちは World" * 1000
+        self.assertEqual(vigenere_decrypt(vigenere_encrypt(original)), original)
+
+    @skipIf(utils.np is None, "NumPyがインストールされていません")
+    def test_vigenere_numpy_matches_python(self):
+        """NumPy版とPython版のVigenère暗号の結果が一致するかテスト"""
+        text = "Attack at dawn! 夜明けに攻撃 " * 500
+        shifts = utils._vigenere_shifts("LEMON", 1)
+        for start in (0, 3):
+            self.assertEqual(
+                utils._vigenere_numpy(text, shifts, start),
+                utils._vigenere_python(text, shifts, start)
+            )
+
+    def test_morse_encrypt_decrypt(self):
+        """モールス信号の暗号化・復号化テスト"""
+        self.assertEqual(morse_encrypt("Hi 5"), ".... .. / .....")
+        self.assertEqual(morse_encrypt("a!"), ".- !")
+        self.assertEqual(morse_decrypt(".... ..  / ..... ?"), "HI 5?")
+        # 改行も区切りとして扱い、改行はそのまま保持する
+        self.assertEqual(morse_decrypt("....\n..\n"), "H\nI\n")
+        self.assertEqual(morse_decrypt(morse_encrypt("a\nb")), "A\nB")
+
+    def test_number_encrypt_decrypt(self):
+        """数字置換暗号の暗号化・復号化テスト（範囲外の数字の扱いを含む）"""
+        self.assertEqual(number_encrypt("Hello あ"), "0805121215 あ")
+        self.assertEqual(number_decrypt("0805121215"), "HELLO")
+        self.assertEqual(number_decrypt("2701 00 9"), "27A 00 I")
+        self.assertEqual(number_decrypt("A1-5"), "A1-E")
+
+    def test_binary_encrypt_decrypt(self):
+        """Binary暗号がUTF-8のバイト単位で変換されるかテスト"""
+        self.assertEqual(binary_encrypt("Hi"), "01001000 01101001")
+        self.assertEqual(binary_encrypt("é"), "11000011 10101001")
+        original = "Hello こんにちは"
+        self.assertEqual(binary_decrypt(binary_encrypt(original)), original)
+        # 旧形式（1文字を1つの二進数で表現）の暗号文も復号できる
+        self.assertEqual(binary_decrypt("11101001 1000001"), "éA")
+        self.assertEqual(binary_decrypt("0102"), "[エラー] 復号に失敗しました")
+
+    def test_stream_matches_whole_text(self):
+        """ストリーミング処理の結果が一括処理と一致するかテスト"""
+        original = "Hello World 123 こんにちは\nAttack at dawn 2025 " * 20
+        chunk_sizes = (1, 2, 5, 64)
+        for method in ('caesar', 'base64', 'base64url', 'morse', 'rot13', 'atbash',
+                       'vigenere', 'number', 'binary'):
+            encrypted = ''.join(encrypt_stream(method, [original]))
+            for size in chunk_sizes:
+                with self.subTest(method=method, size=size):
+                    chunks = [original[i:i+size] for i in range(0, len(original), size)]
+                    self.assertEqual(''.join(encrypt_stream(method, chunks)), encrypted)
+                    chunks = [encrypted[i:i+size] for i in range(0, len(encrypted), size)]
+                    self.assertEqual(
+                        ''.join(decrypt_stream(method, chunks)),
+                        ''.join(decrypt_stream(method, [encrypted]))
+                    )
+
+    def test_stream_newline_separated_tokens(self):
+        """改行区切りの暗号文を小さなチャンクで復号しても、保持する部分が1トークン分に収まるかテスト"""
+        for method, token, line_count in (('binary', '01001000', 200), ('morse', '....', 200)):
+            encrypted = '\n'.join([token] * line_count)
+            with self.subTest(method=method):
+                chunks = [encrypted[i:i+3] for i in range(0, len(encrypted), 3)]
+                pieces = list(decrypt_stream(method, chunks))
+                self.assertEqual(''.join(pieces), ''.join(decrypt_stream(method, [encrypted])))
+                self.assertGreater(len([piece for piece in pieces if piece]), line_count // 2)
+
+    def test_stream_number_dangling_digit(self):
+        """数字置換暗号のストリーミング復号でチャンク境界の数字を保持するかテスト"""
+        self.assertEqual(''.join(decrypt_stream('number', ['0', '8', '05 1', '9'])), 'HE S')
+        self.assertEqual(''.join(decrypt_stream('number', ['2', '7'])), number_decrypt('27'))
+
+    def test_stream_random_substitution_roundtrip(self):
+        """ランダム置換暗号のストリーミング暗号化・復号化テスト"""
+        encrypted = ''.join(encrypt_stream('random_substitution', ['Hello ', 'World']))
+        self.assertEqual(''.join(decrypt_stream('random_substitution', [encrypted])), 'Hello World')
+
+    def test_stream_unknown_method(self):
+        """未対応の方式でValueErrorが送出されるかテスト"""
+        with self.assertRaises(ValueError):
+            encrypt_stream('unknown', ['text'])
+
+class CodecRegistryTest(TestCase):
+    def test_all_methods_registered(self):
+        """すべての暗号化方式がレジストリに登録されているかテスト"""
+        self.assertEqual(list(CODECS), [value for value, _ in CryptoLog.ENCRYPTION_METHODS])
+        with self.assertRaises(ValueError):
+            get_codec('unknown')
+
+    def test_encrypt_many_decrypt_many(self):
+        """一括処理が単体処理と同じ順序・結果を返すかテスト"""
+        texts = ["Hello", "World", "こんにちは 123"]
+        for codec in CODECS.values():
+            with self.subTest(method=codec.name):
+                params = codec.clean_params({'chain': 'atbash>base64'})
+                encrypted = codec.encrypt_many(texts, **params)
+                self.assertEqual(
+                    codec.decrypt_many(encrypted, **params),
+                    [codec.decrypt(e, **params) for e in encrypted]
+                )
+                if codec.deterministic:
+                    self.assertEqual(encrypted, [codec.encrypt(t, **params) for t in texts])
+
+    def test_metadata(self):
+        """コーデックのメタデータのテスト"""
+        self.assertFalse(get_codec('random_substitution').deterministic)
+        self.assertTrue(get_codec('rot13').self_inverse)
+        self.assertFalse(get_codec('vigenere').position_independent)
+        self.assertEqual(get_codec('binary').expansion, 9.0)
+
+class KeyParamsTest(TestCase):
+    def test_caesar_and_vigenere_with_key(self):
+        """鍵パラメータ付きのCaesar暗号・Vigenère暗号のテスト"""
+        self.assertEqual(caesar_encrypt("abc", shift=1), "bcd")
+        self.assertEqual(caesar_decrypt("bcd", shift=27), "abc")
+        self.assertEqual(vigenere_encrypt("attackatdawn", keyword="LEMON"), "lxfopvefrnhr")
+        self.assertEqual(vigenere_decrypt("lxfopvefrnhr", keyword="lemon"), "attackatdawn")
+        with self.assertRaises(ValueError):
+            vigenere_encrypt("abc", keyword="KEY1")
+
+    def test_clean_params(self):
+        """コーデックの鍵パラメータ検証のテスト"""
+        self.assertEqual(get_codec('caesar').clean_params({}), {'shift': 3})
+        self.assertEqual(get_codec('caesar').clean_params({'shift': '5', 'keyword': 'X'}), {'shift': 5})
+        self.assertEqual(get_codec('vigenere').clean_params({'keyword': 'lemon'}), {'keyword': 'LEMON'})
+        self.assertEqual(get_codec('base64').clean_params({'shift': 5}), {})
+        with self.assertRaises(ValueError):
+            get_codec('caesar').clean_params({'shift': 'abc'})
+        # 真偽値や小数部のある数値は整数に切り捨てずにエラーにする（整数値の小数は受け付ける）
+        for shift in (True, 1.9):
+            with self.subTest(shift=shift), self.assertRaises(ValueError):
+                get_codec('caesar').clean_params({'shift': shift})
+        self.assertEqual(get_codec('caesar').clean_params({'shift': 2.0}), {'shift': 2})
+        with self.assertRaises(ValueError):
+            get_codec('vigenere').clean_params({'keyword': 'キー'})
+        # シフト数は0〜25に正規化し、キーワード・チェーンはCryptoLogの列の長さまで
+        self.assertEqual(get_codec('caesar').clean_params({'shift': 10 ** 30 + 1}), {'shift': (10 ** 30 + 1) % 26})
+        self.assertEqual(get_codec('caesar').clean_params({'shift': -1}), {'shift': 25})
+        with self.assertRaises(ValueError):
+            get_codec('vigenere').clean_params({'keyword': 'A' * 51})
+        with self.assertRaises(ValueError):
+            get_codec('chain').clean_params({'chain': ['vigenere:' + 'A' * 50] * 4})
+
+    def test_encrypt_stream_with_key(self):
+        """鍵パラメータ付きのストリーミング処理のテスト"""
+        chunks = ["attack", "at", "dawn"]
+        self.assertEqual(''.join(encrypt_stream('vigenere', chunks, keyword="LEMON")), "lxfopvefrnhr")
+        self.assertEqual(''.join(decrypt_stream('caesar', ["bcd"], shift=1)), "abc")
+
+class ChainTest(TestCase):
+    def test_fused_chain_matches_sequential(self):
+        """チェーンの結果が各方式を順に適用した結果と一致するかテスト"""
+        text = "Hello World こんにちは"
+        chain = compile_chain("atbash → caesar:5 → rot13 → base64")
+        self.assertEqual(str(chain), "atbash>caesar:5>rot13>base64")
+        # 単一換字式暗号の3段は1段に合成される
+        self.assertEqual(len(chain.stages), 2)
+        expected = base64_encrypt(rot13_encrypt(caesar_encrypt(atbash_encrypt(text), 5)))
+        self.assertEqual(chain.encrypt(text), expected)
+        self.assertEqual(chain.decrypt(expected), text)
+
+    def test_chain_with_random_substitution(self):
+        """ランダム置換暗号を含むチェーンの暗号化・復号化テスト"""
+        chain = compile_chain([
+            'random_substitution', {'method': 'vigenere', 'keyword': 'lemon'},
+            'atbash', 'caesar:2', 'random_substitution',
+        ])
+        self.assertFalse(chain.deterministic)
+        text = "Attack at dawn | 夜明け"
+        self.assertEqual(chain.decrypt(chain.encrypt(text)), text)
+        encrypted = ''.join(chain.encrypt_stream(iter([text[:4], text[4:]])))
+        self.assertEqual(''.join(chain.decrypt_stream(iter([encrypted]))), text)
+
+    def test_invalid_chain(self):
+        """不正なチェーン指定でValueErrorが送出されるかテスト"""
+        for spec in ('', 'unknown', 'base64:3', 'chain', ['caesar'] * 11):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                get_codec('chain').clean_params({'chain': spec})
+
 class CryptoViewsTest(TestCase):
     def setUp(self):
         """テストユーザーの作成"""
@@ -49,6 +306,541 @@ class CryptoViewsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(CryptoLog.objects.filter(user=self.user).exists())
 
+    def test_encrypt_post_with_shift(self):
+        """シフト数を指定した暗号化のPOSTテスト"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('encrypt'), {
+            'text': 'abc',
+            'method': 'caesar',
+            'shift': '1'
+        })
+        log = CryptoLog.objects.get(user=self.user)
+        self.assertEqual(log.encrypted_text, 'bcd')
+        self.assertEqual(log.shift, 1)
+        self.assertEqual(log.keyword, '')
+
+    def test_encrypt_post_with_chain(self):
+        """チェーンを指定した暗号化のPOSTテスト（ログは1件のみ）"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('encrypt'), {
+            'text': 'Hello',
+            'method': 'chain',
+            'chain': 'atbash, caesar:5, base64'
+        })
+        log = CryptoLog.objects.get(user=self.user)
+        self.assertEqual(log.chain, 'atbash>caesar:5>base64')
+        self.assertEqual(log.encrypted_text, base64_encrypt(caesar_encrypt(atbash_encrypt('Hello'), 5)))
+
+    def test_batch_encrypt_post(self):
+        """バッチ暗号化のPOSTテスト"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('batch_encrypt'), {
+            'texts': 'Hello\nWorld',
+            'method': 'rot13'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(CryptoLog.objects.filter(user=self.user).order_by('id').values_list('encrypted_blob__text', flat=True)),
+            ['Uryyb', 'Jbeyq']
+        )
+
+    @override_settings(CRYPTO_LOG_BATCH_SIZE=2)
+    def test_batch_decrypt_reports_errors_per_line(self):
+        """バッチ復号化で失敗した行のみエラーとなり、成功した行はまとめて保存されるかテスト"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('batch_decrypt'), {
+            'texts': 'SGVsbG8=\nS\nV29ybGQ=\nIQ==',
+            'method': 'base64'
+        })
+        self.assertEqual(response.status_code, 200)
+        results = response.context['results']
+        self.assertEqual([bool(result['error']) for result in results], [False, True, False, False])
+        self.assertEqual(
+            list(CryptoLog.objects.filter(user=self.user).order_by('id').values_list('original_blob__text', flat=True)),
+            ['Hello', 'World', '!']
+        )
+
+    @override_settings(CRYPTO_BATCH_PREVIEW_ROWS=2)
+    def test_batch_result_preview_and_export(self):
+        """バッチ結果ページは先頭の行のみを埋め込み、全件をCSV・NDJSONでダウンロードできるかテスト"""
+        self.client.login(username='testuser', password='testpass123')
+        
+        def save_with_concurrent_log(logs):
+            # 同じユーザーの別のリクエストの行が、バッチの行の間の主キーで保存された場合
+            errors = save_logs(logs[:1])
+            CryptoLog.objects.create(user=self.user, original_text='other', encrypted_text='b3RoZXI=',
+                                     method='base64', is_decryption=True)
+            return errors + save_logs(logs[1:])
+        
+        with patch('crypto.views.save_logs', side_effect=save_with_concurrent_log):
+            response = self.client.post(reverse('batch_decrypt'), {
+                'texts': 'SGVsbG8=\nS\nV29ybGQ=\nIiwi\nIQ==',
+                'method': 'base64'
+            })
+        self.assertEqual(CryptoLog.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(len(response.context['results']), 2)
+        self.assertEqual(response.context['total'], 5)
+        self.assertTrue(response.context['truncated'])
+        
+        url = reverse('batch_export') + '?' + response.context['export_query']
+        export = self.client.get(url + '&format=csv')
+        self.assertEqual(export['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            b''.join(export.streaming_content).decode('utf-8'),
+            '\ufeffNo.,暗号文,復号化結果\r\n1,SGVsbG8=,Hello\r\n2,V29ybGQ=,World\r\n'
+            '3,Iiwi,""","""\r\n4,IQ==,!\r\n'
+        )
+        export = self.client.get(url + '&format=ndjson')
+        lines = b''.join(export.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(json.loads(lines[1]), {'line': 2, 'original': 'World', 'encrypted': 'V29ybGQ='})
+        
+        # 他のユーザーの履歴はダウンロードできない
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(b''.join(self.client.get(url + '&format=ndjson').streaming_content), b'')
+
+    @override_settings(CRYPTO_UPLOAD_CHUNK_SIZE=5)
+    def test_file_upload_streams_and_logs_metadata(self):
+        """アップロードしたファイルをチャンク単位で処理し、メタデータのみを記録するかテスト"""
+        self.client.login(username='testuser', password='testpass123')
+        content = "Hello, 世界! Attack at dawn.\n" * 3
+        data = content.encode('utf-8')
+        for method, params in (('vigenere', {'keyword': 'lemon'}), ('binary', {}), ('morse', {})):
+            with self.subTest(method=method):
+                response = self.client.post(reverse('file_process'), {
+                    'file': SimpleUploadedFile('notes.txt', data),
+                    'method': method,
+                    'operation': 'encrypt',
+                    **params
+                })
+                self.assertIn(f'notes_{method}.txt', response['Content-Disposition'])
+                codec = get_codec(method)
+                output = b''.join(response.streaming_content).decode('utf-8')
+                self.assertEqual(output, codec.encrypt(content, **codec.clean_params(params)))
+        
+        # 復号化して元のファイルに戻るか
+        response = self.client.post(reverse('file_process'), {
+            'file': SimpleUploadedFile('notes_base64.txt', base64_encrypt(content).encode('ascii')),
+            'method': 'base64',
+            'operation': 'decrypt'
+        })
+        self.assertEqual(b''.join(response.streaming_content), data)
+        
+        log = CryptoLog.objects.filter(user=self.user, method='vigenere').get()
+        self.assertEqual((log.file_name, log.file_size), ('notes.txt', len(data)))
+        self.assertEqual(log.file_sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual((log.original_text, log.encrypted_text, log.keyword), ('', '', 'LEMON'))
+        self.assertTrue(CryptoLog.objects.filter(user=self.user, method='base64', is_decryption=True).exists())
+
+    def test_file_upload_errors(self):
+        """UTF-8でないファイルは送信前にエラーにし、途中のエラーは結果の最後に示すかテスト"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('file_process'), {
+            'file': SimpleUploadedFile('latin1.txt', 'café'.encode('latin-1')),
+            'method': 'caesar',
+            'operation': 'encrypt',
+            'shift': 3
+        })
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'UTF-8')
+        
+        # 有効な部分の後にUTF-8でない内容の暗号文があると、そこまでの結果の後にエラーの行を返す
+        ciphertext = base64_encrypt('Hello world!') + '/w=='
+        with override_settings(CRYPTO_UPLOAD_CHUNK_SIZE=8, FILE_UPLOAD_MAX_MEMORY_SIZE=0):
+            response = self.client.post(reverse('file_process'), {
+                'file': SimpleUploadedFile('broken.txt', ciphertext.encode('ascii')),
+                'method': 'base64',
+                'operation': 'decrypt'
+            })
+            output = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(output.startswith('Hello world!' + ERROR_MARKER))
+        self.assertFalse(CryptoLog.objects.filter(user=self.user).exists())
+
+    def test_bulk_log_fallback_reports_failed_rows(self):
+        """一括保存に失敗した場合に行ごとに保存し直すかテスト"""
+        logs = [
+            CryptoLog(user=self.user, original_text='a', encrypted_text='b', method='rot13'),
+            CryptoLog(user=self.user, original_text=None, encrypted_text='d', method='rot13'),
+            CryptoLog(user=self.user, original_text='e', encrypted_text='f', method='rot13'),
+        ]
+        errors = save_logs(logs)
+        self.assertEqual([error is not None for error in errors], [False, True, False])
+        self.assertEqual(CryptoLog.objects.filter(user=self.user).count(), 2)
+
+class ApiTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='apiuser', password='testpass123')
+        self.client.login(username='apiuser', password='testpass123')
+
+    def test_api_requires_login(self):
+        """未ログインの場合に401のJSONを返すかテスト"""
+        response = Client().post(reverse('api_encrypt'), '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_api_encrypt_and_invalid_json(self):
+        """暗号化APIの正常系と不正なJSONのテスト"""
+        response = self.client.post(
+            reverse('api_encrypt'), {'text': 'Hello', 'method': 'caesar', 'shift': 1},
+            content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'success': True, 'result': 'Ifmmp'})
+        response = self.client.post(
+            reverse('api_encrypt'), {'text': 'Hello', 'method': 'caesar', 'shift': 10 ** 30 + 1},
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['success'], True)
+        self.assertEqual(CryptoLog.objects.latest('pk').shift, (10 ** 30 + 1) % 26)
+        for shift in (1.9, True):
+            with self.subTest(shift=shift):
+                response = self.client.post(
+                    reverse('api_encrypt'), {'text': 'Hello', 'method': 'caesar', 'shift': shift},
+                    content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('整数', response.json()['error'])
+        response = self.client.post(reverse('api_decrypt'), '[1, 2', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_rejects_non_string_method(self):
+        """方式名が文字列でない（ハッシュできない）場合に未対応の方式として扱うかテスト"""
+        for name, data in (('api_encrypt', {'text': 'Hello'}), ('api_decrypt', {'encrypted': 'Uryyb'})):
+            with self.subTest(view=name):
+                response = self.client.post(reverse(name), {**data, 'method': [1]},
+                                            content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], '未対応の暗号方式です')
+        response = self.client.post(reverse('api_bulk_process'), {'texts': ['Hello'], 'method': [1]},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['results'][0]['error'], '未対応の暗号方式です')
+        response = self.client.post(reverse('api_bulk_stream'), json.dumps({'text': 'Hello', 'method': {}}),
+                                    content_type='application/x-ndjson')
+        line = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(line['error'], '未対応の暗号方式です')
+        response = self.client.post(reverse('encrypt_preview'), {'text': 'Hello', 'method': [1]},
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {'success': False, 'error': '未対応の暗号方式です'})
+        self.assertFalse(CryptoLog.objects.exists())
+
+    def test_api_bulk_stream(self):
+        """NDJSONのストリーミング一括処理APIのテスト"""
+        body = '\n'.join([
+            json.dumps({'id': 'a', 'text': 'Hello'}),
+            '{broken',
+            json.dumps({'text': 'Uryyb', 'method': 'rot13', 'operation': 'decrypt'}),
+            '',
+            json.dumps({'text': 'x', 'method': 'unknown'}),
+        ])
+        response = self.client.post(
+            reverse('api_bulk_stream') + '?method=caesar&shift=2', body,
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[0], {'line': 1, 'id': 'a', 'result': 'Jgnnq'})
+        self.assertIn('error', lines[1])
+        self.assertEqual(lines[2], {'line': 3, 'result': 'Hello'})
+        self.assertEqual(lines[3]['line'], 5)
+        self.assertIn('error', lines[3])
+        self.assertEqual(CryptoLog.objects.filter(user=self.user).count(), 2)
+
+class CodecCacheTest(TestCase):
+    def setUp(self):
+        caches['codecs'].clear()
+        reset_cache_stats()
+
+    def test_cache_hits_and_misses(self):
+        """同じ入力の2回目以降がキャッシュから返されるかテスト"""
+        codec = get_codec('vigenere')
+        params = codec.clean_params({'keyword': 'lemon'})
+        self.assertEqual(cached_process(codec, "attack", params=params), "lxfopv")
+        self.assertEqual(cached_process(codec, "attack", params=params), "lxfopv")
+        # 鍵・方向が異なればキャッシュのキーも異なる
+        self.assertEqual(cached_process(codec, "attack", params={'keyword': 'KEY'}),
+                         vigenere_encrypt("attack", "KEY"))
+        self.assertEqual(cached_process(codec, "lxfopv", decrypt=True, params=params), "attack")
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['misses'], 3)
+
+    def test_cache_many_deduplicates_lines(self):
+        """一括処理でキャッシュ済みの行と重複した行を処理しないかテスト"""
+        codec = get_codec('morse')
+        cached_process(codec, "SOS")
+        outputs = cached_process_many(codec, ["SOS", "HI", "HI", "OK"])
+        self.assertEqual(outputs, [morse_encrypt(text) for text in ["SOS", "HI", "HI", "OK"]])
+        self.assertEqual(cache_stats(), {'hits': 2, 'misses': 3, 'hit_rate': 0.4})
+
+    def test_nondeterministic_methods_are_not_cached(self):
+        """ランダム置換暗号（を含むチェーン）がキャッシュされないかテスト"""
+        codec = get_codec('random_substitution')
+        cached_process(codec, "Hello")
+        chain = get_codec('chain')
+        cached_process(chain, "Hello", params=chain.clean_params({'chain': 'random_substitution>rot13'}))
+        self.assertEqual(cache_stats()['hits'] + cache_stats()['misses'], 0)
+        cached_process(chain, "Hello", params=chain.clean_params({'chain': 'atbash>rot13'}))
+        self.assertEqual(cache_stats()['misses'], 1)
+
+    @override_settings(CRYPTO_CODEC_CACHE_MAX_TEXT=100)
+    def test_large_outputs_are_not_cached(self):
+        """入力が上限以下でも、結果が上限を超える場合はキャッシュに保存されないかテスト"""
+        codec = get_codec('binary')
+        cached_process(codec, "a" * 20)             # 結果は179文字
+        cached_process_many(codec, ["b" * 20, "c"])  # "c"の結果（8文字）のみ保存
+        cached_process_many(codec, ["a" * 20, "b" * 20, "c"])
+        self.assertEqual(cache_stats()['hits'], 1)
+        cached_process(codec, "a" * 200)
+        self.assertEqual(cache_stats()['misses'], 5)
+
+class ParallelBatchTest(TestCase):
+    def tearDown(self):
+        shutdown_pool()
+
+    @override_settings(CRYPTO_PARALLEL_THRESHOLD=10, CRYPTO_PARALLEL_WORKERS=2)
+    def test_run_batch_in_pool_matches_inline(self):
+        """プロセスプールでの並列処理が順序と行ごとのエラーを保ったままインライン処理と一致するかテスト"""
+        codec = get_codec('vigenere')
+        params = codec.clean_params({'keyword': 'lemon'})
+        texts = [f"Attack at dawn {i}" for i in range(50)]
+        self.assertEqual(run_batch(codec, texts, params=params), apply_codec(codec, texts, params=params))
+
+        texts = [base64_encrypt(f"line {i}") for i in range(30)]
+        texts[7] = "S"
+        outcomes = run_batch(get_codec('base64'), texts, decrypt=True)
+        self.assertEqual([output for output, _ in outcomes[:3]], ["line 0", "line 1", "line 2"])
+        self.assertIsNone(outcomes[7][0])
+        self.assertIsNotNone(outcomes[7][1])
+        self.assertEqual(outcomes[29], ("line 29", None))
+
+    @override_settings(CRYPTO_PARALLEL_WORKERS=2)
+    def test_prewarm_on_app_ready(self):
+        """設定で有効な場合のみ、起動時の処理でプロセスプールが作成されるかテスト"""
+        app_config = apps.get_app_config('crypto')
+        app_config.ready()
+        self.assertIsNone(parallel._pool)
+        with override_settings(CRYPTO_PARALLEL_PREWARM=True):
+            app_config.ready()
+        self.assertIsNotNone(parallel._pool)
+        self.assertIs(get_pool(), parallel._pool)
+
+class AsyncViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='asyncuser', password='testpass123')
+
+    async def test_async_preview(self):
+        """非同期のプレビューAPIのテスト"""
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.post(
+            reverse('encrypt_preview'), {'text': 'Hello', 'method': 'vigenere', 'keyword': 'KEY'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'success': True, 'result': vigenere_encrypt('Hello', 'KEY')})
+        for body in ([1], {'text': 5, 'method': 'caesar'}):
+            with self.subTest(body=body):
+                response = await client.post(reverse('encrypt_preview'), body, content_type='application/json')
+                self.assertEqual(response.json()['success'], False)
+                self.assertNotIn('attribute', response.json()['error'])
+
+    @override_settings(CRYPTO_ASYNC_INLINE_LIMIT=0)
+    async def test_async_api_offloads_and_logs(self):
+        """大きな入力をスレッドで処理し、履歴を非同期に保存するかテスト"""
+        client = AsyncClient()
+        response = await client.post(reverse('api_decrypt'), {}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+        await client.aforce_login(self.user)
+        response = await client.post(
+            reverse('api_decrypt'), {'encrypted': 'Uryyb', 'method': 'rot13'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'success': True, 'result': 'Hello'})
+        self.assertEqual(await CryptoLog.objects.filter(user=self.user, is_decryption=True).acount(), 1)
+
+    async def test_file_process_streams_under_asgi(self):
+        """ASGIでファイルの処理結果を非同期イテレーターで1チャンクずつ返すかテスト"""
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        content = 'Attack at dawn.\n' * 100
+        # メモリ上のアップロードは1チャンクで読まれるため、一時ファイルに保存させる
+        with override_settings(CRYPTO_UPLOAD_CHUNK_SIZE=64, FILE_UPLOAD_MAX_MEMORY_SIZE=0):
+            response = await client.post(reverse('file_process'), {
+                'file': SimpleUploadedFile('notes.txt', content.encode('utf-8')),
+                'method': 'caesar',
+                'operation': 'encrypt',
+                'shift': 3
+            })
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks).decode('utf-8'), caesar_encrypt(content, 3))
+        log = await CryptoLog.objects.aget(user=self.user)
+        self.assertEqual(log.file_size, len(content))
+
+    @override_settings(CRYPTO_LOG_BATCH_SIZE=2)
+    async def test_bulk_stream_under_asgi(self):
+        """ASGIでNDJSONの一括処理結果をバッチごとに非同期イテレーターで返すかテスト"""
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        body = '\n'.join(json.dumps({'id': i, 'text': 'Hello'}) for i in range(5))
+        response = await client.post(
+            reverse('api_bulk_stream') + '?method=rot13', body, content_type='application/x-ndjson'
+        )
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        lines = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        self.assertEqual([line['id'] for line in lines], list(range(5)))
+        self.assertEqual({line['result'] for line in lines}, {'Uryyb'})
+        self.assertEqual(await CryptoLog.objects.filter(user=self.user).acount(), 5)
+
+    async def test_batch_export_streams_under_asgi(self):
+        """ASGIでバッチ処理結果のダウンロードを非同期イテレーターで1行ずつ返すかテスト"""
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        batch_id = uuid.uuid4()
+        await CryptoLog.objects.abulk_create([
+            CryptoLog(user=self.user, original_text=f'Hello{i}', encrypted_text=f'Uryyb{i}',
+                      method='rot13', batch_id=batch_id)
+            for i in range(3)
+        ])
+        response = await client.get(reverse('batch_export'), {
+            'method': 'rot13', 'mode': 'encrypt', 'batch': str(batch_id), 'format': 'ndjson'
+        })
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        lines = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        self.assertEqual([line['original'] for line in lines], ['Hello0', 'Hello1', 'Hello2'])
+
+    async def test_compare_all_methods(self):
+        """全方式の比較APIが各方式の暗号文・サイズ・処理時間を返すかテスト"""
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.post(
+            reverse('encrypt_compare'), {'text': 'Hello 世界', 'shift': 5, 'keyword': 'KEY'},
+            content_type='application/json'
+        )
+        results = {item['method']: item for item in response.json()['results']}
+        self.assertEqual(set(results), set(CODECS) - {'chain'})
+        self.assertEqual(results['caesar']['result'], caesar_encrypt('Hello 世界', 5))
+        self.assertEqual(results['vigenere']['result'], vigenere_encrypt('Hello 世界', 'KEY'))
+        self.assertEqual(results['base64url']['result'], base64url_encrypt('Hello 世界'))
+        self.assertEqual(results['binary']['result'], binary_encrypt('Hello 世界'))
+        self.assertEqual(results['caesar']['bytes'], len('Hello 世界'.encode('utf-8')))
+        self.assertEqual(results['binary']['length'], len(results['binary']['result']))
+        self.assertGreaterEqual(results['morse']['elapsed_ms'], 0)
+
+        # チェーンの指定が不正な場合はその方式だけがエラーになる
+        response = await client.post(
+            reverse('encrypt_compare'), {'text': 'Hello', 'chain': 'unknown'},
+            content_type='application/json'
+        )
+        results = {item['method']: item for item in response.json()['results']}
+        self.assertIn('error', results['chain'])
+        self.assertEqual(results['rot13']['result'], 'Uryyb')
+
+
+class PreviewDeltaTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='previewuser', password='testpass123')
+        self.client.login(username='previewuser', password='testpass123')
+
+    def preview(self, **data):
+        return self.client.post(reverse('encrypt_preview'), data, content_type='application/json').json()
+
+    def test_delta_matches_full_encryption(self):
+        """差分モードで返された範囲を適用した結果が全文の暗号化と一致するかテスト"""
+        edits = [(0, 0, "Hi "), (8, 3, "Vigenère"), (3, 5, ""), (11, 0, "x")]
+        for method, params in (('vigenere', {'keyword': 'lemon'}), ('number', {}), ('binary', {})):
+            codec = get_codec(method)
+            with self.subTest(method=method):
+                text = "Attack at dawn 世界"
+                response = self.preview(text=text, method=method, delta=True, **params)
+                output = response['result']
+                doc, revision = response['doc'], response['revision']
+                for offset, delete, insert in edits:
+                    delta = self.preview(doc=doc, revision=revision, offset=offset,
+                                         delete=delete, insert=insert)
+                    revision = delta['revision']
+                    output = output[:delta['offset']] + delta['insert'] + output[delta['offset'] + delta['delete']:]
+                    text = text[:offset] + insert + text[offset + delete:]
+                    self.assertEqual(output, codec.encrypt(text, **codec.clean_params(params)))
+
+    @override_settings(CRYPTO_PREVIEW_CHUNK_SIZE=8)
+    def test_delta_across_chunks(self):
+        """文書が複数のチャンクに分かれていても、ランダムな編集の結果が全文の暗号化と一致するかテスト"""
+        rng = random.Random(0)
+        for method, params in (('vigenere', {'keyword': 'lemon'}), ('number', {}), ('binary', {})):
+            codec = get_codec(method)
+            with self.subTest(method=method):
+                text = "Attack at dawn, 世界 " * 5
+                response = self.preview(text=text, method=method, delta=True, **params)
+                output = response['result']
+                doc, revision = response['doc'], response['revision']
+                for _ in range(40):
+                    offset = rng.randint(0, len(text))
+                    delete = rng.randint(0, min(12, len(text) - offset))
+                    insert = rng.choice(['', 'x', 'Hello 世界', 'abcdefghijklmnopqrst'])
+                    delta = self.preview(doc=doc, revision=revision, offset=offset,
+                                         delete=delete, insert=insert)
+                    revision = delta['revision']
+                    output = output[:delta['offset']] + delta['insert'] + output[delta['offset'] + delta['delete']:]
+                    text = text[:offset] + insert + text[offset + delete:]
+                    self.assertEqual(output, codec.encrypt(text, **codec.clean_params(params)))
+
+    @override_settings(CRYPTO_PREVIEW_CHUNK_SIZE=8)
+    def test_delta_reads_only_edited_chunks(self):
+        """編集では編集範囲のチャンクだけを読み書きし、同じリビジョンへの2つ目の編集は適用されないかテスト"""
+        user = User.objects.get(username='previewuser')
+        doc, revision = start_document(user.pk, 'rot13', {}, "abcdefgh" * 100)
+        cache = caches['default']
+        with patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            delta = apply_delta(user.pk, doc, revision, 400, 1, "Z")
+        self.assertEqual(delta, {'revision': 1, 'offset': 400, 'delete': 1, 'insert': 'M'})
+        self.assertEqual(sum(len(call.args[0]) for call in get_many.call_args_list), 1)
+        self.assertEqual(sum(len(call.args[0]) for call in set_many.call_args_list), 1)
+        with self.assertRaises(StaleDocument):
+            apply_delta(user.pk, doc, revision, 0, 0, "a")
+
+    def test_delta_resync(self):
+        """リビジョンの不一致・差分に未対応の方式で全文の再送信を求めるかテスト"""
+        response = self.preview(text="Hello", method='caesar', delta=True)
+        stale = self.preview(doc=response['doc'], revision=5, offset=0, delete=0, insert="a")
+        self.assertTrue(stale['resync'])
+        self.assertEqual(self.preview(doc='missing', revision=0, offset=0, delete=0, insert="a")['resync'], True)
+        self.assertNotIn('doc', self.preview(text=" Hello ", method='morse', delta=True))
+
+class LogWriterTest(TestCase):
+    def setUp(self):
+        self.batches = []
+
+    def save(self, logs):
+        """書き込まれた履歴をデータベースの代わりに記録する"""
+        self.batches.append(list(logs))
+        return [None] * len(logs)
+
+    def test_write_behind_batches_and_flushes_on_close(self):
+        """キューに積んだ履歴が件数ごとにまとめて書き込まれ、停止時に残りも書き込まれるかテスト"""
+        writer = LogWriter(save=self.save, batch_size=2, interval=0.05)
+        writer.start()
+        writer.submit(range(5))
+        writer.flush()
+        writer.close()
+        self.assertEqual(sum(self.batches, []), [0, 1, 2, 3, 4])
+        self.assertTrue(all(len(batch) <= 2 for batch in self.batches))
+        # 停止後に積まれた履歴は同期的に書き込まれる
+        writer.submit([5])
+        self.assertEqual(self.batches[-1], [5])
+
+    def test_backpressure_writes_synchronously_when_full(self):
+        """キューが満杯の場合に呼び出し元で同期的に書き込むかテスト"""
+        writer = LogWriter(save=self.save, max_size=1, put_timeout=0.01)
+        writer.submit(['a', 'b'])
+        self.assertEqual(self.batches, [['b']])
+        writer.close()
+        self.assertEqual(self.batches, [['b'], ['a']])
+
 class CryptoModelTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -67,3 +859,229 @@ class CryptoModelTest(TestCase):
         )
         self.assertEqual(str(log), 'testuser | Caesar暗号 | 暗号')
         self.assertFalse(log.is_decryption)
+
+    def _query_plans(self, url):
+        """ページを取得し、CryptoLogを読み込んだクエリの実行計画（EXPLAIN QUERY PLAN）を返す"""
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if query['sql'].startswith('SELECT') and '"crypto_cryptolog"' in query['sql']:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans.append(' / '.join(row[-1] for row in cursor.fetchall()))
+        self.assertTrue(plans)
+        return plans
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLANの形式はSQLite固有')
+    def test_history_queries_use_indexes(self):
+        """履歴ページと管理画面のクエリが複合インデックスを使い、並び替えを行わないかテスト"""
+        CryptoLog.objects.bulk_create([
+            CryptoLog(user=self.user, original_text='a', encrypted_text='b',
+                      method=method, is_decryption=is_decryption)
+            for method in ('caesar', 'rot13') for is_decryption in (False, True)
+        ])
+        self.client.login(username='testuser', password='testpass123')
+        expected = {
+            '': 'cryptolog_user_created_idx',
+            '?operation=decrypt': 'cryptolog_user_created_idx',
+            '?method=rot13': 'cryptolog_user_method_idx',
+            '?method=rot13&operation=encrypt': 'cryptolog_user_method_idx',
+        }
+        for query, index in expected.items():
+            with self.subTest(query=query):
+                for plan in self._query_plans(reverse('history') + query):
+                    self.assertIn(f'USING INDEX {index}', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+        User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        for plan in self._query_plans(reverse('admin:crypto_cryptolog_changelist') + '?method__exact=rot13'):
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    @override_settings(CRYPTO_HISTORY_PAGE_SIZE=3)
+    def test_history_keyset_pagination(self):
+        """履歴ページをカーソルで前後に辿れて、OFFSET・COUNTを使わないかテスト"""
+        CryptoLog.objects.bulk_create([
+            CryptoLog(user=self.user, original_text=str(i), encrypted_text=str(i), method='rot13')
+            for i in range(8)
+        ])
+        # 同時刻の行の順序もIDで決まるように、一部の作成日時を揃える
+        first = CryptoLog.objects.order_by('pk').first()
+        CryptoLog.objects.filter(pk__lte=first.pk + 4).update(created_at=first.created_at)
+        CryptoLog.objects.create(user=self.user, original_text='x', encrypted_text='x', method='caesar')
+        expected = list(CryptoLog.objects.filter(method='rot13')
+                        .order_by('-created_at', '-pk').values_list('pk', flat=True))
+        
+        self.client.login(username='testuser', password='testpass123')
+        pages = []
+        query = 'method=rot13'
+        with CaptureQueriesContext(connection) as context:
+            while query:
+                response = self.client.get(reverse('history') + '?' + query)
+                pages.append([log.pk for log in response.context['logs']])
+                query = response.context['next_query']
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        for captured in context.captured_queries:
+            self.assertNotIn('OFFSET', captured['sql'])
+            self.assertNotIn('COUNT(', captured['sql'])
+        
+        # 最後のページから前のページへ戻る（絞り込みの条件を引き継ぐ）
+        query = response.context['previous_query']
+        self.assertIn('method=rot13', query)
+        response = self.client.get(reverse('history') + '?' + query)
+        self.assertEqual([log.pk for log in response.context['logs']], pages[1])
+        response = self.client.get(reverse('history') + '?' + response.context['previous_query'])
+        self.assertEqual([log.pk for log in response.context['logs']], pages[0])
+        self.assertEqual(response.context['previous_query'], '')
+        
+        # 不正なカーソル・タイムゾーンのないカーソルは最新のページとして扱う
+        response = self.client.get(reverse('history') + '?after=invalid')
+        self.assertEqual(len(response.context['logs']), 3)
+        naive_cursor = f'{first.created_at.replace(tzinfo=None).isoformat()}_{first.pk + 1}'
+        with self.assertRaises(ValueError):
+            decode_cursor(naive_cursor)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            response = self.client.get(reverse('history'), {'method': 'rot13', 'after': naive_cursor})
+        self.assertEqual([log.pk for log in response.context['logs']], pages[0])
+
+    @override_settings(CRYPTO_HISTORY_PREVIEW_CHARS=5)
+    def test_history_previews_and_full_text(self):
+        """履歴一覧は本文を読み込まずに先頭部分と文字数を表示し、全文は個別に取得できるかテスト"""
+        log = CryptoLog.objects.create(user=self.user, original_text='Hello World',
+                                       encrypted_text=binary_encrypt('Hello World'), method='binary')
+        CryptoLog.objects.create(user=self.user, original_text='Hi', encrypted_text='Uv', method='rot13')
+        self.client.login(username='testuser', password='testpass123')
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('history'))
+        # 本文の遅延読み込み（行ごとの追加クエリ）が発生しない
+        self.assertEqual(sum('"crypto_cryptolog"' in query['sql'] for query in context.captured_queries), 1)
+        rows = {row.pk: row for row in response.context['logs']}
+        self.assertFalse(CryptoLog.original_blob.is_cached(rows[log.pk]))
+        self.assertFalse(CryptoLog.encrypted_blob.is_cached(rows[log.pk]))
+        self.assertEqual((rows[log.pk].original_preview, rows[log.pk].original_length), ('Hello', 11))
+        self.assertEqual(rows[log.pk].encrypted_length, len(binary_encrypt('Hello World')))
+        self.assertContains(response, 'Hello…')
+        self.assertContains(response, '<code>01001…</code>', html=True)
+        
+        response = self.client.get(reverse('history_text', args=[log.pk]))
+        self.assertEqual(response.json(), {'original_text': 'Hello World',
+                                           'encrypted_text': binary_encrypt('Hello World')})
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(reverse('history_text', args=[log.pk])).status_code, 404)
+    
+    def _stored_texts(self, log):
+        """データベースに保存された値（展開前）を取得"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT original.text, encrypted.text FROM crypto_cryptolog'
+                ' JOIN crypto_textblob original ON original.digest = original_blob_id'
+                ' JOIN crypto_textblob encrypted ON encrypted.digest = encrypted_blob_id'
+                ' WHERE id = %s', [log.pk]
+            )
+            return cursor.fetchone()
+    
+    @override_settings(CRYPTO_COMPRESS_THRESHOLD=1024)
+    def test_long_texts_are_stored_compressed(self):
+        """閾値以上のテキストは圧縮して保存され、読み込み・履歴・管理画面の検索では元のテキストとして扱われるかテスト"""
+        text = 'Hello World ' * 200
+        log = CryptoLog.objects.create(user=self.user, original_text=text,
+                                       encrypted_text=binary_encrypt(text), method='binary')
+        short = CryptoLog.objects.create(user=self.user, original_text=COMPRESSED_PREFIX + 'x',
+                                         encrypted_text='Hi', method='rot13')
+        
+        original, encrypted = self._stored_texts(log)
+        self.assertTrue(original.startswith(COMPRESSED_PREFIX))
+        self.assertLess(len(encrypted) * 50, len(binary_encrypt(text)))
+        # 接頭辞で始まる短いテキストも、圧縮したテキストと区別できるように保存される
+        self.assertEqual(self._stored_texts(short)[1], 'Hi')
+        self.assertEqual(CryptoLog.objects.get(pk=short.pk).original_text, COMPRESSED_PREFIX + 'x')
+        log.refresh_from_db()
+        self.assertEqual((log.original_text, log.encrypted_text), (text, binary_encrypt(text)))
+        
+        self.client.login(username='testuser', password='testpass123')
+        rows = {row.pk: row for row in self.client.get(reverse('history')).context['logs']}
+        self.assertEqual((rows[log.pk].original_preview, rows[log.pk].original_length), (text[:100], len(text)))
+        self.assertEqual(rows[log.pk].encrypted_preview, binary_encrypt(text)[:100])
+        self.assertEqual(rows[log.pk].encrypted_length, len(binary_encrypt(text)))
+        self.assertEqual(self.client.get(reverse('history_text', args=[log.pk])).json()['original_text'], text)
+        
+        User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        url = reverse('admin:crypto_cryptolog_changelist')
+        self.assertEqual([row.pk for row in self.client.get(url, {'q': 'world hello'}).context['cl'].result_list],
+                         [log.pk])
+        self.assertEqual([row.pk for row in self.client.get(url, {'q': 'Hi'}).context['cl'].result_list],
+                         [short.pk])
+    
+    def test_admin_add_stores_texts(self):
+        """管理画面の追加画面でテキストを入力して履歴を追加できるかテスト"""
+        admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.login(username='admin', password='adminpass123')
+        url = reverse('admin:crypto_cryptolog_add')
+        self.assertContains(self.client.get(url), 'name="original_text"')
+        response = self.client.post(url, {
+            'user': admin_user.pk,
+            'original_text': 'Hello',
+            'encrypted_text': 'Uryyb',
+            'method': 'rot13',
+            'keyword': '',
+            'chain': '',
+            'file_name': '',
+            'file_sha256': '',
+        })
+        self.assertRedirects(response, reverse('admin:crypto_cryptolog_changelist'))
+        log = CryptoLog.objects.get(user=admin_user)
+        self.assertEqual((log.original_text, log.encrypted_text), ('Hello', 'Uryyb'))
+        
+        # 変更画面ではテキストは編集できない
+        response = self.client.get(reverse('admin:crypto_cryptolog_change', args=[log.pk]))
+        self.assertNotContains(response, 'name="original_text"')
+        self.assertContains(response, 'Uryyb')
+    
+    def test_texts_are_deduplicated_and_collected(self):
+        """同じテキストは1行だけ保存され、参照されなくなったテキストはgc_text_blobsで削除されるかテスト"""
+        CryptoLog.objects.bulk_create([
+            CryptoLog(user=self.user, original_text='Hello', encrypted_text='Uryyb', method='rot13')
+            for _ in range(3)
+        ])
+        log = CryptoLog.objects.create(user=self.user, original_text='Uryyb', encrypted_text='Hello',
+                                       method='rot13', is_decryption=True)
+        other = CryptoLog.objects.create(user=self.user, original_text='Hi', encrypted_text='Uv', method='rot13')
+        self.assertEqual(TextBlob.objects.count(), 4)
+        self.assertEqual(CryptoLog.objects.get(pk=log.pk).original_text, 'Uryyb')
+        
+        other.delete()
+        # 猶予期間内に使用されたテキストは削除しない
+        call_command('gc_text_blobs', stdout=StringIO())
+        self.assertEqual(TextBlob.objects.count(), 4)
+        TextBlob.objects.update(used_at=timezone.now() - timedelta(hours=2))
+        call_command('gc_text_blobs', stdout=StringIO())
+        self.assertEqual(set(TextBlob.objects.values_list('text', flat=True)), {'Hello', 'Uryyb'})
+        CryptoLog.objects.filter(is_decryption=False).delete()
+        call_command('gc_text_blobs', batch_size=1, stdout=StringIO())
+        self.assertEqual(set(TextBlob.objects.values_list('text', flat=True)), {'Hello', 'Uryyb'})
+        log.delete()
+        call_command('gc_text_blobs', batch_size=1, stdout=StringIO())
+        self.assertFalse(TextBlob.objects.exists())
+    
+    def test_reused_texts_are_not_collected(self):
+        """保存済みのテキストを使用すると、履歴から参照される前でもgc_text_blobsで削除されないかテスト"""
+        CryptoLog.objects.create(user=self.user, original_text='Hello', encrypted_text='Uryyb', method='rot13')
+        CryptoLog.objects.all().delete()
+        TextBlob.objects.update(used_at=timezone.now() - timedelta(hours=2))
+        
+        # 履歴の保存中（テキストを保存した後、履歴を挿入する前）にコマンドが実行された場合
+        TextBlob.objects.store([TextBlob.for_text('Hello')])
+        out = StringIO()
+        call_command('gc_text_blobs', dry_run=True, stdout=out)
+        self.assertIn('1件', out.getvalue())
+        call_command('gc_text_blobs', stdout=StringIO())
+        self.assertEqual(list(TextBlob.objects.values_list('text', flat=True)), ['Hello'])
+        call_command('gc_text_blobs', grace=0, stdout=StringIO())
+        self.assertFalse(TextBlob.objects.exists())
+
@@ -26,6 +26,9 @@ urlpatterns = [
     # 履歴表示ページ
     path('history/', views.history_view, name='history'),
     
+    # 履歴の全文（一覧で行を展開したときに取得）
+    path('history/<int:log_id>/text/', views.history_text, name='history_text'),
+    
     # 履歴削除機能
     path('history/delete/<int:log_id>/', views.delete_history, name='delete_history'),
     path('history/clear/', views.clear_all_history, name='clear_all_history'),
@@ -33,10 +36,22 @@ urlpatterns = [
     # ログアウト処理（カスタムビューを使用）
     path('logout/', views.logout_view, name='logout'),
     
+    # JSON API（バージョン1）
+    path('api/v1/encrypt/', views.api_encrypt, name='api_encrypt'),
+    path('api/v1/decrypt/', views.api_decrypt, name='api_decrypt'),
+    path('api/v1/bulk/', views.api_bulk_process, name='api_bulk_process'),
+    path('api/v1/bulk/stream/', views.api_bulk_stream, name='api_bulk_stream'),
+    path('api/v1/cache/stats/', views.api_cache_stats, name='api_cache_stats'),
+    
     # Ajax API（リアルタイムプレビュー用）
     path('api/encrypt-preview/', views.encrypt_preview, name='encrypt_preview'),
+    path('api/encrypt-compare/', views.encrypt_compare, name='encrypt_compare'),
     
     # バッチ処理（複数テキスト処理）
     path('batch/', views.batch_encrypt_view, name='batch_encrypt'),
     path('batch/decrypt/', views.batch_decrypt_view, name='batch_decrypt'),
+    path('batch/export/', views.batch_export, name='batch_export'),
+    
+    # ファイルアップロードによる暗号化・復号化（結果はダウンロード）
+    path('file/', views.file_process_view, name='file_process'),
 ]
@@ -6,7 +6,7 @@
 
 対応している暗号化方式:
 - Caesar暗号: 文字を固定数だけシフト
-- Base64: Base64エンコード/デコード
+- Base64: Base64エンコード/デコード（標準形式・URLセーフ形式）
 - ランダム置換暗号: アルファベットをランダムに置換
 - モールス信号: モールス信号形式でエンコード
 - ROT13: 13文字シフトのCaesar暗号
@@ -16,9 +16,114 @@
 - Binary暗号: テキストを二進数で表現
 """
 
-import base64
+import binascii
+import codecs
 import random
+import re
 import string
+from functools import lru_cache
+
+try:
+    # NumPyは任意依存（大きな入力のVigenère暗号の高速化に使用）
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 置換暗号で対象とするASCII英字
+# isalpha()はかな・漢字でもTrueになるため、ASCII英字のみを明示的に扱う
+_LOWER = string.ascii_lowercase
+_UPPER = string.ascii_uppercase
+
+
+@lru_cache(maxsize=128)
+def _substitution_table(lower_mapping):
+    """
+    単一換字式暗号用の変換テーブルを作成（キャッシュ付き）
+    
+    a〜zの置換先を並べた26文字の文字列から、str.translate用の
+    変換テーブルを作成します。大文字は対応する大文字に置換され、
+    ASCII英字以外の文字は変換されません。
+    
+    Args:
+        lower_mapping (str): a〜zそれぞれの置換先を順に並べた文字列
+    
+    Returns:
+        dict: str.translateに渡す変換テーブル
+    """
+    return str.maketrans(_LOWER + _UPPER, lower_mapping + lower_mapping.upper())
+
+
+def _caesar_table(shift):
+    """
+    指定シフト数のCaesar暗号用変換テーブルを取得
+    
+    Args:
+        shift (int): シフト数（負の値や26以上も可）
+    
+    Returns:
+        dict: str.translateに渡す変換テーブル
+    """
+    return _substitution_table(caesar_mapping(shift))
+
+
+# ---------------------------------------------------------------------------
+# 単一換字式暗号のマッピング
+#
+# Caesar暗号・ROT13・Atbash暗号・ランダム置換暗号は、いずれも
+# 「a〜zの置換先を並べた26文字の文字列」（マッピング）で表現できます。
+# マッピング同士は合成できるため、複数の方式を連続して適用する場合も
+# 1つの変換テーブルにまとめて1回のtranslateで処理できます。
+# ---------------------------------------------------------------------------
+
+def caesar_mapping(shift=3):
+    """Caesar暗号（シフト数shift）のマッピングを返す"""
+    shift %= 26
+    return _LOWER[shift:] + _LOWER[:shift]
+
+
+def atbash_mapping():
+    """Atbash暗号のマッピングを返す"""
+    return _LOWER[::-1]
+
+
+def random_mapping():
+    """ランダム置換暗号用のランダムなマッピングを返す"""
+    mapping = generate_random_mapping()
+    return ''.join(mapping[c] for c in _LOWER)
+
+
+def compose_mappings(first, second):
+    """
+    2つのマッピングを合成
+    
+    Args:
+        first (str): 先に適用するマッピング
+        second (str): 後に適用するマッピング
+    
+    Returns:
+        str: firstを適用してからsecondを適用するのと同じマッピング
+    """
+    return first.translate(_substitution_table(second))
+
+
+def invert_mapping(mapping):
+    """マッピングの逆変換（復号用のマッピング）を返す"""
+    return _LOWER.translate(str.maketrans(mapping, _LOWER))
+
+
+def substitute(text, mapping):
+    """
+    マッピングに従ってテキストのASCII英字を置換
+    
+    Args:
+        text (str): 対象のテキスト
+        mapping (str): a〜zの置換先を順に並べた26文字の文字列
+    
+    Returns:
+        str: 置換後のテキスト
+    """
+    return text.translate(_substitution_table(mapping))
 
 
 def caesar_encrypt(text, shift=3):
@@ -34,17 +139,8 @@ def caesar_encrypt(text, shift=3):
     Returns:
         str: 暗号化されたテキスト
     """
-    result = ''
-    for char in text:
-        if char.isalpha():
-            # 大文字・小文字の判定とベース文字の設定
-            base = ord('A') if char.isupper() else ord('a')
-            # シフト処理（26文字でのループ処理）
-            result += chr((ord(char) - base + shift) % 26 + base)
-        else:
-            # アルファベット以外はそのまま
-            result += char
-    return result
+    # ASCII英字のみシフトし、それ以外の文字はそのまま
+    return text.translate(_caesar_table(shift))
 
 
 def caesar_decrypt(text, shift=3):
@@ -63,36 +159,119 @@ def caesar_decrypt(text, shift=3):
     return caesar_encrypt(text, -shift)
 
 
-def base64_encrypt(text):
+# URLセーフ形式（RFC 4648 §5）と標準形式のアルファベットの変換テーブル
+_URLSAFE_ENCODE = bytes.maketrans(b'+/', b'-_')
+_URLSAFE_DECODE = bytes.maketrans(b'-_', b'+/')
+
+# 貼り付けられた暗号文に含まれうる空白・改行
+_BASE64_WHITESPACE = b' \t\n\r\v\f'
+
+
+def _as_buffer(data):
+    """
+    文字列はUTF-8でエンコードし、bytes系のオブジェクトはコピーせずに返す
+    
+    Args:
+        data: 文字列、またはbytes・bytearray・memoryviewなどのバッファ
+    
+    Returns:
+        bytes または memoryview: binasciiの関数にそのまま渡せるバッファ
+    """
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    return memoryview(data)
+
+
+def _base64_decode(data, urlsafe=False):
+    """
+    Base64の暗号文をバイト列にデコード
+    
+    空白・改行はbinasciiが読み飛ばすため、取り除かずにそのままデコードします。
+    パディング（=）が省略されている場合は補ってから再試行します。
+    
+    Args:
+        data: Base64の暗号文（ASCII文字列、またはbytes系のバッファ）
+        urlsafe (bool): URLセーフ形式（- と _ を使用）の暗号文かどうか
+    
+    Returns:
+        bytes: デコードされたバイト列
+    
+    Raises:
+        ValueError: 暗号文が不正な場合（binascii.Error, UnicodeEncodeErrorを含む）
+    """
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    if urlsafe:
+        # bytesに対するbytes()はコピーを作らない
+        data = bytes(data).translate(_URLSAFE_DECODE)
+    try:
+        return binascii.a2b_base64(data)
+    except binascii.Error:
+        # 余分なパディングは無視されるため、常に2文字補えば足りる
+        return binascii.a2b_base64(bytes(data) + b'==')
+
+
+def base64_encrypt(text, urlsafe=False):
     """
     Base64による暗号化（エンコード）
     
     テキストをBase64形式でエンコードします。
+    bytes系のオブジェクトを渡した場合は、コピーせずにそのままエンコードします。
     
     Args:
-        text (str): 暗号化対象のテキスト
+        text: 暗号化対象のテキスト（文字列、またはbytes系のバッファ）
+        urlsafe (bool): URLセーフ形式（+ と / の代わりに - と _ を使用）にするか
     
     Returns:
         str: Base64でエンコードされたテキスト
     """
-    encoded_bytes = base64.b64encode(text.encode('utf-8'))
-    return encoded_bytes.decode('utf-8')
+    encoded = binascii.b2a_base64(_as_buffer(text), newline=False)
+    if urlsafe:
+        encoded = encoded.translate(_URLSAFE_ENCODE)
+    return encoded.decode('ascii')
 
 
-def base64_decrypt(encoded):
+def base64_decrypt(encoded, urlsafe=False):
     """
     Base64による復号化（デコード）
     
     Base64でエンコードされたテキストを元のテキストに復元します。
+    暗号文に含まれる空白・改行は無視し、省略されたパディングは補います。
+    
+    Args:
+        encoded: Base64でエンコードされたテキスト（文字列、またはbytes系のバッファ）
+        urlsafe (bool): URLセーフ形式の暗号文かどうか
+    
+    Returns:
+        str: 復号化されたテキスト
+    """
+    return _base64_decode(encoded, urlsafe).decode('utf-8')
+
+
+def base64url_encrypt(text):
+    """
+    URLセーフなBase64による暗号化（エンコード）
+    
+    Args:
+        text: 暗号化対象のテキスト（文字列、またはbytes系のバッファ）
+    
+    Returns:
+        str: URLセーフなBase64でエンコードされたテキスト
+    """
+    return base64_encrypt(text, urlsafe=True)
+
+
+def base64url_decrypt(encoded):
+    """
+    URLセーフなBase64による復号化（デコード）
     
     Args:
-        encoded (str): Base64でエンコードされたテキスト
+        encoded: URLセーフなBase64でエンコードされたテキスト
     
     Returns:
         str: 復号化されたテキスト
     """
-    decoded_bytes = base64.b64decode(encoded.encode('utf-8'))
-    return decoded_bytes.decode('utf-8')
+    return base64_decrypt(encoded, urlsafe=True)
 
 
 def generate_random_mapping():
@@ -111,7 +290,27 @@ def generate_random_mapping():
     return dict(zip(alphabet, shuffled))
 
 
-def random_substitution_encrypt(text):
+def _random_substitution_key(mapping=None):
+    """
+    ランダム置換暗号の変換テーブルとマッピング情報を生成
+    
+    Args:
+        mapping (str): a〜zの置換先を並べた文字列（省略時はランダムに生成）
+    
+    Returns:
+        tuple: (str.translate用の変換テーブル, 暗号文に付加するマッピング文字列)
+    """
+    substituted = mapping or random_mapping()
+    # マッピング情報を文字列として保存（復号時に使用）
+    mapping_str = ''.join([f"{k}{v}" for k, v in zip(_LOWER, substituted)])
+    
+    # 大文字は置換後も大文字、アルファベット以外はそのまま
+    # （マッピングは毎回異なるためテーブルはキャッシュしない）
+    table = str.maketrans(_LOWER + _UPPER, substituted + substituted.upper())
+    return table, mapping_str
+
+
+def random_substitution_encrypt(text, mapping=None):
     """
     ランダム置換暗号による暗号化
     
@@ -120,25 +319,13 @@ def random_substitution_encrypt(text):
     
     Args:
         text (str): 暗号化対象のテキスト
+        mapping (str): 使用するマッピング（省略時はランダムに生成）
     
     Returns:
         str: 暗号化されたテキスト（マッピング情報付き）
     """
-    mapping = generate_random_mapping()
-    result = ''
-    # マッピング情報を文字列として保存（復号時に使用）
-    mapping_str = ''.join([f"{k}{v}" for k, v in mapping.items()])
-    
-    for char in text:
-        if char.lower() in mapping:
-            if char.isupper():
-                # 大文字の場合は置換後も大文字にする
-                result += mapping[char.lower()].upper()
-            else:
-                result += mapping[char.lower()]
-        else:
-            # アルファベット以外はそのまま
-            result += char
+    table, mapping_str = _random_substitution_key(mapping)
+    result = text.translate(table)
     
     # マッピング情報を暗号文の最後に追加（|で区切り）
     return f"{result}|{mapping_str}"
@@ -157,27 +344,20 @@ def random_substitution_decrypt(encrypted_text):
         str: 復号化されたテキスト、またはエラーメッセージ
     """
     try:
-        # 暗号文とマッピング情報を分離
-        text_part, mapping_part = encrypted_text.split('|')
-        
-        # マッピング情報を復元（逆マッピングを作成）
-        mapping = {}
-        for i in range(0, len(mapping_part), 2):
-            original = mapping_part[i]
-            substituted = mapping_part[i+1]
-            mapping[substituted] = original
+        # 暗号文とマッピング情報を分離（マッピング情報は最後の|以降）
+        text_part, mapping_part = encrypted_text.rsplit('|', 1)
         
-        result = ''
-        for char in text_part:
-            if char.lower() in mapping:
-                if char.isupper():
-                    result += mapping[char.lower()].upper()
-                else:
-                    result += mapping[char.lower()]
-            else:
-                result += char
+        # マッピング情報を復元（置換後の文字→元の文字の逆マッピング）
+        originals = mapping_part[0::2]
+        substituted = mapping_part[1::2]
+        if len(originals) != len(substituted):
+            raise ValueError("マッピング情報が不正です")
         
-        return result
+        table = str.maketrans(
+            substituted + substituted.upper(),
+            originals + originals.upper()
+        )
+        return text_part.translate(table)
     except:
         return "[エラー] 復号に失敗しました"
 
@@ -195,6 +375,14 @@ MORSE_CODE_DICT = {
 }
 
 
+# 逆マッピング辞書（モールス符号→文字）
+# 復号のたびに作成しないよう、モジュール読み込み時に一度だけ作成する
+_REVERSE_MORSE = {v: k for k, v in MORSE_CODE_DICT.items()}
+
+# モールス信号風暗号文の符号（空白・改行で区切られた文字列、または改行）
+_MORSE_TOKEN_PATTERN = re.compile(r'[^ \n]+|\n')
+
+
 def morse_encrypt(text):
     """
     モールス信号風暗号化
@@ -208,14 +396,9 @@ def morse_encrypt(text):
     Returns:
         str: モールス信号で表現されたテキスト
     """
-    result = []
-    for char in text.upper():
-        if char in MORSE_CODE_DICT:
-            result.append(MORSE_CODE_DICT[char])
-        else:
-            # マッピングに対応しない文字はそのまま保持
-            result.append(char)
-    return ' '.join(result)
+    upper = text.upper()
+    # マッピングに対応しない文字はそのまま保持（dict.getの既定値に元の文字を渡す）
+    return ' '.join(map(MORSE_CODE_DICT.get, upper, upper))
 
 
 def morse_decrypt(morse_text):
@@ -223,7 +406,9 @@ def morse_decrypt(morse_text):
     モールス信号風復号化
     
     モールス符号を元のテキストに変換します。
-    各モールス符号は空白で区切られている必要があります。
+    各モールス符号は空白または改行で区切られている必要があります。
+    改行は区切りであると同時に、元のテキストの改行としてそのまま保持します
+    （暗号化では改行も1つの符号として空白で区切られます）。
     
     Args:
         morse_text (str): モールス符号で表現されたテキスト
@@ -231,23 +416,11 @@ def morse_decrypt(morse_text):
     Returns:
         str: 復号化されたテキスト
     """
-    # 逆マッピング辞書を作成（モールス符号→文字）
-    reverse_morse = {v: k for k, v in MORSE_CODE_DICT.items()}
-    
-    morse_words = morse_text.split(' ')
-    result = []
-    
-    for morse_char in morse_words:
-        if morse_char in reverse_morse:
-            result.append(reverse_morse[morse_char])
-        elif morse_char == '':
-            # 空文字列は無視
-            continue
-        else:
-            # 対応しないモールス符号はそのまま保持
-            result.append(morse_char)
-    
-    return ''.join(result)
+    # 対応しないモールス符号はそのまま保持
+    return ''.join([
+        _REVERSE_MORSE.get(morse_char, morse_char)
+        for morse_char in _MORSE_TOKEN_PATTERN.findall(morse_text)
+    ])
 
 
 def rot13_encrypt(text):
@@ -263,15 +436,8 @@ def rot13_encrypt(text):
     Returns:
         str: ROT13で暗号化されたテキスト
     """
-    result = ''
-    for char in text:
-        if char.isalpha():
-            base = ord('A') if char.isupper() else ord('a')
-            # 13文字シフト（26文字の半分）
-            result += chr((ord(char) - base + 13) % 26 + base)
-        else:
-            result += char
-    return result
+    # 13文字シフト（26文字の半分）
+    return text.translate(_caesar_table(13))
 
 
 def rot13_decrypt(text):
@@ -302,18 +468,8 @@ def atbash_encrypt(text):
     Returns:
         str: Atbash暗号で暗号化されたテキスト
     """
-    result = ''
-    for char in text:
-        if char.isalpha():
-            if char.isupper():
-                # 大文字: A=Z, B=Y, C=X, ...
-                result += chr(ord('Z') - (ord(char) - ord('A')))
-            else:
-                # 小文字: a=z, b=y, c=x, ...
-                result += chr(ord('z') - (ord(char) - ord('a')))
-        else:
-            result += char
-    return result
+    # A=Z, B=Y, C=X, ...（小文字も同様）
+    return text.translate(_substitution_table(_LOWER[::-1]))
 
 
 def atbash_decrypt(text):
@@ -331,12 +487,123 @@ def atbash_decrypt(text):
     return atbash_encrypt(text)
 
 
+# NumPyによるベクトル化処理に切り替える入力サイズ（文字数）の閾値
+# これより短い入力では配列変換のオーバーヘッドの方が大きくなる
+VIGENERE_NUMPY_THRESHOLD = 10000
+
+
+def validate_keyword(keyword):
+    """
+    Vigenère暗号のキーワードを検証
+    
+    Args:
+        keyword (str): Vigenère暗号のキーワード
+    
+    Raises:
+        ValueError: キーワードが空、またはASCII英字以外を含む場合
+    """
+    if not keyword:
+        raise ValueError("キーワードが空です")
+    if not (keyword.isascii() and keyword.isalpha()):
+        raise ValueError("キーワードは英字のみで指定してください")
+
+
+@lru_cache(maxsize=256)
+def _vigenere_shifts(keyword, sign):
+    """
+    キーワードから各位置のシフト量の表を作成（キャッシュ付き）
+    
+    同じキーワードでの処理が繰り返される場合に、
+    プロセス内で一度だけ作成されるようにキャッシュしています。
+    
+    Args:
+        keyword (str): Vigenère暗号のキーワード
+        sign (int): 暗号化なら1、復号化なら-1
+    
+    Returns:
+        tuple: 0〜25のシフト量のタプル
+    """
+    validate_keyword(keyword)
+    return tuple((sign * (ord(k) - ord('A'))) % 26 for k in keyword.upper())
+
+
+def _vigenere_python(text, shifts, start=0):
+    """
+    Vigenère暗号のシフト処理（純Python版）
+    
+    Args:
+        text (str): 処理対象のテキスト
+        shifts (tuple): キーワード各文字のシフト量
+        start (int): キーワードの開始位置（それまでに処理した英字の数）
+    
+    Returns:
+        str: シフト後のテキスト
+    """
+    result = []
+    keyword_index = start
+    period = len(shifts)
+    
+    for char in text:
+        if 'a' <= char <= 'z' or 'A' <= char <= 'Z':
+            # キーワードの対応する文字のシフト量を適用
+            base = ord('A') if char <= 'Z' else ord('a')
+            result.append(chr((ord(char) - base + shifts[keyword_index % period]) % 26 + base))
+            keyword_index += 1
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def _vigenere_numpy(text, shifts, start=0):
+    """
+    Vigenère暗号のシフト処理（NumPyによるベクトル化版）
+    
+    英字の位置を配列として抽出し、キーワードの繰り返しと
+    剰余演算を配列全体に一括で適用します。
+    
+    Args:
+        text (str): 処理対象のテキスト
+        shifts (tuple): キーワード各文字のシフト量
+        start (int): キーワードの開始位置（それまでに処理した英字の数）
+    
+    Returns:
+        str: シフト後のテキスト
+    """
+    codes = np.frombuffer(
+        text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32
+    ).astype(np.int64)
+    upper = (codes >= ord('A')) & (codes <= ord('Z'))
+    lower = (codes >= ord('a')) & (codes <= ord('z'))
+    letters = np.flatnonzero(upper | lower)
+    if letters.size == 0:
+        return text
+    
+    # キーワードを開始位置から英字の数だけ繰り返したキーストリーム
+    offset = start % len(shifts)
+    keystream = np.resize(np.array(shifts[offset:] + shifts[:offset], dtype=np.int64), letters.size)
+    base = np.where(upper[letters], ord('A'), ord('a'))
+    codes[letters] = (codes[letters] - base + keystream) % 26 + base
+    return codes.astype(np.uint32).tobytes().decode('utf-32-le', 'surrogatepass')
+
+
+def _vigenere(text, shifts, start=0):
+    """
+    入力サイズに応じてVigenère暗号のシフト処理を選択
+    
+    NumPyが利用可能で入力が閾値以上の場合はベクトル化版を、
+    それ以外の場合は純Python版を使用します。
+    """
+    if np is not None and len(text) >= VIGENERE_NUMPY_THRESHOLD:
+        return _vigenere_numpy(text, shifts, start)
+    return _vigenere_python(text, shifts, start)
+
+
 def vigenere_encrypt(text, keyword="ENCRYPT"):
     """
     Vigenère暗号による暗号化
     
     キーワードを使用した多表換字暗号です。
-    各文字をキーワードの対応する文字分だけシフトします。
+    各ASCII英字をキーワードの対応する文字分だけシフトします。
     
     Args:
         text (str): 暗号化対象のテキスト
@@ -345,20 +612,7 @@ def vigenere_encrypt(text, keyword="ENCRYPT"):
     Returns:
         str: Vigenère暗号で暗号化されたテキスト
     """
-    result = ''
-    keyword = keyword.upper()
-    keyword_index = 0
-    
-    for char in text:
-        if char.isalpha():
-            # キーワードの対応する文字からシフト量を計算
-            shift = ord(keyword[keyword_index % len(keyword)]) - ord('A')
-            base = ord('A') if char.isupper() else ord('a')
-            result += chr((ord(char) - base + shift) % 26 + base)
-            keyword_index += 1
-        else:
-            result += char
-    return result
+    return _vigenere(text, _vigenere_shifts(keyword, 1))
 
 
 def vigenere_decrypt(text, keyword="ENCRYPT"):
@@ -374,20 +628,37 @@ def vigenere_decrypt(text, keyword="ENCRYPT"):
     Returns:
         str: 復号化されたテキスト
     """
-    result = ''
-    keyword = keyword.upper()
-    keyword_index = 0
+    return _vigenere(text, _vigenere_shifts(keyword, -1))
+
+
+# 数字置換暗号の変換テーブル（A/a=01, B/b=02, ..., Z/z=26）
+_NUMBER_TABLE = str.maketrans({
+    char: f"{i + 1:02d}"
+    for letters in (_LOWER, _UPPER)
+    for i, char in enumerate(letters)
+})
+
+# 復号用の対応表（'01'〜'26'と、末尾に残った1桁の'1'〜'9'→大文字）
+_NUMBER_LETTERS = {f"{i + 1:02d}": char for i, char in enumerate(_UPPER)}
+_NUMBER_LETTERS.update({str(i + 1): char for i, char in enumerate(_UPPER[:9])})
+
+# 左から順に走査し、01〜26の2桁を1文字に置換する
+# 範囲外の2桁（00, 27〜99）は先頭の1桁だけをそのまま残して次の位置から走査を続け、
+# テキスト末尾に1桁だけ残った1〜9も対応する文字に置換する
+_NUMBER_PAIR_PATTERN = re.compile(r'(0[1-9]|1[0-9]|2[0-6])')
+_NUMBER_PATTERN = re.compile(r'(0[1-9]|1[0-9]|2[0-6]|[1-9]\Z)')
+
+
+def _number_scan(pattern, text):
+    """
+    正規表現で数字を走査し、マッチ部分を対応するアルファベットに置換
     
-    for char in text:
-        if char.isalpha():
-            # キーワードの対応する文字からシフト量を計算（逆方向）
-            shift = ord(keyword[keyword_index % len(keyword)]) - ord('A')
-            base = ord('A') if char.isupper() else ord('a')
-            result += chr((ord(char) - base - shift) % 26 + base)
-            keyword_index += 1
-        else:
-            result += char
-    return result
+    re.splitの結果は「非マッチ部分, マッチ部分, 非マッチ部分, ...」と
+    交互に並ぶため、マッチ部分（奇数番目）だけを一括で変換して連結します。
+    """
+    parts = pattern.split(text)
+    parts[1::2] = map(_NUMBER_LETTERS.__getitem__, parts[1::2])
+    return ''.join(parts)
 
 
 def number_encrypt(text):
@@ -395,6 +666,7 @@ def number_encrypt(text):
     数字置換暗号による暗号化
     
     各アルファベットを対応する数字に置換します（A=01, B=02, ...）。
+    ASCII英字以外の文字はそのまま残ります。
     
     Args:
         text (str): 暗号化対象のテキスト
@@ -402,19 +674,7 @@ def number_encrypt(text):
     Returns:
         str: 数字で表現されたテキスト
     """
-    result = []
-    for char in text:
-        if char.isalpha():
-            if char.isupper():
-                # 大文字: A=01, B=02, ..., Z=26
-                result.append(str(ord(char) - ord('A') + 1).zfill(2))
-            else:
-                # 小文字も同様に処理
-                result.append(str(ord(char) - ord('a') + 1).zfill(2))
-        else:
-            # アルファベット以外はそのまま
-            result.append(char)
-    return ''.join(result)
+    return text.translate(_NUMBER_TABLE)
 
 
 def number_decrypt(text):
@@ -429,51 +689,58 @@ def number_decrypt(text):
     Returns:
         str: 復号化されたテキスト
     """
-    result = ''
-    i = 0
-    while i < len(text):
-        if text[i:i+2].isdigit():
-            num = int(text[i:i+2])
-            if 1 <= num <= 26:
-                # 1-26の範囲であればアルファベットに変換
-                result += chr(ord('A') + num - 1)
-                i += 2
-            else:
-                # 範囲外の数字はそのまま
-                result += text[i]
-                i += 1
-        else:
-            # 数字以外はそのまま
-            result += text[i]
-            i += 1
-    return result
+    return _number_decode(text)[0]
+
+
+def _number_decode(text, final=True):
+    """
+    数字置換暗号の復号処理本体
+    
+    Args:
+        text (str): 数字で表現されたテキスト
+        final (bool): 入力の末尾かどうか。Falseの場合、末尾の1桁の数字は
+            次の入力と2桁の数字を構成する可能性があるため処理せずに残します。
+    
+    Returns:
+        tuple: (復号化されたテキスト, 未処理の残りのテキスト)
+    """
+    if final:
+        return _number_scan(_NUMBER_PATTERN, text), ''
+    
+    decoded = _number_scan(_NUMBER_PAIR_PATTERN, text)
+    if text and text[-1] in string.digits and decoded[-1] == text[-1]:
+        # 末尾の数字が2桁の組にならなかった場合は、続きの入力を待つため保留
+        return decoded[:-1], text[-1]
+    return decoded, ''
+
+
+# 1バイトの値（0〜255）と8桁の二進数表現の対応表
+_BINARY_CODES = tuple(format(i, '08b') for i in range(256))
+_BINARY_VALUES = {code: i for i, code in enumerate(_BINARY_CODES)}
 
 
 def binary_encrypt(text):
     """
     Binary暗号による暗号化
     
-    各文字をASCIIコードの8ビット二進数表現に変換します。
+    テキストをUTF-8でエンコードし、各バイトを8ビットの二進数表現に変換します。
+    ASCII文字は従来どおり1文字が1つの8ビットグループになります。
+    bytes系のオブジェクトを渡した場合は、エンコードせずにそのまま変換します。
     
     Args:
-        text (str): 暗号化対象のテキスト
+        text: 暗号化対象のテキスト（文字列、またはbytes系のバッファ）
     
     Returns:
         str: 二進数で表現されたテキスト（空白区切り）
     """
-    result = []
-    for char in text:
-        # 文字のASCIIコードを8桁の二進数に変換
-        binary = bin(ord(char))[2:].zfill(8)
-        result.append(binary)
-    return ' '.join(result)
+    return ' '.join(map(_BINARY_CODES.__getitem__, _as_buffer(text)))
 
 
 def binary_decrypt(text):
     """
     Binary暗号による復号化
     
-    空白区切りの二進数を元の文字に復元します。
+    空白区切りの二進数をバイト列に戻し、UTF-8としてデコードします。
     
     Args:
         text (str): 二進数で表現されたテキスト
@@ -482,12 +749,267 @@ def binary_decrypt(text):
         str: 復号化されたテキスト、またはエラーメッセージ
     """
     try:
-        binary_codes = text.split(' ')
-        result = ''
-        for binary in binary_codes:
-            if binary:
-                # 二進数を整数に変換してからASCII文字に変換
-                result += chr(int(binary, 2))
-        return result
+        return _binary_decode(text)
     except:
         return "[エラー] 復号に失敗しました"
+
+
+def _binary_bytes(codes):
+    """
+    二進数表現のリストをバイト列に変換
+    
+    Args:
+        codes (list): 二進数表現の文字列のリスト
+    
+    Returns:
+        bytes: 変換後のバイト列
+    """
+    try:
+        return bytes(map(_BINARY_VALUES.__getitem__, codes))
+    except KeyError:
+        # 8桁でないグループ（先頭の0を省略したものなど）は個別に変換
+        return bytes([int(code, 2) for code in codes])
+
+
+def _binary_decode(text):
+    """
+    Binary暗号の復号処理本体（不正な入力ではValueErrorを送出）
+    
+    Args:
+        text (str): 二進数で表現されたテキスト
+    
+    Returns:
+        str: 復号化されたテキスト
+    """
+    codes = text.split()
+    try:
+        return _binary_bytes(codes).decode('utf-8')
+    except ValueError:
+        # 旧形式（非ASCII文字を1つの二進数で表現）の暗号文との互換性のため
+        # 各グループを文字コードとして解釈する
+        return ''.join(chr(int(code, 2)) for code in codes)
+
+
+# ---------------------------------------------------------------------------
+# ストリーミング処理
+#
+# 入力をチャンク（文字列）のイテラブルとして受け取り、出力をチャンク単位で
+# 返すジェネレータ群です。チャンクの境界をまたぐ状態（Vigenère暗号の
+# キーワード位置、途中で切れたトークン、Base64の3バイト境界など）を保持する
+# ため、入力全体をメモリに載せずにファイルやリクエストボディを処理できます。
+# 全チャンクの出力を連結した結果は、入力全体を一度に処理した結果と一致します。
+# ---------------------------------------------------------------------------
+
+# ASCII英字を削除する変換テーブル（英字の数の計算に使用）
+_DELETE_LETTERS = str.maketrans('', '', _LOWER + _UPPER)
+
+
+def _count_letters(text):
+    """テキストに含まれるASCII英字の数を返す"""
+    return len(text) - len(text.translate(_DELETE_LETTERS))
+
+
+def _translate_stream(chunks, table):
+    """変換テーブルを各チャンクに適用する（単一換字式暗号用）"""
+    for chunk in chunks:
+        yield chunk.translate(table)
+
+
+def _joined_stream(chunks, encode):
+    """1文字を1つ以上のトークンに変換し、空白区切りで連結する暗号用"""
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        encoded = encode(chunk)
+        # 前のチャンクの最後のトークンとの間に区切りの空白を入れる
+        yield encoded if first else ' ' + encoded
+        first = False
+
+
+# チャンクの最後の区切り文字（この文字までのトークンは次のチャンクに続かない）
+_LAST_WHITESPACE = re.compile(r'\s(?=\S*\Z)')
+_LAST_MORSE_SEPARATOR = re.compile(r'[ \n](?=[^ \n]*\Z)')
+
+
+def _token_stream(chunks, decode, separator=_LAST_WHITESPACE):
+    """
+    区切り文字で区切られたトークンを復号する暗号用（途中で切れたトークンを保持）
+    
+    各チャンクの最後の区切り文字までを復号し、残りは次のチャンクと連結します。
+    改行だけで区切られた暗号文でも、保持する部分は1トークン分に収まります。
+    """
+    rest = ''
+    for chunk in chunks:
+        text = rest + chunk
+        match = separator.search(text)
+        if match is None:
+            rest = text
+            continue
+        yield decode(text[:match.end()])
+        rest = text[match.end():]
+    if rest:
+        yield decode(rest)
+
+
+def _vigenere_stream(chunks, shifts):
+    """Vigenère暗号（チャンクをまたいでキーワード位置を保持）"""
+    position = 0
+    for chunk in chunks:
+        yield _vigenere(chunk, shifts, position)
+        position += _count_letters(chunk)
+
+
+def _number_decode_stream(chunks):
+    """数字置換暗号の復号（チャンク末尾の1桁の数字を次のチャンクへ持ち越す）"""
+    rest = ''
+    for chunk in chunks:
+        decoded, rest = _number_decode(rest + chunk, final=False)
+        yield decoded
+    yield _number_decode(rest)[0]
+
+
+def _binary_decode_stream(chunks):
+    """Binary暗号の復号（途中で切れたトークンとUTF-8の文字を保持）"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for data in _token_stream(chunks, lambda text: _binary_bytes(text.split())):
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+
+def _base64_encode_stream(chunks, urlsafe=False):
+    """
+    Base64エンコード（3バイト単位に揃えてからエンコード）
+    
+    前のチャンクの端数（2バイト以下）だけを次のチャンクの先頭と連結し、
+    チャンク本体はmemoryviewのスライスとしてコピーせずにエンコードします。
+    """
+    rest = b''
+    for chunk in chunks:
+        data = memoryview(_as_buffer(chunk)).cast('B')
+        if rest:
+            head = rest + data[:3 - len(rest)]
+            data = data[3 - len(rest):]
+            if len(head) < 3:
+                rest = head
+                continue
+            yield base64_encrypt(head, urlsafe)
+        cut = len(data) - len(data) % 3
+        rest = bytes(data[cut:])
+        if cut:
+            yield base64_encrypt(data[:cut], urlsafe)
+    if rest:
+        yield base64_encrypt(rest, urlsafe)
+
+
+def _base64_decode_stream(chunks, urlsafe=False):
+    """
+    Base64デコード（4文字単位に揃え、UTF-8の途中で切れた文字を保持）
+    
+    チャンク内の空白・改行は取り除いてから4文字単位に揃えるため、
+    任意の位置で改行された暗号文を逐次デコードできます。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    rest = b''
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('ascii')
+        data = rest + bytes(chunk).translate(None, _BASE64_WHITESPACE)
+        cut = len(data) - len(data) % 4
+        rest = data[cut:]
+        if cut:
+            yield decoder.decode(_base64_decode(data[:cut], urlsafe))
+    yield decoder.decode(_base64_decode(rest, urlsafe) if rest else b'', final=True)
+
+
+def _random_substitution_encrypt_stream(chunks, mapping=None):
+    """ランダム置換暗号の暗号化（マッピング情報は最後に出力）"""
+    table, mapping_str = _random_substitution_key(mapping)
+    yield from _translate_stream(chunks, table)
+    yield f"|{mapping_str}"
+
+
+def _random_substitution_decrypt_stream(chunks):
+    """
+    ランダム置換暗号の復号化
+    
+    マッピング情報が暗号文の末尾にあるため、この方式のみ入力全体を
+    読み込んでから復号します。
+    """
+    yield random_substitution_decrypt(''.join(chunks))
+
+
+_ENCRYPT_STREAMS = {
+    'caesar': lambda chunks, shift=3: _translate_stream(chunks, _caesar_table(shift)),
+    'base64': _base64_encode_stream,
+    'base64url': lambda chunks: _base64_encode_stream(chunks, urlsafe=True),
+    'random_substitution': _random_substitution_encrypt_stream,
+    'morse': lambda chunks: _joined_stream(chunks, morse_encrypt),
+    'rot13': lambda chunks: _translate_stream(chunks, _caesar_table(13)),
+    'atbash': lambda chunks: _translate_stream(chunks, _substitution_table(_LOWER[::-1])),
+    'vigenere': lambda chunks, keyword="ENCRYPT": _vigenere_stream(chunks, _vigenere_shifts(keyword, 1)),
+    'number': lambda chunks: map(number_encrypt, chunks),
+    'binary': lambda chunks: _joined_stream(chunks, binary_encrypt),
+}
+
+_DECRYPT_STREAMS = {
+    'caesar': lambda chunks, shift=3: _translate_stream(chunks, _caesar_table(-shift)),
+    'base64': _base64_decode_stream,
+    'base64url': lambda chunks: _base64_decode_stream(chunks, urlsafe=True),
+    'random_substitution': _random_substitution_decrypt_stream,
+    'morse': lambda chunks: _token_stream(chunks, morse_decrypt, _LAST_MORSE_SEPARATOR),
+    'rot13': lambda chunks: _translate_stream(chunks, _caesar_table(13)),
+    'atbash': lambda chunks: _translate_stream(chunks, _substitution_table(_LOWER[::-1])),
+    'vigenere': lambda chunks, keyword="ENCRYPT": _vigenere_stream(chunks, _vigenere_shifts(keyword, -1)),
+    'number': _number_decode_stream,
+    'binary': _binary_decode_stream,
+}
+
+
+def _run_stream(streams, method, chunks, params):
+    """方式に対応するストリーム処理を取得し、空でない出力チャンクのみを返す"""
+    try:
+        stream = streams[method]
+    except KeyError:
+        raise ValueError("未対応の暗号方式です")
+    return (piece for piece in stream(iter(chunks), **params) if piece)
+
+
+def encrypt_stream(method, chunks, **params):
+    """
+    チャンク単位のストリーミング暗号化
+    
+    Args:
+        method (str): 暗号化方式の名前（'caesar', 'base64' など）
+        chunks (iterable): 暗号化対象のテキストのチャンク
+        **params: 鍵パラメータ（Caesar暗号のshift、Vigenère暗号のkeyword）
+    
+    Returns:
+        generator: 暗号化されたテキストのチャンク
+    
+    Raises:
+        ValueError: 未対応の暗号方式が指定された場合
+    """
+    return _run_stream(_ENCRYPT_STREAMS, method, chunks, params)
+
+
+def decrypt_stream(method, chunks, **params):
+    """
+    チャンク単位のストリーミング復号化
+    
+    ランダム置換暗号はマッピング情報が末尾にあるため、
+    入力全体を読み込んでから復号します。
+    
+    Args:
+        method (str): 暗号化方式の名前（'caesar', 'base64' など）
+        chunks (iterable): 復号化対象の暗号文のチャンク
+        **params: 鍵パラメータ（Caesar暗号のshift、Vigenère暗号のkeyword）
+    
+    Returns:
+        generator: 復号化されたテキストのチャンク
+    
+    Raises:
+        ValueError: 未対応の暗号方式が指定された場合
+        ValueError: 暗号文が不正な場合（binascii.Error, UnicodeDecodeErrorを含む）
+    """
+    return _run_stream(_DECRYPT_STREAMS, method, chunks, params)
@@ -8,23 +8,31 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.db.models import Case, F, TextField, When
+from django.db.models.functions import Length, Substr
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, urlencode
 from django.views.decorators.http import require_http_methods
+from functools import wraps
+import csv
 import json
-from .forms import EncryptForm, DecryptForm
+import os
+import uuid
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from .forms import EncryptForm, DecryptForm, FileProcessForm
 from .models import CryptoLog
-from .utils import (
-    caesar_encrypt, caesar_decrypt, 
-    base64_encrypt, base64_decrypt,
-    random_substitution_encrypt, random_substitution_decrypt,
-    morse_encrypt, morse_decrypt,
-    rot13_encrypt, rot13_decrypt,
-    atbash_encrypt, atbash_decrypt,
-    vigenere_encrypt, vigenere_decrypt,
-    number_encrypt, number_decrypt,
-    binary_encrypt, binary_decrypt
-)
+from .cache import cache_stats, cached_process
+from .codecs import CODECS, get_codec
+from .compare import compare_expansion, compare_methods
+from .fields import COMPRESSED_PREFIX, preview_head_length, text_preview
+from .files import check_encoding, process_file
+from .logwriter import arecord_logs, record_logs, save_logs
+from .pagination import keyset_page
+from .parallel import run_batch
+from .preview import StaleDocument, apply_delta, start_document, supports_delta
 
 
 def logout_view(request):
@@ -50,6 +58,187 @@ def logout_view(request):
         return render(request, 'crypto/logout_confirm.html')
 
 
+def _api_login_required(view):
+    """
+    API用のログイン必須デコレータ
+    
+    login_requiredと異なり、未ログインの場合はログインページへリダイレクトせず、
+    401のJSONレスポンスを返します。非同期ビューにも使用できます。
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return JsonResponse({'error': 'ログインが必要です'}, status=401)
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'ログインが必要です'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _run_codec(codec, text, decrypt=False, params=None):
+    """
+    非同期ビューからコーデックを呼び出す
+    
+    出力が設定のCRYPTO_ASYNC_INLINE_LIMIT文字を超える見込みの大きな入力は、
+    イベントループを塞がないようにスレッドで処理します。
+    小さな入力はスレッド切り替えのコストの方が大きいため、そのまま処理します。
+    
+    Args:
+        codec: 使用するコーデック
+        text (str): 処理対象のテキスト
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+    
+    Returns:
+        str: 処理結果
+    """
+    if len(text) * codec.expansion <= getattr(settings, 'CRYPTO_ASYNC_INLINE_LIMIT', 4096):
+        return cached_process(codec, text, decrypt, params)
+    return await sync_to_async(cached_process, thread_sensitive=False)(codec, text, decrypt, params)
+
+
+def _streaming_content(request, iterator):
+    """
+    StreamingHttpResponseに渡すストリーミングの内容
+    
+    ASGIでは、同期イテレーターを渡すとDjangoが全体を読み込んでから送信するため、
+    1要素ずつリクエストのスレッドで進める非同期イテレーターに変換します。
+    WSGIでは同期イテレーターをそのまま返します。
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+        iterator: 内容を返す同期イテレーター（ジェネレータ）
+    
+    Returns:
+        iterator: StreamingHttpResponseに渡すイテレーター
+    """
+    if not isinstance(request, ASGIRequest):
+        return iterator
+    return _iterate_in_thread(iterator)
+
+
+async def _iterate_in_thread(iterator):
+    """同期イテレーターをリクエストのスレッドで1要素ずつ進める非同期ジェネレータ"""
+    done = object()
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (item := await step(iterator, done)) is not done:
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def _load_json(request):
+    """
+    リクエストボディをJSONオブジェクトとして解析
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+    
+    Returns:
+        dict: 解析されたJSONオブジェクト
+    
+    Raises:
+        ValueError: ボディがJSONオブジェクトでない場合
+    """
+    try:
+        data = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('リクエスト形式が正しくありません') from None
+    if not isinstance(data, dict):
+        raise ValueError('リクエスト形式が正しくありません')
+    return data
+
+
+def _process_lines(request, codec, method, lines, params, batch_id, decrypt=False):
+    """
+    バッチ処理の各行を処理し、ログを一括保存
+    
+    保存する行には共通のbatch_idを設定し、結果のダウンロードではこのIDで
+    バッチの行だけを読み込みます（batch_exportを参照）。
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+        codec: 使用するコーデック
+        method (str): 暗号化方式の名前
+        lines (list): 処理対象の行
+        params (dict): 鍵パラメータ（Codec.clean_paramsの戻り値）
+        batch_id (uuid.UUID): バッチのID
+        decrypt (bool): Trueの場合は復号化、Falseの場合は暗号化
+    
+    Returns:
+        list: 行ごとの {'original', 'encrypted', 'error', 'id'} の辞書のリスト
+            （idは保存したCryptoLogの主キー、保存しなかった行はNone）
+    """
+    results = []
+    saved = []
+    logs = []
+    for line, (output, error) in zip(lines, run_batch(codec, lines, decrypt, params)):
+        original, encrypted = (output, line) if decrypt else (line, output)
+        result = {'original': original or '', 'encrypted': encrypted or '', 'error': error, 'id': None}
+        results.append(result)
+        if error is None:
+            saved.append(result)
+            logs.append(CryptoLog(
+                user=request.user,
+                original_text=original,
+                encrypted_text=encrypted,
+                method=method,
+                is_decryption=decrypt,
+                batch_id=batch_id,
+                **params
+            ))
+    
+    for result, log, error in zip(saved, logs, save_logs(logs)):
+        result['error'] = error
+        if error is None:
+            result['id'] = log.pk
+    return results
+
+
+def _batch_result_context(results, method, mode, batch_id):
+    """
+    バッチ処理の結果ページのコンテキストを作成
+    
+    ページには先頭の設定のCRYPTO_BATCH_PREVIEW_ROWS行だけを埋め込み、
+    全件は保存した履歴からCSV・NDJSONでダウンロードできるようにします（batch_exportを参照）。
+    
+    Args:
+        results (list): _process_linesの戻り値
+        method (str): 暗号化方式の名前
+        mode (str): 'encrypt' または 'decrypt'
+        batch_id (uuid.UUID): _process_linesに渡したバッチのID
+    
+    Returns:
+        dict: テンプレートのコンテキスト
+    """
+    limit = getattr(settings, 'CRYPTO_BATCH_PREVIEW_ROWS', 100)
+    preview = results[:limit]
+    
+    context = {
+        'results': preview,
+        'results_json': json.dumps(preview, ensure_ascii=False),  # JavaScript用
+        'total': len(results),
+        'truncated': len(results) > len(preview),
+        'method': method,
+        'method_display': dict(CryptoLog.ENCRYPTION_METHODS)[method],
+        'mode': mode,
+    }
+    # 保存した行がない場合は、ダウンロードを提供しない
+    if any(not result['error'] for result in results):
+        context['export_query'] = urlencode({'method': method, 'mode': mode, 'batch': batch_id})
+    return context
+
+
 @login_required
 def encrypt_view(request):
     """
@@ -71,36 +260,20 @@ def encrypt_view(request):
             method = form.cleaned_data['method']
 
             try:
-                # 選択された暗号化方式に応じて処理を分岐
-                if method == 'caesar':
-                    encrypted = caesar_encrypt(text)
-                elif method == 'base64':
-                    encrypted = base64_encrypt(text)
-                elif method == 'random_substitution':
-                    encrypted = random_substitution_encrypt(text)
-                elif method == 'morse':
-                    encrypted = morse_encrypt(text)
-                elif method == 'rot13':
-                    encrypted = rot13_encrypt(text)
-                elif method == 'atbash':
-                    encrypted = atbash_encrypt(text)
-                elif method == 'vigenere':
-                    encrypted = vigenere_encrypt(text)
-                elif method == 'number':
-                    encrypted = number_encrypt(text)
-                elif method == 'binary':
-                    encrypted = binary_encrypt(text)
-                else:
-                    raise ValueError("未対応の暗号方式です")
-
-                # 暗号化結果をデータベースに保存
-                CryptoLog.objects.create(
+                # 選択された暗号化方式のコーデックで暗号化
+                codec = get_codec(method)
+                params = codec.clean_params(form.cleaned_data)
+                encrypted = cached_process(codec, text, params=params)
+
+                # 暗号化結果をデータベースに保存（鍵パラメータも記録）
+                record_logs([CryptoLog(
                     user=request.user,
                     original_text=text,
                     encrypted_text=encrypted,
                     method=method,
-                    is_decryption=False  # 暗号化フラグ
-                )
+                    is_decryption=False,  # 暗号化フラグ
+                    **params
+                )])
 
                 messages.success(request, '暗号化が完了しました！')
                 return render(request, 'crypto/result.html', {
@@ -138,36 +311,20 @@ def decrypt_view(request):
             method = form.cleaned_data['method']
 
             try:
-                # 選択された復号化方式に応じて処理を分岐
-                if method == 'caesar':
-                    decrypted = caesar_decrypt(encrypted)
-                elif method == 'base64':
-                    decrypted = base64_decrypt(encrypted)
-                elif method == 'random_substitution':
-                    decrypted = random_substitution_decrypt(encrypted)
-                elif method == 'morse':
-                    decrypted = morse_decrypt(encrypted)
-                elif method == 'rot13':
-                    decrypted = rot13_decrypt(encrypted)
-                elif method == 'atbash':
-                    decrypted = atbash_decrypt(encrypted)
-                elif method == 'vigenere':
-                    decrypted = vigenere_decrypt(encrypted)
-                elif method == 'number':
-                    decrypted = number_decrypt(encrypted)
-                elif method == 'binary':
-                    decrypted = binary_decrypt(encrypted)
-                else:
-                    raise ValueError("未対応の暗号方式です")
-
-                # 復号化結果をデータベースに保存
-                CryptoLog.objects.create(
+                # 選択された復号化方式のコーデックで復号化
+                codec = get_codec(method)
+                params = codec.clean_params(form.cleaned_data)
+                decrypted = cached_process(codec, encrypted, decrypt=True, params=params)
+
+                # 復号化結果をデータベースに保存（鍵パラメータも記録）
+                record_logs([CryptoLog(
                     user=request.user,
                     original_text=decrypted,
                     encrypted_text=encrypted,
                     method=method,
-                    is_decryption=True  # 復号化フラグ
-                )
+                    is_decryption=True,  # 復号化フラグ
+                    **params
+                )])
 
                 messages.success(request, '復号が完了しました！')
                 return render(request, 'crypto/result.html', {
@@ -184,6 +341,47 @@ def decrypt_view(request):
     return render(request, 'crypto/decrypt.html', {'form': form})
 
 
+def _preview_head(field_name, preview_chars):
+    """
+    履歴一覧に表示するテキストの先頭部分を取得する式
+    
+    圧縮して保存された行（crypto.fieldsを参照）は、先頭部分を展開できるように
+    保存された値の先頭を長めに取得します。取得した値は_apply_previewsで表示用に変換します。
+    
+    Args:
+        field_name (str): テキストのフィールドのパス（例: 'original_blob__text'）
+        preview_chars (int): 表示する文字数
+    
+    Returns:
+        Case: 保存された値の先頭部分を取得する式
+    """
+    # 途中で切れた圧縮データをフィールドが展開しないよう、出力はTextFieldとして扱う
+    return Case(
+        When(**{f'{field_name}__startswith': COMPRESSED_PREFIX},
+             then=Substr(field_name, 1, preview_head_length(preview_chars))),
+        default=Substr(field_name, 1, preview_chars),
+        output_field=TextField(),
+    )
+
+
+def _apply_previews(log, preview_chars):
+    """
+    _preview_headで取得した値を、表示用の先頭部分と文字数に変換
+    
+    圧縮して保存された行は、SQLのLengthでは保存された値の文字数になるため、
+    文字数も圧縮したテキストに記録された元の文字数に置き換えます。
+    
+    Args:
+        log: 履歴一覧のCryptoLogインスタンス
+        preview_chars (int): 表示する文字数
+    """
+    for prefix in ('original', 'encrypted'):
+        preview, length = text_preview(getattr(log, f'{prefix}_preview'), preview_chars)
+        setattr(log, f'{prefix}_preview', preview)
+        if length is not None:
+            setattr(log, f'{prefix}_length', length)
+
+
 @login_required
 def history_view(request):
     """
@@ -191,6 +389,8 @@ def history_view(request):
     
     ログインユーザーの暗号化・復号化履歴を新しい順で表示します。
     フィルタリング機能も提供します。
+    履歴は設定のCRYPTO_HISTORY_PAGE_SIZE件ずつ、カーソル（クエリ文字列のafter・before）で
+    ページを切り替えて表示します（crypto.paginationを参照）。
     
     Args:
         request: HTTPリクエストオブジェクト
@@ -214,20 +414,72 @@ def history_view(request):
         elif operation_filter == 'decrypt':
             logs = logs.filter(is_decryption=True)
     
-    # 作成日時の降順で並び替え
-    logs = logs.order_by('-created_at')
+    # 一覧ではテキスト全体を読み込まず、先頭部分と文字数だけを取得する
+    # （全文は展開時にhistory_textで取得）
+    preview_chars = getattr(settings, 'CRYPTO_HISTORY_PREVIEW_CHARS', 100)
+    logs = logs.annotate(
+        original_preview=_preview_head('original_blob__text', preview_chars),
+        encrypted_preview=_preview_head('encrypted_blob__text', preview_chars),
+        original_length=Length('original_blob__text'),
+        encrypted_length=Length('encrypted_blob__text'),
+    )
+    
+    # 作成日時の降順で1ページ分を取得（不正なカーソルや範囲外の場合は最新のページ）
+    page_size = getattr(settings, 'CRYPTO_HISTORY_PAGE_SIZE', 50)
+    try:
+        page, next_cursor, previous_cursor = keyset_page(
+            logs, page_size,
+            after=request.GET.get('after'), before=request.GET.get('before')
+        )
+    except ValueError:
+        page = []
+    if not page and (request.GET.get('after') or request.GET.get('before')):
+        page, next_cursor, previous_cursor = keyset_page(logs, page_size)
+    for log in page:
+        _apply_previews(log, preview_chars)
+    
+    # ページ切り替えのリンク（絞り込みの条件を引き継ぐ）
+    filters = {key: value for key, value in
+               (('method', method_filter), ('operation', operation_filter)) if value}
     
     # 暗号化方式の選択肢を取得（フィルタ用）
     method_choices = CryptoLog.ENCRYPTION_METHODS
     
     return render(request, 'crypto/history.html', {
-        'logs': logs,
+        'logs': page,
+        'next_query': urlencode({**filters, 'after': next_cursor}) if next_cursor else '',
+        'previous_query': urlencode({**filters, 'before': previous_cursor}) if previous_cursor else '',
+        'preview_chars': preview_chars,
         'method_choices': method_choices,
         'current_method': method_filter,
         'current_operation': operation_filter,
     })
 
 
+@login_required
+@require_http_methods(["GET"])
+def history_text(request, log_id):
+    """
+    履歴1件の全文を返すAjax API
+    
+    履歴一覧は先頭部分のみを表示するため、行を展開したときに全文を取得します。
+    自分の履歴のみ取得可能です。
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+        log_id: 取得対象の履歴ID
+    
+    Returns:
+        JsonResponse: 元のテキストと変換結果、または404のエラーメッセージ
+    """
+    texts = CryptoLog.objects.filter(id=log_id, user=request.user).values(
+        original_text=F('original_blob__text'), encrypted_text=F('encrypted_blob__text')
+    ).first()
+    if texts is None:
+        return JsonResponse({'error': '指定された履歴が見つかりません'}, status=404)
+    return JsonResponse(texts)
+
+
 @login_required
 def delete_history(request, log_id):
     """
@@ -277,14 +529,14 @@ def clear_all_history(request):
     return redirect('history')
 
 
-@login_required
+@_api_login_required
 @require_http_methods(["POST"])
-def api_encrypt(request):
+async def api_encrypt(request):
     """
     暗号化APIエンドポイント
     
     POSTリクエストで送信されたテキストを暗号化し、結果をJSON形式で返します。
-    CSRFトークンは無効化されていますが、セキュリティのため認証済みユーザーのみアクセス可能です。
+    認証済みユーザーのみアクセス可能です（未ログインの場合は401を返します）。
     
     Args:
         request: HTTPリクエストオブジェクト
@@ -294,44 +546,39 @@ def api_encrypt(request):
     """
     try:
         # リクエストボディをJSONとして解析
-        data = json.loads(request.body)
+        try:
+            data = _load_json(request)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         text = data.get('text', '')
         method = data.get('method', 'caesar')
 
         # テキストが空の場合はエラーを返す
-        if not text:
+        if not text or not isinstance(text, str):
             return JsonResponse({'error': 'テキストが空です'}, status=400)
 
-        # 選択された暗号化方式に応じて処理を分岐
-        if method == 'caesar':
-            encrypted = caesar_encrypt(text)
-        elif method == 'base64':
-            encrypted = base64_encrypt(text)
-        elif method == 'random_substitution':
-            encrypted = random_substitution_encrypt(text)
-        elif method == 'morse':
-            encrypted = morse_encrypt(text)
-        elif method == 'rot13':
-            encrypted = rot13_encrypt(text)
-        elif method == 'atbash':
-            encrypted = atbash_encrypt(text)
-        elif method == 'vigenere':
-            encrypted = vigenere_encrypt(text)
-        elif method == 'number':
-            encrypted = number_encrypt(text)
-        elif method == 'binary':
-            encrypted = binary_encrypt(text)
-        else:
+        # 選択された暗号化方式のコーデックを取得
+        codec = CODECS.get(method) if isinstance(method, str) else None
+        if codec is None:
             return JsonResponse({'error': '未対応の暗号方式です'}, status=400)
 
+        # 鍵パラメータ（shift, keyword）を検証
+        try:
+            params = codec.clean_params(data)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        encrypted = await _run_codec(codec, text, params=params)
+
         # 暗号化結果をデータベースに保存
-        CryptoLog.objects.create(
-            user=request.user,
+        await arecord_logs([CryptoLog(
+            user=await request.auser(),
             original_text=text,
             encrypted_text=encrypted,
             method=method,
-            is_decryption=False  # 暗号化フラグ
-        )
+            is_decryption=False,  # 暗号化フラグ
+            **params
+        )])
 
         # 成功レスポンスを返す
         return JsonResponse({
@@ -343,14 +590,14 @@ def api_encrypt(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@login_required
+@_api_login_required
 @require_http_methods(["POST"])
-def api_decrypt(request):
+async def api_decrypt(request):
     """
     復号化APIエンドポイント
     
     POSTリクエストで送信された暗号文を復号化し、結果をJSON形式で返します。
-    CSRFトークンは無効化されていますが、セキュリティのため認証済みユーザーのみアクセス可能です。
+    認証済みユーザーのみアクセス可能です（未ログインの場合は401を返します）。
     
     Args:
         request: HTTPリクエストオブジェクト
@@ -360,44 +607,39 @@ def api_decrypt(request):
     """
     try:
         # リクエストボディをJSONとして解析
-        data = json.loads(request.body)
+        try:
+            data = _load_json(request)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         encrypted = data.get('encrypted', '')
         method = data.get('method', 'caesar')
 
         # 暗号文が空の場合はエラーを返す
-        if not encrypted:
+        if not encrypted or not isinstance(encrypted, str):
             return JsonResponse({'error': '暗号文が空です'}, status=400)
 
-        # 選択された復号化方式に応じて処理を分岐
-        if method == 'caesar':
-            decrypted = caesar_decrypt(encrypted)
-        elif method == 'base64':
-            decrypted = base64_decrypt(encrypted)
-        elif method == 'random_substitution':
-            decrypted = random_substitution_decrypt(encrypted)
-        elif method == 'morse':
-            decrypted = morse_decrypt(encrypted)
-        elif method == 'rot13':
-            decrypted = rot13_decrypt(encrypted)
-        elif method == 'atbash':
-            decrypted = atbash_decrypt(encrypted)
-        elif method == 'vigenere':
-            decrypted = vigenere_decrypt(encrypted)
-        elif method == 'number':
-            decrypted = number_decrypt(encrypted)
-        elif method == 'binary':
-            decrypted = binary_decrypt(encrypted)
-        else:
+        # 選択された復号化方式のコーデックを取得
+        codec = CODECS.get(method) if isinstance(method, str) else None
+        if codec is None:
             return JsonResponse({'error': '未対応の暗号方式です'}, status=400)
 
+        # 鍵パラメータ（shift, keyword）を検証
+        try:
+            params = codec.clean_params(data)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        decrypted = await _run_codec(codec, encrypted, decrypt=True, params=params)
+
         # 復号化結果をデータベースに保存
-        CryptoLog.objects.create(
-            user=request.user,
+        await arecord_logs([CryptoLog(
+            user=await request.auser(),
             original_text=decrypted,
             encrypted_text=encrypted,
             method=method,
-            is_decryption=True  # 復号化フラグ
-        )
+            is_decryption=True,  # 復号化フラグ
+            **params
+        )])
 
         # 成功レスポンスを返す
         return JsonResponse({
@@ -409,15 +651,15 @@ def api_decrypt(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@login_required
+@_api_login_required
 @require_http_methods(["POST"])
-def api_bulk_process(request):
+async def api_bulk_process(request):
     """
     複数テキスト処理APIエンドポイント
     
     POSTリクエストで送信された複数のテキストを一括で暗号化または復号化し、
     結果をJSON形式で返します。処理方式（暗号化・復号化）は自動判別されます。
-    CSRFトークンは無効化されていますが、セキュリティのため認証済みユーザーのみアクセス可能です。
+    認証済みユーザーのみアクセス可能です（未ログインの場合は401を返します）。
     
     Args:
         request: HTTPリクエストオブジェクト
@@ -427,7 +669,10 @@ def api_bulk_process(request):
     """
     try:
         # リクエストボディをJSONとして解析
-        data = json.loads(request.body)
+        try:
+            data = _load_json(request)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         texts = data.get('texts', [])
         method = data.get('method', 'caesar')
 
@@ -435,88 +680,75 @@ def api_bulk_process(request):
         if not texts or not isinstance(texts, list):
             return JsonResponse({'error': 'テキストのリストが必要です'}, status=400)
 
-        results = []
+        # 大量のテキストはリクエスト・レスポンス全体をメモリに載せずに済む
+        # NDJSONのストリーミングAPIで処理する
+        max_items = getattr(settings, 'CRYPTO_API_MAX_BULK_ITEMS', 1000)
+        if len(texts) > max_items:
+            return JsonResponse({
+                'error': f'一度に処理できるのは{max_items}件までです（それ以上はストリーミングAPIを使用してください）'
+            }, status=413)
+
+        codec = CODECS.get(method) if isinstance(method, str) else None
+        results = [None] * len(texts)
+
+        # 鍵パラメータ（shift, keyword）を検証
+        try:
+            params = codec.clean_params(data) if codec is not None else {}
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
-        # 各テキストに対して処理を実行
-        for text in texts:
-            if not text:
-                results.append({'error': '空のテキストがあります'})
+        # 各テキストを暗号化・復号化の対象に振り分け（結果は元の順序で返す）
+        to_encrypt = []
+        to_decrypt = []
+        for index, text in enumerate(texts):
+            if not text or not isinstance(text, str):
+                results[index] = {'error': '空のテキストがあります'}
                 continue
 
-            # 最初のテキストが暗号文かどうかで処理を判別
+            # テキストが暗号文かどうかで処理を判別
             is_encrypted = all(c in '01' for c in text.strip())
 
-            try:
-                if is_encrypted:
-                    # 暗号文の場合は復号化
-                    if method == 'caesar':
-                        decrypted = caesar_decrypt(text)
-                    elif method == 'base64':
-                        decrypted = base64_decrypt(text)
-                    elif method == 'random_substitution':
-                        decrypted = random_substitution_decrypt(text)
-                    elif method == 'morse':
-                        decrypted = morse_decrypt(text)
-                    elif method == 'rot13':
-                        decrypted = rot13_decrypt(text)
-                    elif method == 'atbash':
-                        decrypted = atbash_decrypt(text)
-                    elif method == 'vigenere':
-                        decrypted = vigenere_decrypt(text)
-                    elif method == 'number':
-                        decrypted = number_decrypt(text)
-                    elif method == 'binary':
-                        decrypted = binary_decrypt(text)
-                    else:
-                        results.append({'error': '未対応の復号方式です'})
-                        continue
-
-                    # 復号化結果をデータベースに保存
-                    CryptoLog.objects.create(
-                        user=request.user,
-                        original_text=decrypted,
-                        encrypted_text=text,
-                        method=method,
-                        is_decryption=True  # 復号化フラグ
-                    )
-
-                    results.append({'result': decrypted})
-                else:
-                    # 通常のテキストの場合は暗号化
-                    if method == 'caesar':
-                        encrypted = caesar_encrypt(text)
-                    elif method == 'base64':
-                        encrypted = base64_encrypt(text)
-                    elif method == 'random_substitution':
-                        encrypted = random_substitution_encrypt(text)
-                    elif method == 'morse':
-                        encrypted = morse_encrypt(text)
-                    elif method == 'rot13':
-                        encrypted = rot13_encrypt(text)
-                    elif method == 'atbash':
-                        encrypted = atbash_encrypt(text)
-                    elif method == 'vigenere':
-                        encrypted = vigenere_encrypt(text)
-                    elif method == 'number':
-                        encrypted = number_encrypt(text)
-                    elif method == 'binary':
-                        encrypted = binary_encrypt(text)
-                    else:
-                        results.append({'error': '未対応の暗号方式です'})
-                        continue
-
-                    # 暗号化結果をデータベースに保存
-                    CryptoLog.objects.create(
-                        user=request.user,
-                        original_text=text,
-                        encrypted_text=encrypted,
-                        method=method,
-                        is_decryption=False  # 暗号化フラグ
-                    )
-
-                    results.append({'result': encrypted})
-            except Exception as e:
-                results.append({'error': str(e)})
+            if codec is None:
+                results[index] = {
+                    'error': '未対応の復号方式です' if is_encrypted else '未対応の暗号方式です'
+                }
+            elif is_encrypted:
+                to_decrypt.append(index)
+            else:
+                to_encrypt.append(index)
+
+        # 成功した行のログを集め、最後にまとめて保存する
+        user = await request.auser()
+        saved = []
+        logs = []
+        for indices, is_decryption in ((to_decrypt, True), (to_encrypt, False)):
+            if not indices:
+                continue
+
+            # 暗号化・復号化はイベントループを塞がないようにスレッドで実行する
+            outcomes = await sync_to_async(run_batch, thread_sensitive=False)(
+                codec, [texts[i] for i in indices], decrypt=is_decryption, params=params
+            )
+            for index, (output, error) in zip(indices, outcomes):
+                if error is not None:
+                    results[index] = {'error': error}
+                    continue
+
+                text = texts[index]
+                results[index] = {'result': output}
+                saved.append(index)
+                logs.append(CryptoLog(
+                    user=user,
+                    original_text=output if is_decryption else text,
+                    encrypted_text=text if is_decryption else output,
+                    method=method,
+                    is_decryption=is_decryption,
+                    **params
+                ))
+
+        for index, error in zip(saved, await sync_to_async(save_logs)(logs)):
+            if error is not None:
+                results[index] = {'error': error}
 
         # 成功レスポンスを返す
         return JsonResponse({
@@ -528,14 +760,211 @@ def api_bulk_process(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _read_ndjson(request):
+    """
+    リクエストボディをNDJSONとして1行ずつ読み込む
+    
+    ボディ全体をメモリに載せずに、1行ずつ読み込んで解析します。
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+    
+    Yields:
+        tuple: (行番号, 解析されたJSONオブジェクト, エラーメッセージ)
+            解析に失敗した行はJSONオブジェクトがNone
+    """
+    for number, line in enumerate(request, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except (ValueError, UnicodeDecodeError):
+            yield number, None, 'JSONの形式が正しくありません'
+            continue
+        if not isinstance(item, dict):
+            yield number, None, '各行はJSONオブジェクトで指定してください'
+            continue
+        yield number, item, None
+
+
+def _process_ndjson_item(request, data):
+    """
+    NDJSONの1行分を暗号化または復号化
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+        data (dict): 行のJSONオブジェクトにクエリ文字列の既定値を補ったもの
+    
+    Returns:
+        tuple: (処理結果, 保存する未保存のCryptoLog)
+    
+    Raises:
+        ValueError: テキスト・方式・鍵パラメータが不正な場合
+    """
+    text = data.get('text')
+    if not text or not isinstance(text, str):
+        raise ValueError('テキストが空です')
+    
+    operation = data.get('operation', 'encrypt')
+    if operation not in ('encrypt', 'decrypt'):
+        raise ValueError('operationはencryptまたはdecryptで指定してください')
+    is_decryption = operation == 'decrypt'
+    
+    method = data.get('method', 'caesar')
+    codec = get_codec(method)
+    params = codec.clean_params(data)
+    output = cached_process(codec, text, is_decryption, params)
+    
+    return output, CryptoLog(
+        user=request.user,
+        original_text=output if is_decryption else text,
+        encrypted_text=text if is_decryption else output,
+        method=method,
+        is_decryption=is_decryption,
+        **params
+    )
+
+
+def _flush_ndjson(pending):
+    """処理済みの行のログをまとめて保存し、結果をNDJSONの行として返す"""
+    saved = [result for result, log in pending if log is not None]
+    errors = save_logs([log for _, log in pending if log is not None])
+    for result, error in zip(saved, errors):
+        if error is not None:
+            del result['result']
+            result['error'] = error
+    
+    for result, _ in pending:
+        yield json.dumps(result, ensure_ascii=False) + '\n'
+
+
+def _ndjson_results(request, defaults):
+    """NDJSONの各行を処理し、CRYPTO_LOG_BATCH_SIZE行ごとの結果をまとめて返すジェネレータ"""
+    batch_size = getattr(settings, 'CRYPTO_LOG_BATCH_SIZE', 500)
+    pending = []
+    
+    for number, item, error in _read_ndjson(request):
+        result = {'line': number}
+        log = None
+        if item is not None:
+            if 'id' in item:
+                result['id'] = item['id']
+            try:
+                result['result'], log = _process_ndjson_item(request, {**defaults, **item})
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            result['error'] = error
+        pending.append((result, log))
+        
+        if len(pending) >= batch_size:
+            yield ''.join(_flush_ndjson(pending))
+            pending = []
+    
+    yield ''.join(_flush_ndjson(pending))
+
+
+@_api_login_required
+@require_http_methods(["POST"])
+def api_bulk_stream(request):
+    """
+    NDJSONによるストリーミング一括処理APIエンドポイント
+    
+    リクエストボディの各行を {"text": ..., "method": ..., "operation": ...} 形式の
+    JSONオブジェクトとして1行ずつ読み込み、処理結果を1行ずつNDJSONで返します。
+    operationは "encrypt"（既定）または "decrypt" で、鍵パラメータ（shift, keyword, chain）も
+    行ごとに指定できます。行で省略した値にはクエリ文字列の値を使用します。
+    リクエスト・レスポンスのどちらも全体をメモリに載せないため、大量のテキストを処理できます。
+    ASGIでも結果はCRYPTO_LOG_BATCH_SIZE行ごとに送信します（_streaming_contentを参照）。
+    
+    各結果行は {"line": 行番号, "result": 処理結果} または {"line": 行番号, "error": エラー} で、
+    入力の行に "id" があれば結果にもそのまま含めます。
+    
+    Args:
+        request: HTTPリクエストオブジェクト（NDJSON形式のPOSTデータ）
+    
+    Returns:
+        StreamingHttpResponse: 処理結果のNDJSONレスポンス
+    """
+    return StreamingHttpResponse(
+        _streaming_content(request, _ndjson_results(request, request.GET.dict())),
+        content_type='application/x-ndjson; charset=utf-8'
+    )
+
+
+async def _preview_delta(request, data):
+    """
+    差分モードのプレビュー
+    
+    文書が見つからない場合やリビジョンが一致しない場合は、
+    クライアントにテキスト全体の再送信を求めます（"resync": true）。
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+        data (dict): doc, revision, offset, delete, insert を含むリクエストデータ
+    
+    Returns:
+        JsonResponse: 暗号文の変化した範囲またはエラーメッセージ
+    """
+    try:
+        revision = int(data['revision'])
+        offset = int(data['offset'])
+        delete = int(data['delete'])
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({
+            'success': False,
+            'resync': True,
+            'error': 'リクエスト形式が正しくありません'
+        })
+    
+    user = await request.auser()
+    try:
+        delta = await sync_to_async(apply_delta, thread_sensitive=False)(
+            user.pk, str(data['doc']), revision, offset, delete, data.get('insert', '')
+        )
+    except (StaleDocument, ValueError) as e:
+        return JsonResponse({
+            'success': False,
+            'resync': True,
+            'error': str(e)
+        })
+    
+    return JsonResponse({'success': True, **delta})
+
+
+@_api_login_required
+@require_http_methods(["GET"])
+def api_cache_stats(request):
+    """
+    コーデックの結果キャッシュの統計APIエンドポイント
+    
+    このプロセスでのキャッシュのヒット数・ミス数・ヒット率をJSON形式で返します。
+    スタッフユーザーのみアクセス可能です。
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+    
+    Returns:
+        JsonResponse: キャッシュの統計を含むJSONレスポンス
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': '権限がありません'}, status=403)
+    return JsonResponse(cache_stats())
+
+
 @login_required
 @require_http_methods(["POST"])
-def encrypt_preview(request):
+async def encrypt_preview(request):
     """
     リアルタイムプレビュー用のAjax API
     
     フロントエンドからの暗号化リクエストを処理し、
     JSON形式で結果を返します。データベースには保存しません。
+    入力のたびに呼ばれるため非同期ビューとし、ASGIではスレッドを占有しません。
+    
+    "delta": true を指定すると、差分に対応する方式では文書IDとリビジョン番号も返し、
+    以降は編集内容（doc, revision, offset, delete, insert）だけを受け付けて
+    暗号文の変化した範囲のみを返します（crypto.previewを参照）。
     
     Args:
         request: HTTPリクエストオブジェクト（JSON形式のPOSTデータ）
@@ -544,11 +973,26 @@ def encrypt_preview(request):
         JsonResponse: 暗号化結果またはエラーメッセージ
     """
     try:
-        data = json.loads(request.body)
-        text = data.get('text', '').strip()
+        data = _load_json(request)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+    
+    try:
+        # 差分モード：保持している文書に編集内容を適用する
+        if data.get('doc'):
+            return await _preview_delta(request, data)
+        
+        text = data.get('text', '')
         method = data.get('method', '')
+        # 差分モードでは編集位置がずれないように前後の空白も含めて暗号化する
+        use_delta = bool(data.get('delta')) and supports_delta(method)
+        if isinstance(text, str) and not use_delta:
+            text = text.strip()
         
-        if not text:
+        if not isinstance(text, str) or not text.strip():
             return JsonResponse({
                 'success': False,
                 'error': 'テキストが入力されていません'
@@ -561,45 +1005,94 @@ def encrypt_preview(request):
             })
         
         # 暗号化処理
-        if method == 'caesar':
-            encrypted = caesar_encrypt(text)
-        elif method == 'base64':
-            encrypted = base64_encrypt(text)
-        elif method == 'random_substitution':
-            encrypted = random_substitution_encrypt(text)
-        elif method == 'morse':
-            encrypted = morse_encrypt(text)
-        elif method == 'rot13':
-            encrypted = rot13_encrypt(text)
-        elif method == 'atbash':
-            encrypted = atbash_encrypt(text)
-        elif method == 'vigenere':
-            encrypted = vigenere_encrypt(text)
-        elif method == 'number':
-            encrypted = number_encrypt(text)
-        elif method == 'binary':
-            encrypted = binary_encrypt(text)
-        else:
+        codec = CODECS.get(method) if isinstance(method, str) else None
+        if codec is None:
             return JsonResponse({
                 'success': False,
                 'error': '未対応の暗号方式です'
             })
         
-        return JsonResponse({
+        params = codec.clean_params(data)
+        encrypted = await _run_codec(codec, text, params=params)
+        response = {
             'success': True,
             'result': encrypted
-        })
+        }
+        
+        if use_delta:
+            user = await request.auser()
+            response['doc'], response['revision'] = await sync_to_async(
+                start_document, thread_sensitive=False
+            )(user.pk, method, params, text)
+        
+        return JsonResponse(response)
         
-    except json.JSONDecodeError:
+    except Exception as e:
         return JsonResponse({
             'success': False,
-            'error': 'リクエスト形式が正しくありません'
+            'error': f'暗号化処理でエラーが発生しました: {str(e)}'
+        })
+
+
+@login_required
+@require_http_methods(["POST"])
+async def encrypt_compare(request):
+    """
+    全方式の比較プレビュー用のAjax API
+    
+    テキストを登録されているすべての方式で暗号化し、方式ごとの暗号文・処理時間・
+    出力サイズを1回のレスポンスで返します（crypto.compareを参照）。
+    チェーンはchainが指定された場合のみ含めます。データベースには保存しません。
+    
+    Args:
+        request: HTTPリクエストオブジェクト（JSON形式のPOSTデータ）
+    
+    Returns:
+        JsonResponse: 方式ごとの結果のリストまたはエラーメッセージ
+    """
+    try:
+        data = _load_json(request)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
         })
+    
+    text = data.get('text', '')
+    if not isinstance(text, str) or not text.strip():
+        return JsonResponse({
+            'success': False,
+            'error': 'テキストが入力されていません'
+        })
+    text = text.strip()
+    
+    if len(text) > getattr(settings, 'CRYPTO_COMPARE_MAX_TEXT', 100000):
+        return JsonResponse({
+            'success': False,
+            'error': 'テキストが長すぎます'
+        })
+    
+    try:
+        # 全方式の出力の合計が大きくなる場合は、まとめて1回だけスレッドで処理する
+        inline_limit = getattr(settings, 'CRYPTO_ASYNC_INLINE_LIMIT', 4096)
+        if len(text) * compare_expansion(data) <= inline_limit:
+            results = compare_methods(text, data)
+        else:
+            results = await sync_to_async(compare_methods, thread_sensitive=False)(text, data)
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': f'暗号化処理でエラーが発生しました: {str(e)}'
         })
+    
+    labels = dict(CryptoLog.ENCRYPTION_METHODS)
+    for result in results:
+        result['label'] = labels.get(result['method'], result['method'])
+    
+    return JsonResponse({
+        'success': True,
+        'results': results
+    })
 
 
 @login_required
@@ -640,60 +1133,20 @@ def batch_encrypt_view(request):
                 'method_choices': CryptoLog.ENCRYPTION_METHODS
             })
         
-        results = []
-        
         try:
-            for original_text in text_lines:
-                # 暗号化処理
-                if method == 'caesar':
-                    encrypted = caesar_encrypt(original_text)
-                elif method == 'base64':
-                    encrypted = base64_encrypt(original_text)
-                elif method == 'random_substitution':
-                    encrypted = random_substitution_encrypt(original_text)
-                elif method == 'morse':
-                    encrypted = morse_encrypt(original_text)
-                elif method == 'rot13':
-                    encrypted = rot13_encrypt(original_text)
-                elif method == 'atbash':
-                    encrypted = atbash_encrypt(original_text)
-                elif method == 'vigenere':
-                    encrypted = vigenere_encrypt(original_text)
-                elif method == 'number':
-                    encrypted = number_encrypt(original_text)
-                elif method == 'binary':
-                    encrypted = binary_encrypt(original_text)
-                else:
-                    raise ValueError("未対応の暗号方式です")
-                
-                # 結果を保存
-                results.append({
-                    'original': original_text,
-                    'encrypted': encrypted
-                })
-                
-                # データベースに保存
-                CryptoLog.objects.create(
-                    user=request.user,
-                    original_text=original_text,
-                    encrypted_text=encrypted,
-                    method=method,
-                    is_decryption=False
-                )
+            # 全行をコーデックの一括処理で暗号化し、ログはまとめて保存
+            codec = get_codec(method)
+            params = codec.clean_params(request.POST)
+            batch_id = uuid.uuid4()
+            results = _process_lines(request, codec, method, text_lines, params, batch_id)
             
-            messages.success(request, f'{len(results)}件のテキストを暗号化しました！')
+            failed = sum(1 for result in results if result['error'])
+            messages.success(request, f'{len(results) - failed}件のテキストを暗号化しました！')
+            if failed:
+                messages.warning(request, f'{failed}件のテキストは暗号化に失敗しました')
             
-            # resultsをJSONシリアライズ用に文字列として渡す
-            import json
-            results_json = json.dumps(results, ensure_ascii=False)
-            
-            return render(request, 'crypto/batch_result.html', {
-                'results': results,  # テンプレートの長さ計算用
-                'results_json': results_json,  # JavaScript用
-                'method': method,
-                'method_display': dict(CryptoLog.ENCRYPTION_METHODS)[method],
-                'mode': 'encrypt'
-            })
+            return render(request, 'crypto/batch_result.html',
+                          _batch_result_context(results, method, 'encrypt', batch_id))
             
         except Exception as e:
             messages.error(request, f'暗号化に失敗しました: {str(e)}')
@@ -741,59 +1194,20 @@ def batch_decrypt_view(request):
                 'method_choices': CryptoLog.ENCRYPTION_METHODS
             })
         
-        results = []
-        
         try:
-            for encrypted_text in text_lines:
-                # 復号化処理
-                if method == 'caesar':
-                    decrypted = caesar_decrypt(encrypted_text)
-                elif method == 'base64':
-                    decrypted = base64_decrypt(encrypted_text)
-                elif method == 'random_substitution':
-                    decrypted = random_substitution_decrypt(encrypted_text)
-                elif method == 'morse':
-                    decrypted = morse_decrypt(encrypted_text)
-                elif method == 'rot13':
-                    decrypted = rot13_decrypt(encrypted_text)
-                elif method == 'atbash':
-                    decrypted = atbash_decrypt(encrypted_text)
-                elif method == 'vigenere':
-                    decrypted = vigenere_decrypt(encrypted_text)
-                elif method == 'number':
-                    decrypted = number_decrypt(encrypted_text)
-                elif method == 'binary':
-                    decrypted = binary_decrypt(encrypted_text)
-                else:
-                    raise ValueError("未対応の復号化方式です")
-                
-                # 結果を保存
-                results.append({
-                    'original': decrypted,
-                    'encrypted': encrypted_text
-                })
-                
-                # データベースに保存
-                CryptoLog.objects.create(
-                    user=request.user,
-                    original_text=decrypted,
-                    encrypted_text=encrypted_text,
-                    method=method,
-                    is_decryption=True
-                )
-            
-            messages.success(request, f'{len(results)}件の暗号文を復号化しました！')
+            # 全行をコーデックの一括処理で復号化し、ログはまとめて保存
+            codec = get_codec(method)
+            params = codec.clean_params(request.POST)
+            batch_id = uuid.uuid4()
+            results = _process_lines(request, codec, method, text_lines, params, batch_id, decrypt=True)
             
-            # resultsをJSONシリアライズ用に文字列として渡す
-            results_json = json.dumps(results, ensure_ascii=False)
+            failed = sum(1 for result in results if result['error'])
+            messages.success(request, f'{len(results) - failed}件の暗号文を復号化しました！')
+            if failed:
+                messages.warning(request, f'{failed}件の暗号文は復号化に失敗しました')
             
-            return render(request, 'crypto/batch_result.html', {
-                'results': results,  # テンプレートの長さ計算用
-                'results_json': results_json,  # JavaScript用
-                'method': method,
-                'method_display': dict(CryptoLog.ENCRYPTION_METHODS)[method],
-                'mode': 'decrypt'
-            })
+            return render(request, 'crypto/batch_result.html',
+                          _batch_result_context(results, method, 'decrypt', batch_id))
             
         except Exception as e:
             messages.error(request, f'復号化に失敗しました: {str(e)}')
@@ -801,3 +1215,162 @@ def batch_decrypt_view(request):
     return render(request, 'crypto/batch_decrypt.html', {
         'method_choices': CryptoLog.ENCRYPTION_METHODS
     })
+
+
+@login_required
+def file_process_view(request):
+    """
+    ファイルアップロードによる暗号化・復号化のビュー
+    
+    アップロードされたファイルをチャンク単位で処理し、結果をそのまま
+    ダウンロードとしてストリーミングで返します（crypto.filesを参照）。
+    UTF-8のテキストでないファイルは、送信を始める前にフォームのエラーとして返します。
+    不正な暗号文など処理の途中で失敗した場合は、結果の最後にエラーの行を付けます。
+    履歴にはテキスト本体を保存せず、ファイル名・大きさ・SHA-256のみを記録します。
+    履歴は最後まで処理できた時点で保存します。
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+    
+    Returns:
+        HttpResponse: アップロードフォームページ、または処理結果のダウンロード
+    """
+    if request.method == 'POST':
+        form = FileProcessForm(request.POST, request.FILES)
+        if form.is_valid():
+            uploaded = form.cleaned_data['file']
+            method = form.cleaned_data['method']
+            is_decryption = form.cleaned_data['operation'] == 'decrypt'
+            
+            try:
+                codec = get_codec(method)
+                params = codec.clean_params(form.cleaned_data)
+                # 途中で失敗して結果が切れないように、エンコーディングは送信前に確かめる
+                check_encoding(codec, uploaded, is_decryption)
+            except ValueError as e:
+                messages.error(request, f'処理に失敗しました: {str(e)}')
+                return render(request, 'crypto/file_process.html', {'form': form})
+            
+            def log_file(size, sha256):
+                record_logs([CryptoLog(
+                    user=request.user,
+                    original_text='',
+                    encrypted_text='',
+                    method=method,
+                    is_decryption=is_decryption,
+                    file_name=uploaded.name[:255],
+                    file_size=size,
+                    file_sha256=sha256,
+                    **params
+                )])
+            
+            base = os.path.splitext(uploaded.name)[0] or 'file'
+            suffix = 'decrypted' if is_decryption else method
+            response = StreamingHttpResponse(
+                _streaming_content(
+                    request, process_file(codec, uploaded, is_decryption, params, on_complete=log_file)
+                ),
+                content_type='text/plain; charset=utf-8'
+            )
+            response['Content-Disposition'] = content_disposition_header(
+                True, f'{base}_{suffix}.txt'
+            )
+            return response
+    else:
+        form = FileProcessForm()
+    
+    return render(request, 'crypto/file_process.html', {'form': form})
+
+
+class _Echo:
+    """csv.writerの書き込み先（書き込まれた行をそのまま返す）"""
+
+    def write(self, value):
+        return value
+
+
+def _export_rows(logs, export_format, mode):
+    """
+    バッチ処理の結果をCSVまたはNDJSONの行として1行ずつ返すジェネレータ
+    
+    Args:
+        logs: (元のテキスト, 暗号化されたテキスト) のタプルを返すイテレータ
+        export_format (str): 'csv' または 'ndjson'
+        mode (str): 'encrypt' または 'decrypt'（CSVの列の順序）
+    
+    Yields:
+        str: CSVまたはNDJSONの1行
+    """
+    if export_format == 'ndjson':
+        for number, (original, encrypted) in enumerate(logs, 1):
+            yield json.dumps({'line': number, 'original': original, 'encrypted': encrypted},
+                             ensure_ascii=False) + '\n'
+        return
+    
+    writer = csv.writer(_Echo())
+    # Excelで文字化けしないようにBOMを付ける
+    if mode == 'encrypt':
+        yield '\ufeff' + writer.writerow(['No.', '元のテキスト', '暗号化結果'])
+        for number, (original, encrypted) in enumerate(logs, 1):
+            yield writer.writerow([number, original, encrypted])
+    else:
+        yield '\ufeff' + writer.writerow(['No.', '暗号文', '復号化結果'])
+        for number, (original, encrypted) in enumerate(logs, 1):
+            yield writer.writerow([number, encrypted, original])
+
+
+@login_required
+@require_http_methods(["GET"])
+def batch_export(request):
+    """
+    バッチ処理結果のダウンロード（CSV・NDJSON）
+    
+    バッチ処理で保存した履歴（batch_idが一致する行）を主キー順に少しずつ読み込み、
+    StreamingHttpResponseで1行ずつ返します。結果全体をメモリに載せないため、
+    大量の行のバッチでも応答はすぐに始まります。
+    ASGIでも1行ずつ送信します（_streaming_contentを参照）。
+    処理に失敗した行は履歴に保存されないため、ダウンロードには含まれません。
+    
+    クエリ文字列:
+        format: 'csv'（既定）または 'ndjson'
+        method: 暗号化方式の名前
+        mode: 'encrypt' または 'decrypt'
+        batch: バッチのID（_batch_result_contextを参照）
+    
+    Args:
+        request: HTTPリクエストオブジェクト
+    
+    Returns:
+        StreamingHttpResponse: CSVまたはNDJSONのダウンロード
+    """
+    export_format = request.GET.get('format', 'csv')
+    mode = request.GET.get('mode', 'encrypt')
+    method = request.GET.get('method', '')
+    try:
+        batch_id = uuid.UUID(request.GET['batch'])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('ダウンロードするバッチが正しくありません')
+    if export_format not in ('csv', 'ndjson') or mode not in ('encrypt', 'decrypt'):
+        return HttpResponseBadRequest('ダウンロードの形式が正しくありません')
+    
+    logs = CryptoLog.objects.filter(
+        user=request.user,
+        batch_id=batch_id,
+        method=method,
+        is_decryption=mode == 'decrypt',
+    ).order_by('pk').values_list('original_blob__text', 'encrypted_blob__text').iterator(
+        chunk_size=getattr(settings, 'CRYPTO_LOG_BATCH_SIZE', 500)
+    )
+    
+    if export_format == 'csv':
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content_type = 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(
+        _streaming_content(request, _export_rows(logs, export_format, mode)),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = content_disposition_header(
+        True, f'batch_{mode}_results.{export_format}'
+    )
+    return response
@@ -125,6 +125,83 @@ LOGOUT_REDIRECT_URL = '/login/' # ログアウト後のリダイレクト先
 # モデルの主キーフィールドのデフォルト設定
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# キャッシュ設定
+# codecsはコーデックの処理結果のキャッシュ（上限に達すると最も長く使われていないものから削除）
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'codecs': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'crypto-codecs',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,   # キャッシュする結果の最大件数
+            'CULL_FREQUENCY': 10,   # 上限に達したときに削除する割合（1/10）
+        },
+    },
+}
+
+# コーデックの結果キャッシュに使用するCACHESのエイリアス（None: キャッシュしない）
+CRYPTO_CODEC_CACHE = 'codecs'
+# キャッシュの対象とする入力の最大文字数・結果の最大バイト数（UTF-8）
+# 1件あたりの大きさを制限し、キャッシュ全体をMAX_ENTRIES×この値（約40MB）程度に抑えます
+CRYPTO_CODEC_CACHE_MAX_TEXT = 4096
+
+# リアルタイムプレビューの差分モードで文書を保持するキャッシュと保持期間（秒）
+CRYPTO_PREVIEW_CACHE = 'default'
+CRYPTO_PREVIEW_TIMEOUT = 1800
+CRYPTO_PREVIEW_MAX_TEXT = 1000000   # 差分モードで保持する文書の最大文字数
+CRYPTO_PREVIEW_CHUNK_SIZE = 4096    # 差分モードで文書を分けて保持するチャンクの文字数（1回の編集で読み書きする単位）
+
+# バッチ処理で履歴（CryptoLog）をまとめてINSERTする際の1回あたりの件数
+CRYPTO_LOG_BATCH_SIZE = 500
+
+# 履歴をバックグラウンドスレッドで書き込むライトビハインド方式（既定は無効）
+# 有効にすると、レスポンスは履歴のINSERTを待たずに返されます
+CRYPTO_LOG_WRITE_BEHIND = False
+CRYPTO_LOG_QUEUE_SIZE = 10000         # 書き込み待ちキューの上限件数
+CRYPTO_LOG_FLUSH_INTERVAL_MS = 200    # 書き込みをまとめる最大待ち時間（ミリ秒）
+
+# バッチ処理をプロセスプールで並列に実行する行数の下限（これ未満はインラインで処理）
+CRYPTO_PARALLEL_THRESHOLD = 5000
+CRYPTO_PARALLEL_WORKERS = None    # ワーカープロセス数（None: CPUコア数、1以下: 並列化しない）
+# 起動時にプロセスプールを作成してワーカーを起動しておくか
+# （本番のアプリケーションサーバーで有効にします。管理コマンドやテストでも起動するため既定は無効）
+CRYPTO_PARALLEL_PREWARM = False
+
+# 非同期ビュー（プレビュー・JSON API）で、出力がこの文字数を超える見込みの入力は
+# イベントループを塞がないようにスレッドで処理します
+CRYPTO_ASYNC_INLINE_LIMIT = 4096
+
+# 履歴ページの1ページあたりの件数
+CRYPTO_HISTORY_PAGE_SIZE = 50
+
+# 履歴ページの一覧に表示するテキストの先頭部分の文字数（全文は行を展開して表示）
+CRYPTO_HISTORY_PREVIEW_CHARS = 100
+
+# 履歴のテキスト（元のテキスト・変換結果）を圧縮して保存する最小の文字数
+# （圧縮しても小さくならないテキストはそのまま保存します）
+CRYPTO_COMPRESS_THRESHOLD = 1024
+
+# 参照されなくなった履歴のテキストをgc_text_blobsで削除するまでの猶予期間（秒）
+# （保存中の履歴が参照しようとしているテキストを削除しないように、最後の使用からこの期間は残します）
+CRYPTO_TEXT_BLOB_GC_GRACE = 3600
+
+# バッチ処理の結果ページに表示する最大行数（全件はCSV・NDJSONでダウンロード）
+CRYPTO_BATCH_PREVIEW_ROWS = 100
+
+# ファイルアップロードによる暗号化・復号化で、一度に読み込んで処理するチャンクの大きさ（バイト）
+CRYPTO_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# 全方式の比較プレビューで受け付けるテキストの最大文字数
+# （全方式の出力の合計は入力のおよそ20倍になります）
+CRYPTO_COMPARE_MAX_TEXT = 100000
+
+# JSON配列による一括処理APIで一度に受け付ける最大件数
+# これを超える場合はNDJSONのストリーミングAPI（/api/v1/bulk/stream/）を使用します
+CRYPTO_API_MAX_BULK_ITEMS = 1000
+
 # ログインフォームのカスタムスタイル設定
 LOGIN_FORM_WIDGET_ATTRS = {
     'class': 'form-control',